@@ -1,16 +1,41 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy.schema import CreateIndex
+from datetime import datetime, timedelta
+from functools import wraps
 import numpy as np
 import asyncio
-from splitter_ado import SplitterADO, create_demo_splitter_config, create_demo_tx_bodies, run_splitter_demo_test
+import csv
+import hmac
+import io
+import json
+import os
+import threading
+import time
+from metrics import init_metrics
+from search import register_search_index, ensure_search_index, search_ideas
+from facets import MarketplaceFilters, register_facet_indexes, filter_ideas, compute_facets
+from order_book import MatchingEngine, OrderError
+from event_ledger import EventLedger, ledger_stats
+from price_history import RANGE_PRESETS, DEFAULT_MAX_POINTS, TRADE, PRIMARY, VALUATION, record_price, query_history
+from chain_indexer import DEFAULT_DENOM, DEPOSIT, PAYOUT, checkpoint_name, feed_ledger
+from live_updates import Broadcaster, NEW_IDEA
+from portfolio_analytics import DEFAULT_REFRESH_INTERVAL, AnalyticsCache, load_snapshot, recommend
+from feature_store import FeatureStore, rebuild_from_database
+from similarity import DEFAULT_K, SimilarityIndex, load_documents
+from model_artifacts import POLICY, VALUATION as VALUATION_MODEL, memory_usage, model_dir, shared_model
+from leaderboards import DEFAULT_K as LEADERBOARD_K, MAX_K as MAX_LEADERBOARD_K, Leaderboards, load_recent
+from valuation_model import extract_features
+from splitter_ado import SplitterADO, KERNEL_ADDRESS, create_demo_splitter_config, create_demo_tx_bodies, run_splitter_demo_test
+from broadcast_pipeline import distribute_royalties, pipeline_from_env
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'ipinvest-demo-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ipinvest.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///ipinvest.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
+init_metrics(app)
 
 # Database Models
 class Idea(db.Model):
@@ -36,6 +61,98 @@ class Investment(db.Model):
     transaction_hash = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    idea = db.relationship('Idea')
+
+    __table_args__ = (
+        # Per-idea holder aggregation reads tokens and amounts from the index, not the table
+        db.Index('ix_investment_idea_investor', 'idea_id', 'investor_address', 'tokens_purchased', 'amount_paid'),
+        # Keyset pagination of one idea's history in id order for the export
+        db.Index('ix_investment_idea_id', 'idea_id', 'id'),
+    )
+
+class Trade(db.Model):
+    """Secondary-market fill between two wallets"""
+    id = db.Column(db.Integer, primary_key=True)
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), nullable=False, index=True)
+    buyer_address = db.Column(db.String(100), nullable=False, index=True)
+    seller_address = db.Column(db.String(100), nullable=False, index=True)
+    tokens = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    buy_order_id = db.Column(db.Integer, nullable=False)
+    sell_order_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('buy_order_id', 'sell_order_id'),)
+
+class PricePoint(db.Model):
+    """Token price observed on a trade or valuation update"""
+    id = db.Column(db.Integer, primary_key=True)
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    tokens = db.Column(db.Integer, default=0)
+    amount = db.Column(db.Float, default=0.0)
+    source = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_price_point_idea_time', 'idea_id', 'created_at'),)
+
+class PriceBar(db.Model):
+    """OHLCV rollup of price points; resolution is the bar length in seconds"""
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    open_at = db.Column(db.DateTime, nullable=False)
+    close_at = db.Column(db.DateTime, nullable=False)
+    volume = db.Column(db.Integer, default=0)
+    amount = db.Column(db.Float, default=0.0)
+    points = db.Column(db.Integer, default=0)
+
+class SplitterContract(db.Model):
+    """Deployed royalty splitter for an idea, tracked by the chain indexer"""
+    id = db.Column(db.Integer, primary_key=True)
+    address = db.Column(db.String(100), unique=True, nullable=False)
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), nullable=False, index=True)
+    creator_address = db.Column(db.String(100), nullable=False)
+    start_height = db.Column(db.Integer, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class IndexerCheckpoint(db.Model):
+    """Last block height fully processed by an indexer stream"""
+    name = db.Column(db.String(150), primary_key=True)
+    height = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RoyaltyPayout(db.Model):
+    """Indexed bank transfer into (deposit) or out of (payout) a splitter contract"""
+    id = db.Column(db.Integer, primary_key=True)
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), nullable=False, index=True)
+    contract_address = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    counterparty = db.Column(db.String(100), nullable=False, index=True)
+    amount = db.Column(db.BigInteger, nullable=False)
+    denom = db.Column(db.String(100), nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    tx_hash = db.Column(db.String(64), nullable=False)
+    event_index = db.Column(db.Integer, nullable=False)
+    block_time = db.Column(db.DateTime)
+
+    __table_args__ = (db.UniqueConstraint('tx_hash', 'event_index', 'denom'),)
+
+class RoyaltyReconciliation(db.Model):
+    """Expected vs received royalties per recipient, rebuilt by the chain indexer"""
+    idea_id = db.Column(db.Integer, db.ForeignKey('idea.id'), primary_key=True)
+    recipient_address = db.Column(db.String(100), primary_key=True)
+    tokens_held = db.Column(db.Integer, default=0)
+    expected_amount = db.Column(db.Float, default=0.0)
+    received_amount = db.Column(db.BigInteger, default=0)
+    status = db.Column(db.String(20), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -43,6 +160,147 @@ class User(db.Model):
     risk_preference = db.Column(db.String(20), default='moderate')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+register_search_index(Idea.__table__)
+register_facet_indexes(Idea)
+
+order_engine = MatchingEngine(
+    journal_dir=os.environ.get('IPINVEST_ORDERBOOK_DIR', os.path.join(app.instance_path, 'orderbook')))
+ledger = EventLedger(os.environ.get('IPINVEST_LEDGER_DIR', os.path.join(app.instance_path, 'ledger')))
+live = Broadcaster()
+# Seconds between pulls of indexed royalty payouts into the ledger; 0 pulls only when the ledger is read
+ROYALTY_FEED_INTERVAL = float(os.environ.get('IPINVEST_ROYALTY_FEED_INTERVAL', 10))
+_royalty_feed_lock = threading.Lock()
+_royalty_feed_thread = None
+
+def sync_royalty_payouts():
+    """Append payouts stored by chain_indexer.py to this process's event ledger, its only writer"""
+    with _royalty_feed_lock, app.app_context():
+        return feed_ledger(ledger)
+
+def _run_royalty_feed():
+    while True:
+        time.sleep(ROYALTY_FEED_INTERVAL)
+        try:
+            sync_royalty_payouts()
+        except Exception as e:  # retried on the next pass; the checkpoint only advances on success
+            app.logger.warning('Royalty ledger feed failed: %s', e)
+
+def start_royalty_feed():
+    global _royalty_feed_thread
+    if ROYALTY_FEED_INTERVAL and _royalty_feed_thread is None:
+        _royalty_feed_thread = threading.Thread(target=_run_royalty_feed, name='royalty-ledger-feed', daemon=True)
+        _royalty_feed_thread.start()
+
+def load_portfolio_snapshot():
+    with app.app_context(), db.engine.connect() as connection:
+        return load_snapshot(connection)
+
+portfolio_cache = AnalyticsCache(
+    load_portfolio_snapshot,
+    interval=float(os.environ.get('IPINVEST_ANALYTICS_INTERVAL', DEFAULT_REFRESH_INTERVAL)))
+feature_store = FeatureStore(os.environ.get('IPINVEST_FEATURE_STORE',
+                                            os.path.join(app.instance_path, 'features.f32')))
+
+def load_similarity_documents():
+    with app.app_context(), db.engine.connect() as connection:
+        return load_documents(connection)
+
+similar_index = SimilarityIndex(load_similarity_documents)
+# Memory-mapped model artifacts, shared by all worker processes and picked up on publish
+MODEL_DIR = model_dir()
+valuation_artifact = shared_model(VALUATION_MODEL, MODEL_DIR)
+leaderboards = Leaderboards()
+MAX_SIMILAR = 50
+
+def similar_ideas(idea_id, k=DEFAULT_K):
+    """(Idea, similarity) pairs for the ideas most like idea_id, most similar first"""
+    neighbours = similar_index.similar(idea_id, k)
+    ideas = {i.id: i for i in Idea.query.filter(Idea.id.in_([i for i, _ in neighbours]))} if neighbours else {}
+    return [(ideas[i], score) for i, score in neighbours if i in ideas]
+
+_royalty_pipeline = None
+_royalty_pipeline_lock = threading.Lock()
+
+def royalty_pipeline():
+    """Broadcast pipeline for the platform key in IPINVEST_SIGNER_KEY, created on first use"""
+    global _royalty_pipeline
+    # One pipeline per key: two would compete for the account's sequence numbers
+    with _royalty_pipeline_lock:
+        if _royalty_pipeline is None:
+            _royalty_pipeline = pipeline_from_env()
+        return _royalty_pipeline
+
+# Bearer token for endpoints that register contracts or move platform funds
+OPERATOR_TOKEN = os.environ.get('IPINVEST_OPERATOR_TOKEN')
+
+def operator_required(view):
+    """Reject requests without `Authorization: Bearer <IPINVEST_OPERATOR_TOKEN>`"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not OPERATOR_TOKEN:
+            return jsonify({'error': 'IPINVEST_OPERATOR_TOKEN is not configured'}), 503
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), OPERATOR_TOKEN.encode()):
+            return jsonify({'error': 'Operator credentials required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def record_trades(fills, skip_existing=False):
+    """
+    Persist matching engine fills as Trade rows
+
+    Returns the fills that were added, to be written to the ledger after commit
+    """
+    added = []
+    for fill in fills:
+        if skip_existing and Trade.query.filter_by(
+                buy_order_id=fill.buy_order_id, sell_order_id=fill.sell_order_id).first():
+            continue
+        added.append(fill)
+        db.session.add(Trade(
+            idea_id=fill.idea_id,
+            buyer_address=fill.buyer,
+            seller_address=fill.seller,
+            tokens=fill.quantity,
+            price=fill.price,
+            amount=fill.quantity * fill.price,
+            buy_order_id=fill.buy_order_id,
+            sell_order_id=fill.sell_order_id,
+            created_at=datetime.utcfromtimestamp(fill.timestamp)
+        ))
+        record_price(db.session, PricePoint, PriceBar, fill.idea_id, fill.price, fill.quantity,
+                     fill.quantity * fill.price, source=TRADE, at=datetime.utcfromtimestamp(fill.timestamp))
+    return added
+
+def ledger_trades(fills):
+    for fill in fills:
+        ledger.append_transfer(fill.seller, fill.buyer, fill.idea_id, fill.quantity,
+                               fill.quantity * fill.price, timestamp=fill.timestamp)
+    if fills:
+        portfolio_cache.mark_dirty()
+        feature_store.record_trades(fills)
+
+def wallet_token_balance(wallet_address, idea_id):
+    """Tokens held from primary purchases plus net secondary trades"""
+    bought = db.session.query(db.func.coalesce(db.func.sum(Investment.tokens_purchased), 0)).filter_by(
+        investor_address=wallet_address, idea_id=idea_id).scalar()
+    traded_in = db.session.query(db.func.coalesce(db.func.sum(Trade.tokens), 0)).filter_by(
+        buyer_address=wallet_address, idea_id=idea_id).scalar()
+    traded_out = db.session.query(db.func.coalesce(db.func.sum(Trade.tokens), 0)).filter_by(
+        seller_address=wallet_address, idea_id=idea_id).scalar()
+    return bought + traded_in - traded_out
+
+def idea_token_holdings(idea_id):
+    """wallet_token_balance for every wallet holding an idea: primary purchases plus net secondary trades"""
+    holdings = {}
+    for model, wallet, tokens, sign in ((Investment, Investment.investor_address, Investment.tokens_purchased, 1),
+                                        (Trade, Trade.buyer_address, Trade.tokens, 1),
+                                        (Trade, Trade.seller_address, Trade.tokens, -1)):
+        rows = db.session.query(wallet, db.func.sum(tokens)).filter(model.idea_id == idea_id).group_by(wallet)
+        for address, amount in rows:
+            holdings[address] = holdings.get(address, 0) + sign * amount
+    return {address: tokens for address, tokens in holdings.items() if tokens > 0}
+
 # Sample data for demo
 SAMPLE_IDEAS = [
     {
@@ -86,21 +344,108 @@ SAMPLE_IDEAS = [
 @app.route('/')
 def index():
     ideas = Idea.query.filter_by(status='active').order_by(Idea.created_at.desc()).all()
-    return render_template('index.html', ideas=ideas)
+    return render_template('index.html', ideas=ideas, boards=leaderboards.snapshot(LEADERBOARD_K))
+
+HOLDERS_PER_PAGE = 20
+MAX_HOLDERS_PER_PAGE = 100
+EXPORT_BATCH = 1000
+EXPORT_COLUMNS = ['id', 'investor_address', 'tokens_purchased', 'amount_paid', 'transaction_hash', 'created_at']
+
+def idea_holders(idea_id, page=1, per_page=HOLDERS_PER_PAGE):
+    """
+    One page of an idea's investors, largest holding first
+
+    Returns:
+        {'holders': [...], 'total': distinct investors, 'purchases', 'page', 'per_page'}
+    """
+    tokens = db.func.sum(Investment.tokens_purchased).label('tokens')
+    rows = db.session.query(
+        Investment.investor_address, tokens, db.func.sum(Investment.amount_paid).label('amount'),
+        db.func.count().label('purchases')
+    ).filter(Investment.idea_id == idea_id).group_by(Investment.investor_address).order_by(
+        tokens.desc(), Investment.investor_address).limit(per_page).offset((page - 1) * per_page).all()
+    total, purchases = db.session.query(
+        db.func.count(db.distinct(Investment.investor_address)), db.func.count()
+    ).filter(Investment.idea_id == idea_id).one()
+    return {
+        'holders': [{'investor_address': r.investor_address, 'tokens': r.tokens, 'amount': r.amount,
+                     'purchases': r.purchases} for r in rows],
+        'total': total,
+        'purchases': purchases,
+        'page': page,
+        'per_page': per_page
+    }
+
+def holder_page_args():
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', HOLDERS_PER_PAGE, type=int), 1), MAX_HOLDERS_PER_PAGE)
+    return page, per_page
 
 @app.route('/idea/<int:idea_id>')
 def idea_detail(idea_id):
     idea = Idea.query.get_or_404(idea_id)
-    investments = Investment.query.filter_by(idea_id=idea_id).all()
-    return render_template('idea_detail.html', idea=idea, investments=investments)
+    holders = idea_holders(idea_id, *holder_page_args())
+    return render_template('idea_detail.html', idea=idea, holders=holders, similar=similar_ideas(idea_id))
+
+@app.route('/api/ideas/<int:idea_id>/holders')
+def api_idea_holders(idea_id):
+    Idea.query.get_or_404(idea_id)
+    return jsonify(idea_holders(idea_id, *holder_page_args()))
+
+def iter_investments(idea_id):
+    """Every purchase of an idea in order, fetched EXPORT_BATCH rows at a time by id"""
+    last_id = 0
+    while True:
+        batch = db.session.query(*(getattr(Investment, c) for c in EXPORT_COLUMNS)).filter(
+            Investment.idea_id == idea_id, Investment.id > last_id
+        ).order_by(Investment.id).limit(EXPORT_BATCH).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+@app.route('/api/ideas/<int:idea_id>/investments.<fmt>')
+def export_investments(idea_id, fmt):
+    """Full purchase history as CSV or JSON lines, streamed in batches"""
+    idea = Idea.query.get_or_404(idea_id)
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(EXPORT_COLUMNS)
+        for batch in iter_investments(idea.id):
+            for row in batch:
+                values = [row.created_at.isoformat() if c == 'created_at' and row.created_at else getattr(row, c)
+                          for c in EXPORT_COLUMNS]
+                if fmt == 'csv':
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=idea-{idea.id}-investments.{fmt}'})
 
 @app.route('/submit_idea', methods=['GET', 'POST'])
 def submit_idea():
     if request.method == 'POST':
         data = request.form
 
-        # Use random/demo values for predicted_value and token_price
-        predicted_value = np.random.uniform(500000, 3000000)
+        # Value with the published valuation model; random demo values until one is trained
+        valuation = valuation_artifact.get()
+        if valuation is not None:
+            predicted_value = float(valuation.predict(extract_features(data['title'], data['description'],
+                                                                       data['field']))[0])
+        else:
+            predicted_value = np.random.uniform(500000, 3000000)
         token_price = predicted_value / 1000
 
         idea = Idea(
@@ -115,7 +460,13 @@ def submit_idea():
         )
 
         db.session.add(idea)
+        db.session.flush()
+        record_price(db.session, PricePoint, PriceBar, idea.id, token_price, source=VALUATION)
         db.session.commit()
+        feature_store.update_idea(idea)
+        similar_index.add(idea.id, idea.title, idea.description, idea.field)
+        live.publish(NEW_IDEA, {'idea_id': idea.id, 'title': idea.title, 'field': idea.field,
+                                'token_price': idea.token_price, 'total_tokens': idea.total_tokens})
 
         flash('Idea submitted successfully! NFT minted on Andromeda blockchain.', 'success')
         return redirect(url_for('idea_detail', idea_id=idea.id))
@@ -141,7 +492,14 @@ def invest(idea_id):
 
     idea.tokens_sold += tokens_to_buy
     db.session.add(investment)
+    record_price(db.session, PricePoint, PriceBar, idea_id, idea.token_price, tokens_to_buy, total_cost,
+                 source=PRIMARY)
     db.session.commit()
+    ledger.append_purchase(investment.investor_address, idea_id, tokens_to_buy, total_cost)
+    leaderboards.record_purchase(idea_id, idea.title, idea.field, idea.total_tokens, tokens_to_buy, total_cost)
+    feature_store.update_idea(idea)
+    live.publish_idea(idea)
+    portfolio_cache.mark_dirty()
 
     # Calculate revenue sharing percentages
     creator_percentage = 70.0
@@ -163,31 +521,172 @@ def invest(idea_id):
 
 @app.route('/marketplace')
 def marketplace():
-    ideas = Idea.query.filter_by(status='active').all()
-    return render_template('marketplace.html', ideas=ideas)
+    filters = MarketplaceFilters.from_args(request.args)
+    ideas = filter_ideas(db.session, Idea, filters)
+    facets = compute_facets(db.session, Idea, filters)
+    return render_template('marketplace.html', ideas=ideas, facets=facets, filters=filters)
+
+@app.route('/api/marketplace')
+def api_marketplace():
+    """Filtered ideas plus facet counts for the marketplace filters"""
+    filters = MarketplaceFilters.from_args(request.args)
+    ideas = filter_ideas(db.session, Idea, filters)
+    return jsonify({
+        'filters': filters.to_dict(),
+        'facets': compute_facets(db.session, Idea, filters),
+        'ideas': [{
+            'idea_id': idea.id,
+            'title': idea.title,
+            'field': idea.field,
+            'inventor': idea.inventor,
+            'token_price': idea.token_price,
+            'predicted_value': idea.predicted_value,
+            'tokens_available': idea.total_tokens - idea.tokens_sold
+        } for idea in ideas]
+    })
 
 @app.route('/portfolio/<wallet_address>')
 def portfolio(wallet_address):
-    investments = Investment.query.filter_by(investor_address=wallet_address).all()
-    total_value = sum(inv.tokens_purchased * inv.idea.token_price for inv in investments)
-    return render_template('portfolio.html', investments=investments, total_value=total_value)
+    investments = Investment.query.options(db.joinedload(Investment.idea)).filter_by(
+        investor_address=wallet_address).order_by(Investment.created_at.desc()).all()
+    risk = portfolio_cache.get().wallet(wallet_address)
+    total_value = risk['total_value'] if risk else 0.0
+    return render_template('portfolio.html', investments=investments, total_value=total_value, risk=risk)
+
+@app.route('/api/portfolio/<wallet_address>/risk')
+def portfolio_risk(wallet_address):
+    """Precomputed valuation, field exposure, concentration and top positions for a wallet"""
+    risk = portfolio_cache.get().wallet(wallet_address)
+    if risk is None:
+        return jsonify({'error': 'No holdings for this wallet'}), 404
+    return jsonify(risk)
+
+@app.route('/api/portfolio/risk')
+def portfolio_risk_summary():
+    return jsonify(portfolio_cache.get().summary())
 
 @app.route('/api/recommendations')
 def get_recommendations():
-    # Simulate recommendations with random scores
+    """Active ideas ranked by upside; ?wallet= discounts fields and ideas the wallet is already heavy in"""
     ideas = Idea.query.filter_by(status='active').all()
-    if ideas:
-        recommendations = []
-        for idea in ideas:
-            score = np.random.uniform(0.6, 0.95)  # Simulated recommendation score
-            recommendations.append({
-                'idea_id': idea.id,
-                'title': idea.title,
-                'score': score,
-                'reason': f"High potential in {idea.field} sector"
-            })
-        return jsonify(recommendations)
-    return jsonify([])
+    wallet = request.args.get('wallet')
+    user = User.query.filter_by(wallet_address=wallet).first() if wallet else None
+    snapshot = portfolio_cache.get() if wallet else None
+    return jsonify(recommend(snapshot, ideas, wallet, user.risk_preference if user else 'moderate',
+                             limit=request.args.get('limit', type=int), upside=feature_store.column('upside')))
+
+@app.route('/api/orders/<int:idea_id>', methods=['POST'])
+def place_order(idea_id):
+    """Place a limit or market order on an idea's secondary order book"""
+    Idea.query.get_or_404(idea_id)
+    data = request.get_json() or {}
+    wallet = data.get('wallet_address')
+    side = data.get('side')
+    if not wallet:
+        return jsonify({'error': 'wallet_address is required'}), 400
+
+    try:
+        quantity = int(data.get('quantity', 0))
+        price = float(data['price']) if data.get('price') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'quantity and price must be numbers'}), 400
+
+    def persist(fills):
+        try:
+            record_trades(fills)
+            db.session.commit()
+        except Exception:
+            # The engine rolls the match back too, so book and database agree
+            db.session.rollback()
+            raise
+
+    # Balance check and trade commit both happen under the engine lock, so concurrent sells can't oversell
+    try:
+        order, fills = order_engine.submit(idea_id, wallet, side, quantity,
+                                           order_type=data.get('type', 'limit'), price=price,
+                                           balance=lambda: wallet_token_balance(wallet, idea_id),
+                                           on_fills=persist)
+    except OrderError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Could not record trades: {e}'}), 500
+
+    ledger_trades(fills)
+
+    return jsonify({
+        'success': True,
+        'order': order.to_dict(),
+        'fills': [fill.to_dict() for fill in fills],
+        'filled_quantity': order.quantity - order.remaining
+    })
+
+@app.route('/api/orders/<int:idea_id>/<int:order_id>', methods=['DELETE'])
+def cancel_order(idea_id, order_id):
+    """Cancel a resting order"""
+    data = request.get_json(silent=True) or {}
+    order = order_engine.book(idea_id).orders.get(order_id)
+    if order is None:
+        return jsonify({'error': 'Order not found or no longer open'}), 404
+    if order.wallet != data.get('wallet_address'):
+        return jsonify({'error': 'Only the order owner can cancel it'}), 403
+
+    try:
+        order = order_engine.cancel(idea_id, order_id)
+    except OrderError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'success': True, 'order': order.to_dict()})
+
+@app.route('/api/orderbook/<int:idea_id>')
+def get_order_book(idea_id):
+    """Aggregated bid/ask depth for an idea"""
+    book = order_engine.book(idea_id)
+    depth = book.depth(request.args.get('depth', 10, type=int))
+    best_bid, best_ask = book.best_bid(), book.best_ask()
+    return jsonify({
+        'idea_id': idea_id,
+        'bids': depth['bids'],
+        'asks': depth['asks'],
+        'best_bid': best_bid.price if best_bid else None,
+        'best_ask': best_ask.price if best_ask else None,
+        'last_price': book.last_price
+    })
+
+@app.route('/api/search')
+def api_search():
+    """Full-text search over ideas, ranked by BM25"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    return jsonify(search_ideas(db.session, query, page, per_page))
+
+@app.route('/api/ideas/<int:idea_id>/similar')
+def api_similar_ideas(idea_id):
+    """Nearest ideas by TF-IDF cosine similarity of title, description and field"""
+    Idea.query.get_or_404(idea_id)
+    k = request.args.get('k', DEFAULT_K, type=int)
+    if not 1 <= k <= MAX_SIMILAR:
+        return jsonify({'error': f'k must be between 1 and {MAX_SIMILAR}'}), 400
+    return jsonify({
+        'idea_id': idea_id,
+        'similar': [{
+            'idea_id': idea.id,
+            'title': idea.title,
+            'field': idea.field,
+            'token_price': idea.token_price,
+            'similarity': round(score, 4)
+        } for idea, score in similar_ideas(idea_id, k)]
+    })
+
+@app.route('/api/leaderboards')
+def api_leaderboards():
+    """Most funded today, fastest selling (share of supply in the last hour) and hottest fields"""
+    k = request.args.get('k', LEADERBOARD_K, type=int)
+    if not 1 <= k <= MAX_LEADERBOARD_K:
+        return jsonify({'error': f'k must be between 1 and {MAX_LEADERBOARD_K}'}), 400
+    return jsonify(leaderboards.snapshot(k))
 
 @app.route('/api/analytics')
 def analytics():
@@ -202,6 +701,57 @@ def analytics():
         'avg_token_price': total_value / max(total_investments, 1)
     })
 
+@app.route('/api/stream')
+def live_stream():
+    """SSE funding updates: ?idea=<id> (repeatable) for specific ideas, none for the whole marketplace"""
+    ideas = request.args.getlist('idea', type=int)
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(live.subscribe(ideas or None, last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream/stats')
+def live_stream_stats():
+    return jsonify(live.stats())
+
+@app.route('/api/price-history/<int:idea_id>')
+def price_history(idea_id):
+    """Chart series: ?range=1d|7d|30d|90d|1y|all or ?start=&end= (unix seconds), optional resolution"""
+    Idea.query.get_or_404(idea_id)
+    end = datetime.utcnow()
+    start = None
+    preset = request.args.get('range')
+    if preset:
+        if preset not in RANGE_PRESETS:
+            return jsonify({'error': f"range must be one of {', '.join(RANGE_PRESETS)}"}), 400
+        if RANGE_PRESETS[preset]:
+            start = end - timedelta(days=RANGE_PRESETS[preset])
+    try:
+        if request.args.get('start'):
+            start = datetime.utcfromtimestamp(float(request.args['start']))
+        if request.args.get('end'):
+            end = datetime.utcfromtimestamp(float(request.args['end']))
+        return jsonify(query_history(db.session, PricePoint, PriceBar, idea_id, start, end,
+                                     resolution=request.args.get('resolution'),
+                                     max_points=request.args.get('max_points', DEFAULT_MAX_POINTS, type=int)))
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/ledger/stats')
+def ledger_summary():
+    sync_royalty_payouts()
+    return jsonify(ledger_stats(ledger))
+
+@app.route('/api/ledger/wallet/<wallet_address>')
+def ledger_wallet(wallet_address):
+    sync_royalty_payouts()
+    summary = ledger.wallet_summary(wallet_address)
+    return jsonify({
+        'wallet_address': wallet_address,
+        'holdings': [{'idea_id': idea_id, 'tokens': tokens} for idea_id, tokens in sorted(summary['holdings'].items())],
+        'royalties_received': summary['royalties_received'],
+        'as_of_seq': summary['as_of_seq']
+    })
+
 # Splitter ADO Demo Endpoints
 @app.route('/splitter-demo')
 def splitter_demo():
@@ -303,6 +853,20 @@ def api_query_splitter():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chain/endpoints')
+def chain_endpoints():
+    """Circuit breaker state, latency and hedge counts for the chain REST endpoints"""
+    return jsonify(SplitterADO().client.stats())
+
+@app.route('/api/models')
+def model_status():
+    """Published model versions loaded by this worker and its memory use"""
+    return jsonify({
+        'pid': os.getpid(),
+        'models': [shared_model(name, MODEL_DIR).status() for name in (VALUATION_MODEL, POLICY)],
+        'memory': memory_usage()
+    })
+
 @app.route('/api/splitter/demo-test', methods=['POST'])
 def api_splitter_demo_test():
     """Run complete Splitter ADO demo test"""
@@ -386,6 +950,102 @@ def setup_royalty_sharing(idea_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/splitter/contracts', methods=['POST'])
+@operator_required
+def register_splitter_contract():
+    """Register a deployed splitter so the chain indexer follows its payouts; one per idea"""
+    data = request.get_json() or {}
+    idea = Idea.query.get_or_404(data.get('idea_id', 0))
+    address = data.get('contract_address')
+    creator_wallet = data.get('creator_wallet')
+    if not address or not creator_wallet:
+        return jsonify({'error': 'contract_address and creator_wallet are required'}), 400
+    if SplitterContract.query.filter_by(address=address).first():
+        return jsonify({'error': 'Contract already registered'}), 409
+    # Royalty payments go to this contract, so it cannot be swapped out once set
+    if SplitterContract.query.filter_by(idea_id=idea.id).first():
+        return jsonify({'error': 'Idea already has a splitter contract'}), 409
+
+    contract = SplitterContract(address=address, idea_id=idea.id, creator_address=creator_wallet,
+                                start_height=int(data.get('start_height', 1)))
+    db.session.add(contract)
+    db.session.commit()
+    return jsonify({'success': True, 'contract_address': address, 'idea_id': idea.id}), 201
+
+@app.route('/api/royalties/<int:idea_id>')
+def royalty_dashboard(idea_id):
+    """Indexed royalty flows for an idea; never queries the chain"""
+    Idea.query.get_or_404(idea_id)
+    contracts = SplitterContract.query.filter_by(idea_id=idea_id).all()
+    checkpoints = {cp.name: cp.height for cp in IndexerCheckpoint.query.filter(
+        IndexerCheckpoint.name.in_([checkpoint_name(c.address) for c in contracts]))}
+    totals = dict(db.session.query(RoyaltyPayout.kind, db.func.sum(RoyaltyPayout.amount))
+                  .filter_by(idea_id=idea_id, denom=DEFAULT_DENOM)
+                  .group_by(RoyaltyPayout.kind).all())
+    rows = (RoyaltyReconciliation.query.filter_by(idea_id=idea_id)
+            .order_by(RoyaltyReconciliation.expected_amount.desc()).all())
+
+    return jsonify({
+        'idea_id': idea_id,
+        'denom': DEFAULT_DENOM,
+        'contracts': [{'address': c.address, 'indexed_height': checkpoints.get(checkpoint_name(c.address))}
+                      for c in contracts],
+        'deposited': totals.get(DEPOSIT, 0),
+        'paid_out': totals.get(PAYOUT, 0),
+        'recipients': [{
+            'address': r.recipient_address,
+            'tokens_held': r.tokens_held,
+            'expected': round(r.expected_amount, 2),
+            'received': r.received_amount,
+            'status': r.status
+        } for r in rows]
+    })
+
+@app.route('/api/royalties/distribute', methods=['POST'])
+@operator_required
+def distribute_royalty_payments():
+    """
+    Queue signed splitter sends: {"payouts": [{"idea_id": 1, "amount": 1000000}], "per_tx": 1}
+
+    Returns at once with a job id per tx; poll /api/royalties/jobs/<job_id> for the outcome.
+    """
+    pipeline = royalty_pipeline()
+    if pipeline is None:
+        return jsonify({'error': 'IPINVEST_SIGNER_KEY is not configured'}), 503
+    data = request.get_json() or {}
+    try:
+        payouts = [(int(item['idea_id']), int(item['amount'])) for item in data.get('payouts', [])]
+        per_tx = int(data.get('per_tx', 1))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'payouts must be a list of {idea_id, amount} with integer values'}), 400
+    if not payouts or per_tx < 1 or any(amount <= 0 for _, amount in payouts):
+        return jsonify({'error': 'at least one positive payout is required'}), 400
+
+    contracts = {c.idea_id: c.address for c in SplitterContract.query.filter(
+        SplitterContract.idea_id.in_({idea_id for idea_id, _ in payouts}))}
+    missing = sorted({idea_id for idea_id, _ in payouts} - set(contracts))
+    if missing:
+        return jsonify({'error': f'No splitter contract registered for ideas {missing}'}), 404
+
+    sends = [(contracts[i], amount) for i, amount in payouts]
+    futures = distribute_royalties(pipeline, sends, per_tx)
+    return jsonify({
+        'sender': pipeline.address,
+        'jobs': [{'job_id': future.job_id, 'payouts': [{'contract_address': contract, 'amount': amount}
+                                                        for contract, amount in sends[i * per_tx:(i + 1) * per_tx]]}
+                 for i, future in enumerate(futures)]
+    }), 202
+
+@app.route('/api/royalties/jobs/<job_id>')
+@operator_required
+def royalty_job_status(job_id):
+    """State of a tx queued by /api/royalties/distribute"""
+    pipeline = royalty_pipeline()
+    status = pipeline.status(job_id) if pipeline is not None else None
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(status)
+
 @app.route('/api/splitter/tx-bodies', methods=['POST'])
 def api_get_tx_bodies():
     """Get all transaction bodies needed for Splitter demo"""
@@ -418,12 +1078,26 @@ def init_demo_data():
     """Initialize demo data"""
     with app.app_context():
         db.create_all()
+        with db.engine.begin() as conn:
+            ensure_search_index(conn)
+            # create_all skips indexes on tables that already exist
+            for index in [*Idea.__table__.indexes, *Investment.__table__.indexes]:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+        # Fills replayed from the order journal may not have reached the database
+        if order_engine.recovered_fills:
+            added = record_trades(order_engine.recovered_fills, skip_existing=True)
+            db.session.commit()
+            ledger_trades(added)
+            order_engine.recovered_fills = []
 
         # Add sample ideas if none exist
         if Idea.query.count() == 0:
             for idea_data in SAMPLE_IDEAS:
                 idea = Idea(**idea_data)
                 db.session.add(idea)
+                db.session.flush()
+                record_price(db.session, PricePoint, PriceBar, idea.id, idea.token_price, source=VALUATION)
 
             # Add sample user
             user = User(
@@ -435,6 +1109,19 @@ def init_demo_data():
 
             db.session.commit()
 
+        # Leaderboards only keep the last 24 hours; replay them after a restart
+        with db.engine.connect() as connection:
+            leaderboards.rebuild(load_recent(connection))
+
+        # Rewrite the feature store if it is new or out of step with the idea table
+        if feature_store.created or feature_store.stats()['ideas'] != Idea.query.count():
+            with db.engine.connect() as connection:
+                rebuild_from_database(feature_store, connection)
+            feature_store.created = False
+
+        sync_royalty_payouts()
+    start_royalty_feed()
+
 if __name__ == '__main__':
     init_demo_data()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,671 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for IPInvest hot paths
+Runs each benchmark against a scratch SQLite database seeded with 1k,
+100k and 1M investment rows and writes the timings as JSON.
+
+Usage:
+    python benchmarks.py run --sizes 1000,100000,1000000 --output bench.json
+    python benchmarks.py ledger --events 5000000
+    python benchmarks.py holdings --holdings 1000000
+    python benchmarks.py portfolio --positions 1000000
+    python benchmarks.py chain --queries 500 --slow-rate 0.05
+    python benchmarks.py compare baseline.json bench.json --threshold 0.10
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_REPEAT = 20
+DEFAULT_BUDGET_SECONDS = 5.0
+DEFAULT_THRESHOLD = 0.10
+
+BENCH_WALLET_COUNT_DIVISOR = 20
+BENCH_IDEA_COUNT_DIVISOR = 50
+
+# name -> function(ctx) returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[["BenchContext"], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark"""
+    def decorator(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+
+class BenchContext:
+    """Seeded app, test client and scratch directory shared by benchmarks"""
+
+    def __init__(self, app_module, rows: int, workdir: str):
+        self.app_module = app_module
+        self.app = app_module.app
+        self.db = app_module.db
+        self.client = app_module.app.test_client()
+        self.rows = rows
+        self.workdir = workdir
+        self.busiest_wallet = None
+        self.busiest_idea_id = None
+
+
+def seed_investments(app_module, rows: int, seed: int = 42):
+    """
+    Reset the database and bulk-load `rows` investments with generate_data
+
+    Returns:
+        (busiest_wallet, busiest_idea_id)
+    """
+    from sqlalchemy import func
+    from feature_store import rebuild_from_database
+    from generate_data import generate
+
+    Investment = app_module.Investment
+    db = app_module.db
+    generate(ideas=max(len(app_module.SAMPLE_IDEAS), rows // BENCH_IDEA_COUNT_DIVISOR),
+             users=max(1, rows // BENCH_WALLET_COUNT_DIVISOR), investments=rows, seed=seed)
+
+    with app_module.app.app_context():
+        busiest_wallet = db.session.query(Investment.investor_address).group_by(
+            Investment.investor_address).order_by(func.count().desc()).limit(1).scalar()
+        busiest_idea_id = db.session.query(Investment.idea_id).group_by(
+            Investment.idea_id).order_by(func.count().desc()).limit(1).scalar()
+        with db.engine.connect() as connection:
+            rebuild_from_database(app_module.feature_store, connection)
+    return busiest_wallet, busiest_idea_id
+
+
+def _checked(send: Callable[[], Any]) -> Callable[[], Any]:
+    """Fail loudly instead of timing error responses"""
+    def call():
+        response = send()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.path} returned {response.status_code}: "
+                               f"{response.get_data(as_text=True)[:200]}")
+        return response
+    return call
+
+
+@benchmark("invest")
+def bench_invest(ctx: BenchContext):
+    payload = {"tokens": 1, "wallet_address": "andr1benchinvestor"}
+    return _checked(lambda: ctx.client.post(f"/invest/{ctx.busiest_idea_id}", json=payload))
+
+
+@benchmark("portfolio")
+def bench_portfolio(ctx: BenchContext):
+    return _checked(lambda: ctx.client.get(f"/portfolio/{ctx.busiest_wallet}"))
+
+
+@benchmark("idea_detail")
+def bench_idea_detail(ctx: BenchContext):
+    return _checked(lambda: ctx.client.get(f"/idea/{ctx.busiest_idea_id}"))
+
+
+@benchmark("analytics")
+def bench_analytics(ctx: BenchContext):
+    return _checked(lambda: ctx.client.get("/api/analytics"))
+
+
+@benchmark("get_recommendations")
+def bench_recommendations(ctx: BenchContext):
+    return _checked(lambda: ctx.client.get("/api/recommendations"))
+
+
+@benchmark("setup_royalty_sharing")
+def bench_royalty_sharing(ctx: BenchContext):
+    payload = {"creator_wallet": "andr1benchcreator"}
+    return _checked(lambda: ctx.client.post(f"/api/setup-royalty-sharing/{ctx.busiest_idea_id}", json=payload))
+
+
+@benchmark("splitter_tx_bodies")
+def bench_splitter_tx_bodies(ctx: BenchContext):
+    from splitter_ado import SplitterADO
+
+    Investment = ctx.app_module.Investment
+    with ctx.app.app_context():
+        holders = [row[0] for row in ctx.db.session.query(Investment.investor_address).filter_by(
+            idea_id=ctx.busiest_idea_id).distinct()]
+    splitter = SplitterADO()
+    percent = str(0.3 / max(len(holders), 1))
+
+    def build():
+        recipients = [{"recipient": {"address": a}, "percent": percent} for a in holders]
+        splitter.create_instantiate_msg(recipients, "andr1benchcreator")
+        splitter.get_instantiate_tx_body("andr1benchcreator", "andr1benchtreasury")
+        splitter.get_send_tx_body("andr1benchcreator", "andr1benchsplitter")
+    return build
+
+
+@benchmark("valuation_predict")
+def bench_valuation_predict(ctx: BenchContext):
+    import numpy as np
+    import pandas as pd
+    from valuation_model import FEATURE_COLUMNS, ValuationModel
+
+    model_dir = os.path.join(ctx.workdir, "valuation")
+    os.makedirs(model_dir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(model_dir)
+    try:
+        if not os.path.exists("valuation_model.pkl"):
+            rng = np.random.default_rng(42)
+            features = rng.random((2000, 5))
+            df = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+            df["valuation"] = features @ [3e6, 1e6, 5e5, 2e5, 1e5]
+            df.to_csv("train.csv", index=False)
+            ValuationModel().train("train.csv")
+    finally:
+        os.chdir(cwd)
+
+    # predict() passes a bare list to a scaler fitted on a DataFrame
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = ValuationModel()
+    feature_vector = np.array([0.5, 0.15, 1.0, 0.0, 0.2])
+
+    def predict():
+        os.chdir(model_dir)
+        try:
+            model.predict(feature_vector)
+        finally:
+            os.chdir(cwd)
+    return predict
+
+
+def time_callable(fn: Callable[[], Any], repeat: int, budget: float) -> Dict[str, float]:
+    """Run `fn` up to `repeat` times (at least once) within `budget` seconds"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (not samples or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "iterations": len(samples),
+        "min_ms": samples[0] * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p95_ms": samples[p95_index] * 1000,
+        "ops_per_sec": len(samples) / sum(samples) if sum(samples) else float("inf"),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def use_scratch_environment(workdir: str):
+    """Point the app's database, journals, feature store and models into `workdir`"""
+    # Must be set before app.py is imported; the engine is created at import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["IPINVEST_ORDERBOOK_DIR"] = os.path.join(workdir, "orderbook")
+    os.environ["IPINVEST_LEDGER_DIR"] = os.path.join(workdir, "ledger")
+    os.environ["IPINVEST_FEATURE_STORE"] = os.path.join(workdir, "features.f32")
+    os.environ["IPINVEST_MODEL_DIR"] = os.path.join(workdir, "models")
+    # Recompute portfolio analytics on the first read after a write, not on a timer mid-benchmark
+    os.environ["IPINVEST_ANALYTICS_INTERVAL"] = "0"
+
+
+def run_benchmarks(sizes, names=None, repeat=DEFAULT_REPEAT, budget=DEFAULT_BUDGET_SECONDS) -> Dict[str, Any]:
+    """Seed each size in turn and time the selected benchmarks"""
+    workdir = tempfile.mkdtemp(prefix="ipinvest-bench-")
+    use_scratch_environment(workdir)
+    import app as app_module
+
+    names = names or list(BENCHMARKS)
+    results = []
+    for rows in sizes:
+        seed_start = time.perf_counter()
+        ctx = BenchContext(app_module, rows, workdir)
+        ctx.busiest_wallet, ctx.busiest_idea_id = seed_investments(app_module, rows)
+        app_module.portfolio_cache.mark_dirty()
+        print(f"Seeded {rows:,} investments in {time.perf_counter() - seed_start:.1f}s", file=sys.stderr)
+        for name in names:
+            fn = BENCHMARKS[name](ctx)
+            stats = time_callable(fn, repeat, budget)
+            results.append({"name": name, "rows": rows, **stats})
+            print(f"  {name:<24} rows={rows:<9,} median={stats['median_ms']:.3f}ms "
+                  f"p95={stats['p95_ms']:.3f}ms n={stats['iterations']}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "budget_seconds": budget,
+        },
+        "results": results,
+    }
+
+
+def run_matching_benchmark(orders: int = 1_000_000, ideas: int = 100, seed: int = 42,
+                           journal_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Drive the order book with a random mixed order flow
+
+    About 90% limit orders priced around a drifting mid and 10% market
+    orders, spread over `ideas` books. Reports matched orders per second and
+    per-order match latency percentiles.
+    """
+    import numpy as np
+    from order_book import MatchingEngine, BUY, SELL, LIMIT, MARKET
+
+    rng = np.random.default_rng(seed)
+    engine = MatchingEngine(journal_dir=journal_dir)
+    idea_ids = rng.integers(1, ideas + 1, orders).tolist()
+    sides = np.where(rng.random(orders) < 0.5, BUY, SELL).tolist()
+    types = np.where(rng.random(orders) < 0.9, LIMIT, MARKET).tolist()
+    offsets = rng.normal(0, 2.0, orders)
+    quantities = rng.integers(1, 50, orders).tolist()
+    # Many wallets, since an order never trades against its own wallet's resting orders
+    wallets = [f"andr1bench{w}" for w in rng.integers(0, 1_000, orders).tolist()]
+    mid = 100.0 + np.cumsum(rng.normal(0, 0.01, orders))
+    # Buys rest below mid and sells above it, with enough overlap to trade
+    prices = np.round(np.where(np.array(sides) == BUY, mid - offsets, mid + offsets), 2).tolist()
+
+    latencies = np.empty(orders)
+    matched = 0
+    fills_total = 0
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for i in range(orders):
+        t0 = perf_counter()
+        _, fills = engine.submit(idea_ids[i], wallets[i], sides[i], quantities[i],
+                                 types[i], prices[i] if types[i] == LIMIT else None, timestamp=0.0)
+        latencies[i] = perf_counter() - t0
+        if fills:
+            matched += 1
+            fills_total += len(fills)
+    elapsed = perf_counter() - start
+    engine.close()
+
+    return {
+        "name": "order_matching",
+        "orders": orders,
+        "books": ideas,
+        "journal": bool(journal_dir),
+        "seconds": elapsed,
+        "orders_per_sec": orders / elapsed,
+        "matched_orders_per_sec": matched / elapsed,
+        "fills": fills_total,
+        "p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "p99_us": float(np.percentile(latencies, 99) * 1e6),
+        "max_us": float(latencies.max() * 1e6),
+    }
+
+
+def run_ledger_benchmark(events: int = 5_000_000, wallets: int = 100_000, ideas: int = 10_000,
+                         seed: int = 42, directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write a synthetic event log and time a full replay and a snapshot + tail replay
+
+    Records are generated directly as EVENT_DTYPE arrays (80% purchases,
+    15% transfers, 5% royalties) so the write side measures disk throughput
+    rather than Python tuple handling.
+    """
+    import numpy as np
+    from event_ledger import EventLedger, EVENT_DTYPE, PURCHASE, TRANSFER, ROYALTY, RECORD_SIZE
+
+    directory = directory or tempfile.mkdtemp(prefix="ipinvest-ledger-")
+    rng = np.random.default_rng(seed)
+    records = np.zeros(events, dtype=EVENT_DTYPE)
+    records["seq"] = np.arange(1, events + 1)
+    records["ts"] = 1_700_000_000_000_000 + records["seq"].astype(np.int64) * 1000
+    records["kind"] = rng.choice([PURCHASE, TRANSFER, ROYALTY], events, p=[0.80, 0.15, 0.05])
+    records["idea_id"] = rng.integers(1, ideas + 1, events)
+    records["dst"] = rng.integers(1, wallets + 1, events)
+    transfer = records["kind"] == TRANSFER
+    records["src"][transfer] = rng.integers(1, wallets + 1, int(transfer.sum()))
+    records["tokens"] = np.where(records["kind"] == ROYALTY, 0, rng.integers(1, 100, events))
+    records["amount"] = rng.random(events) * 1000
+
+    ledger = EventLedger(directory, snapshot_every=None)
+    start = time.perf_counter()
+    for lo in range(0, events, ledger.segment_events):
+        chunk = records[lo:lo + ledger.segment_events]
+        with open(os.path.join(directory, f"segment-{lo + 1:016d}.log"), "wb") as f:
+            f.write(chunk.tobytes())
+    write_seconds = time.perf_counter() - start
+    ledger.close()
+
+    ledger = EventLedger(directory, snapshot_every=None)
+    start = time.perf_counter()
+    state = ledger.rebuild(use_snapshot=False)
+    replay_seconds = time.perf_counter() - start
+    ledger.snapshot()
+
+    tail = min(events // 100 or 1, 100_000)
+    ledger.append_many([(PURCHASE, 1, 1, 1.0, None, "andr1tail", 0.0)] * tail)
+    ledger.close()
+    start = time.perf_counter()
+    ledger = EventLedger(directory, snapshot_every=None)
+    restart_seconds = time.perf_counter() - start
+    ledger.close()
+
+    return {
+        "name": "ledger_replay",
+        "events": events,
+        "bytes": events * RECORD_SIZE,
+        "write_seconds": write_seconds,
+        "replay_seconds": replay_seconds,
+        "replay_events_per_sec": events / replay_seconds,
+        "open_positions": int(len(state.holding_keys)),
+        "tail_events": tail,
+        "restart_from_snapshot_seconds": restart_seconds,
+    }
+
+
+class _LegacyInvestorProfile:
+    """InvestorProfile as it was before __slots__: a __dict__ object holding a list of dicts"""
+
+    def __init__(self, name, wallet_address, risk_preference):
+        self.name = name
+        self.wallet_address = wallet_address
+        self.risk_preference = risk_preference
+        self.investments = []
+
+    def add_investment(self, idea_title, tokens_owned):
+        self.investments.append({"idea": idea_title, "tokens": tokens_owned})
+
+
+def run_holdings_benchmark(holdings: int = 1_000_000, wallets: int = 50_000, ideas: int = 20_000,
+                           seed: int = 42) -> Dict[str, Any]:
+    """
+    Memory and group-by speed of the holdings representations in data_structures.py
+
+    Compares the old dict-based InvestorProfile, the __slots__ InvestorProfile
+    and the columnar HoldingsStore on the same random holdings.
+    """
+    import tracemalloc
+    import numpy as np
+    from data_structures import HoldingsStore, InvestorProfile
+
+    rng = np.random.default_rng(seed)
+    wallet_col = rng.integers(0, wallets, holdings)
+    idea_col = rng.integers(0, ideas, holdings)
+    token_col = rng.integers(1, 100, holdings)
+    wallet_names = [f"andr1wallet{i}" for i in range(wallets)]
+    idea_titles = [f"Idea {i}" for i in range(ideas)]
+    rows = list(zip(wallet_col.tolist(), idea_col.tolist(), token_col.tolist()))
+
+    def build_profiles(cls):
+        profiles = [cls(f"Investor {i}", wallet_names[i], "moderate") for i in range(wallets)]
+        for wallet, idea, tokens in rows:
+            profiles[wallet].add_investment(idea_titles[idea], tokens)
+        return profiles
+
+    def build_store():
+        return HoldingsStore.from_rows((wallet_names[w], idea_titles[i], t) for w, i, t in rows)
+
+    def per_wallet_profiles(profiles):
+        return {p.wallet_address: sum(h["tokens"] for h in p.investments) for p in profiles}
+
+    def per_idea_profiles(profiles):
+        totals = {}
+        for profile in profiles:
+            for holding in profile.investments:
+                totals[holding["idea"]] = totals.get(holding["idea"], 0) + holding["tokens"]
+        return totals
+
+    results = {}
+    for name, build, by_wallet, by_idea in (
+            ("dict_profiles", lambda: build_profiles(_LegacyInvestorProfile), per_wallet_profiles, per_idea_profiles),
+            ("slots_profiles", lambda: build_profiles(InvestorProfile), per_wallet_profiles, per_idea_profiles),
+            ("columnar_store", build_store, HoldingsStore.tokens_by_wallet, HoldingsStore.tokens_by_idea)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        container = build()
+        build_seconds = time.perf_counter() - start
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        by_wallet_ms = time_callable(lambda: by_wallet(container), repeat=3, budget=30)["median_ms"]
+        by_idea_ms = time_callable(lambda: by_idea(container), repeat=3, budget=30)["median_ms"]
+        results[name] = {
+            "build_seconds": build_seconds,
+            "bytes": allocated,
+            "bytes_per_holding": allocated / holdings,
+            "by_wallet_ms": by_wallet_ms,
+            "by_idea_ms": by_idea_ms,
+        }
+        del container
+    return {"name": "holdings_store", "holdings": holdings, "wallets": wallets, "ideas": ideas,
+            "results": results}
+
+
+def run_portfolio_benchmark(positions: int = 1_000_000, wallets: int = 100_000, ideas: int = 20_000,
+                            seed: int = 42) -> Dict[str, Any]:
+    """
+    Portfolio analytics for every wallet: per-wallet Python loops vs one sparse pass
+
+    Both compute total value, field exposure, HHI and the top 5 positions.
+    """
+    import numpy as np
+    import pandas as pd
+    from portfolio_analytics import TOP_POSITIONS, compute_snapshot
+
+    rng = np.random.default_rng(seed)
+    fields = ["Quantum Computing", "Healthcare AI", "Clean Energy", "Blockchain", "Biotech", "Robotics"]
+    idea_frame = pd.DataFrame({
+        "id": np.arange(1, ideas + 1),
+        "title": [f"Idea {i}" for i in range(ideas)],
+        "field": rng.choice(fields, ideas),
+        "token_price": rng.uniform(100, 5000, ideas).round(2),
+    })
+    pairs = np.unique(rng.integers(0, wallets, positions) * ideas + rng.integers(0, ideas, positions))
+    tokens = rng.integers(1, 100, len(pairs))
+    position_frame = pd.DataFrame({
+        "wallet": pd.Categorical.from_codes(pairs // ideas, [f"andr1wallet{i}" for i in range(wallets)]).astype(str),
+        "idea_id": pairs % ideas + 1,
+        "tokens": tokens,
+        "cost": tokens * 100.0,
+    })
+
+    def per_wallet_loops():
+        price = dict(zip(idea_frame["id"], idea_frame["token_price"]))
+        field = dict(zip(idea_frame["id"], idea_frame["field"]))
+        holdings = {}
+        for wallet, idea_id, held in zip(position_frame["wallet"], position_frame["idea_id"], position_frame["tokens"]):
+            holdings.setdefault(wallet, []).append((idea_id, held * price[idea_id]))
+        results = {}
+        for wallet, rows in holdings.items():
+            total = sum(value for _, value in rows)
+            exposure = {}
+            for idea_id, value in rows:
+                exposure[field[idea_id]] = exposure.get(field[idea_id], 0) + value / total
+            hhi = sum((value / total) ** 2 for _, value in rows)
+            top = sorted(rows, key=lambda row: -row[1])[:TOP_POSITIONS]
+            results[wallet] = (total, exposure, hhi, top)
+        return results
+
+    loop_ms = time_callable(per_wallet_loops, repeat=3, budget=60)["median_ms"]
+    sparse_ms = time_callable(lambda: compute_snapshot(position_frame, idea_frame), repeat=5, budget=60)["median_ms"]
+    return {"name": "portfolio_analytics", "positions": len(pairs), "wallets": wallets, "ideas": ideas,
+            "per_wallet_loops_ms": loop_ms, "sparse_pass_ms": sparse_ms, "speedup": loop_ms / sparse_ms}
+
+
+def run_chain_benchmark(queries: int = 500, slow_rate: float = 0.05, slow_seconds: float = 1.0,
+                        seed: int = 42) -> Dict[str, Any]:
+    """
+    Chain query latency with one degraded node
+
+    Three local REST stubs; the first delays `slow_rate` of its requests by
+    `slow_seconds`. Compares querying it directly (the old single-URL
+    behaviour) with the hedged, failover-aware ChainClient over all three.
+    """
+    import numpy as np
+    from chain_client import ChainClient
+    from chain_stub import LocalChainREST
+
+    nodes = [LocalChainREST().start() for _ in range(3)]
+    for node in nodes:
+        node.balances["andr1bench"] = {"uandr": 1_000_000}
+    nodes[0].inject(slow_rate=slow_rate, slow_seconds=slow_seconds, seed=seed)
+    path = "/cosmos/bank/v1beta1/balances/andr1bench"
+
+    def measure(client):
+        latencies = []
+        for _ in range(queries):
+            start = time.perf_counter()
+            client.get(path)
+            latencies.append(time.perf_counter() - start)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": max(latencies) * 1000}
+
+    try:
+        single = ChainClient([nodes[0].url], hedge_after=60, timeout=30, deadline=30)
+        hedged = ChainClient([node.url for node in nodes])
+        results = {"single_endpoint": measure(single), "hedged": {**measure(hedged), **hedged.stats()}}
+        single.close()
+        hedged.close()
+    finally:
+        for node in nodes:
+            node.stop()
+    return {"name": "chain_queries", "queries": queries, "slow_rate": slow_rate, "slow_seconds": slow_seconds,
+            "results": results}
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD, metric: str = "median_ms") -> List[Dict[str, Any]]:
+    """
+    Compare two result files
+
+    Returns:
+        One row per benchmark/size present in both runs; `regression` is set
+        when current is slower than baseline by more than `threshold`.
+    """
+    old = {(r["name"], r["rows"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["name"], r["rows"])
+        if key not in old:
+            continue
+        before, after = old[key][metric], r[metric]
+        ratio = after / before if before else float("inf")
+        rows.append({
+            "name": r["name"],
+            "rows": r["rows"],
+            "baseline": before,
+            "current": after,
+            "ratio": ratio,
+            "regression": ratio > 1.0 + threshold,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPInvest micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run benchmarks and write JSON results")
+    run.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                     help="comma-separated investment row counts")
+    run.add_argument("--only", default="", help="comma-separated benchmark names (default: all)")
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                     help="max seconds per benchmark once one iteration has run")
+    run.add_argument("--output", default="-", help="output file (default: stdout)")
+
+    match = sub.add_parser("matching", help="order book matching throughput and latency")
+    match.add_argument("--orders", type=int, default=1_000_000)
+    match.add_argument("--books", type=int, default=100)
+    match.add_argument("--journal", action="store_true", help="journal every order to a scratch directory")
+
+    led = sub.add_parser("ledger", help="event ledger replay throughput")
+    led.add_argument("--events", type=int, default=5_000_000)
+    led.add_argument("--wallets", type=int, default=100_000)
+    led.add_argument("--ideas", type=int, default=10_000)
+
+    hold = sub.add_parser("holdings", help="holdings container memory and group-by speed")
+    hold.add_argument("--holdings", type=int, default=1_000_000)
+    hold.add_argument("--wallets", type=int, default=50_000)
+    hold.add_argument("--ideas", type=int, default=20_000)
+
+    port = sub.add_parser("portfolio", help="portfolio risk analytics for every wallet")
+    port.add_argument("--positions", type=int, default=1_000_000)
+    port.add_argument("--wallets", type=int, default=100_000)
+    port.add_argument("--ideas", type=int, default=20_000)
+
+    chain = sub.add_parser("chain", help="chain query tail latency with one degraded node")
+    chain.add_argument("--queries", type=int, default=500)
+    chain.add_argument("--slow-rate", type=float, default=0.05)
+    chain.add_argument("--slow-seconds", type=float, default=1.0)
+
+    cmp = sub.add_parser("compare", help="flag regressions between two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                     help="allowed slowdown as a fraction (default: 0.10)")
+    cmp.add_argument("--metric", default="median_ms")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        names = [n for n in args.only.split(",") if n] or None
+        unknown = set(names or []) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        report = run_benchmarks(sizes, names, args.repeat, args.budget)
+        text = json.dumps(report, indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        return 0
+
+    if args.command == "matching":
+        journal_dir = tempfile.mkdtemp(prefix="ipinvest-journal-") if args.journal else None
+        print(json.dumps(run_matching_benchmark(args.orders, args.books, journal_dir=journal_dir), indent=2))
+        return 0
+
+    if args.command == "holdings":
+        print(json.dumps(run_holdings_benchmark(args.holdings, args.wallets, args.ideas), indent=2))
+        return 0
+
+    if args.command == "portfolio":
+        print(json.dumps(run_portfolio_benchmark(args.positions, args.wallets, args.ideas), indent=2))
+        return 0
+
+    if args.command == "chain":
+        print(json.dumps(run_chain_benchmark(args.queries, args.slow_rate, args.slow_seconds), indent=2))
+        return 0
+
+    if args.command == "ledger":
+        print(json.dumps(run_ledger_benchmark(args.events, args.wallets, args.ideas), indent=2))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold, args.metric)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['name']:<24} rows={row['rows']:<9,} {row['baseline']:>10.3f} -> "
+              f"{row['current']:>10.3f} ({row['ratio']:.2f}x) {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
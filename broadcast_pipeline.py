@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Signed, pipelined transaction broadcasting for royalty runs
+Txs from the platform account are signed locally and broadcast in strict
+sequence order by one sender thread. Up to `max_in_flight` txs may be
+waiting for inclusion at once. A sequence mismatch (another process used
+the key, or a tx was dropped) resyncs from the chain and re-signs. Txs that
+never land are resubmitted.
+
+Usage:
+    IPINVEST_SIGNER_KEY=<hex> python broadcast_pipeline.py --amount 1000000
+    python broadcast_pipeline.py --amount 250000 --ideas 1,2,3 --per-tx 5
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from chain_client import ChainClient, ChainError, ChainUnavailable
+from cosmos_tx import PrivateKey, encode_broadcast, execute_contract_msg, sign_tx, tx_hash
+
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_GAS_PER_MESSAGE = 250_000
+DEFAULT_GAS_PRICE = 0.025
+DEFAULT_CONFIRM_TIMEOUT = 60.0
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_MAX_ATTEMPTS = 5
+# Finished jobs kept for status() lookups; the oldest are forgotten first
+DEFAULT_JOB_HISTORY = 10_000
+
+# Cosmos SDK error codes returned by CheckTx
+CODE_OK = 0
+CODE_WRONG_SEQUENCE = 32
+CODE_TX_IN_CACHE = 19
+
+_EXPECTED_SEQUENCE = re.compile(r"expected (\d+)")
+
+
+class TxResult:
+    __slots__ = ("txhash", "code", "height", "raw_log", "sequence", "attempts")
+
+    def __init__(self, txhash: str, code: int, height: int, raw_log: str, sequence: int, attempts: int):
+        self.txhash = txhash
+        self.code = code
+        self.height = height
+        self.raw_log = raw_log
+        self.sequence = sequence
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.code == CODE_OK
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Job:
+    __slots__ = ("id", "messages", "memo", "gas_limit", "future", "attempts", "sequence", "txhash", "sent_at")
+
+    def __init__(self, messages: List[bytes], memo: str, gas_limit: int):
+        self.id = uuid.uuid4().hex
+        self.messages = messages
+        self.memo = memo
+        self.gas_limit = gas_limit
+        self.future: Future = Future()
+        self.future.job_id = self.id
+        self.attempts = 0
+        self.sequence = -1
+        self.txhash = ""
+        self.sent_at = 0.0
+
+
+class BroadcastPipeline:
+    """
+    Sign and broadcast txs for one account
+
+    Args:
+        client: Chain REST client used for account, broadcast and tx queries
+        key: Signing key; its address is the tx signer
+        max_in_flight: Broadcast txs allowed to wait for inclusion at once
+        confirm_timeout: Seconds before an unconfirmed tx is assumed dropped and resubmitted
+    """
+
+    def __init__(self, client: ChainClient, key: PrivateKey, chain_id: str, prefix: str = "andr",
+                 denom: str = "uandr", gas_per_message: int = DEFAULT_GAS_PER_MESSAGE,
+                 gas_price: float = DEFAULT_GAS_PRICE, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 confirm_timeout: float = DEFAULT_CONFIRM_TIMEOUT, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, job_history: int = DEFAULT_JOB_HISTORY):
+        self.client = client
+        self.key = key
+        self.address = key.address(prefix)
+        self.chain_id = chain_id
+        self.denom = denom
+        self.gas_per_message = gas_per_message
+        self.gas_price = gas_price
+        self.max_in_flight = max_in_flight
+        self.confirm_timeout = confirm_timeout
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.job_history = job_history
+        self.account_number: Optional[int] = None
+        self.sequence: Optional[int] = None
+        # Set by the confirm thread; the sender reloads the sequence before its next tx
+        self._resync = True
+        self.stats = {"submitted": 0, "broadcasts": 0, "sequence_resyncs": 0, "resubmitted": 0,
+                      "confirmed": 0, "failed": 0}
+        self._queue: Deque[_Job] = deque()
+        self._in_flight: Dict[str, _Job] = {}
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._sending = False
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = [threading.Thread(target=self._send_loop, name="tx-sender", daemon=True),
+                         threading.Thread(target=self._confirm_loop, name="tx-confirm", daemon=True)]
+        self._poll_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tx-poll")
+        for thread in self._threads:
+            thread.start()
+
+    # -- public API ----------------------------------------------------------
+
+    def submit(self, messages: List[bytes], memo: str = "") -> Future:
+        """
+        Queue a tx; the future resolves to a TxResult once it is included (or fails for good)
+
+        The future's `job_id` can be passed to status() later.
+        """
+        job = _Job(messages, memo, self.gas_per_message * len(messages))
+        with self._cond:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.job_history:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.future.done():
+                    break
+                self._jobs.popitem(last=False)
+            self._queue.append(job)
+            self.stats["submitted"] += 1
+            self._cond.notify_all()
+        return job.future
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """queued, broadcast, confirmed or failed, with the TxResult or error once known; None if unknown"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        status = {"job_id": job.id, "txhash": job.txhash or None, "sequence": job.sequence, "attempts": job.attempts}
+        if not job.future.done():
+            return {**status, "state": "broadcast" if job.txhash else "queued"}
+        error = job.future.exception()
+        if error is not None:
+            return {**status, "state": "failed", "error": str(error)}
+        result = job.future.result()
+        return {**status, "state": "confirmed" if result.ok else "failed", "result": result.to_dict()}
+
+    def send_funds(self, contract: str, amount: int, msg: Optional[Dict[str, Any]] = None) -> bytes:
+        """Execute message paying `amount` of the pipeline denom into a contract (splitter `send` by default)"""
+        return execute_contract_msg(self.address, contract, msg or {"send": {}}, [(self.denom, amount)])
+
+    def close(self, wait: bool = True):
+        if wait:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._queue and not self._in_flight and not self._sending)
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._poll_pool.shutdown()
+
+    # -- sending -------------------------------------------------------------
+
+    def _load_account(self):
+        data = self.client.get(f"/cosmos/auth/v1beta1/accounts/{self.address}", call="tx_account")
+        account = data["account"]
+        # Vesting and module accounts nest the base account
+        account = account.get("base_account", account)
+        self.account_number = int(account.get("account_number") or 0)
+        self.sequence = int(account.get("sequence") or 0)
+
+    def _finish(self, job: _Job, result: TxResult):
+        self.stats["confirmed" if result.ok else "failed"] += 1
+        job.future.set_result(result)
+
+    def _fail(self, job: _Job, error: Exception):
+        self.stats["failed"] += 1
+        job.future.set_exception(error)
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                # Bounded pipeline: wait for a slot as well as for work
+                self._cond.wait_for(lambda: self._stopped.is_set() or
+                                    (self._queue and len(self._in_flight) < self.max_in_flight))
+                if self._stopped.is_set():
+                    return
+                job = self._queue.popleft()
+                self._sending = True
+            try:
+                self._send(job)
+            except Exception as e:
+                self._fail(job, e)
+            with self._cond:
+                self._sending = False
+                self._cond.notify_all()
+
+    def _send(self, job: _Job):
+        while True:
+            job.attempts += 1
+            if self._resync:
+                self._load_account()
+                self._resync = False
+            fee = (self.denom, int(job.gas_limit * self.gas_price) + 1)
+            tx_bytes = sign_tx(self.key, job.messages, self.chain_id, self.account_number, self.sequence,
+                               fee, job.gas_limit, job.memo)
+            job.sequence, job.txhash = self.sequence, tx_hash(tx_bytes)
+            self.stats["broadcasts"] += 1
+            try:
+                response = self.client.post("/cosmos/tx/v1beta1/txs", encode_broadcast(tx_bytes),
+                                            call="broadcast_tx")["tx_response"]
+            except ChainUnavailable:
+                # The node may have accepted it before the connection failed; the chain's
+                # sequence tells us which
+                self._load_account()
+                if self.sequence > job.sequence:
+                    response = {"code": CODE_OK, "txhash": job.txhash}
+                elif job.attempts < self.max_attempts:
+                    continue
+                else:
+                    raise
+            code = int(response.get("code") or 0)
+            if code in (CODE_OK, CODE_TX_IN_CACHE):
+                self.sequence = job.sequence + 1
+                job.sent_at = time.monotonic()
+                with self._cond:
+                    self._in_flight[job.txhash] = job
+                return
+            if code == CODE_WRONG_SEQUENCE and job.attempts < self.max_attempts:
+                self.stats["sequence_resyncs"] += 1
+                expected = _EXPECTED_SEQUENCE.search(response.get("raw_log") or "")
+                if expected:
+                    self.sequence = int(expected.group(1))
+                else:
+                    self._load_account()
+                continue
+            # Rejected by CheckTx; the sequence was not consumed
+            self._finish(job, TxResult(job.txhash, code, 0, response.get("raw_log", ""), job.sequence, job.attempts))
+            return
+
+    # -- confirming ----------------------------------------------------------
+
+    def _lookup(self, txhash: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.client.get(f"/cosmos/tx/v1beta1/txs/{txhash}", call="tx_status")["tx_response"]
+        except ChainError:
+            return None  # not included yet, or the node is unreachable; checked again next poll
+
+    def _chain_sequence(self) -> Optional[int]:
+        try:
+            account = self.client.get(f"/cosmos/auth/v1beta1/accounts/{self.address}", call="tx_account")["account"]
+            return int(account.get("base_account", account).get("sequence") or 0)
+        except ChainError:
+            return None
+
+    def _confirm_loop(self):
+        while not self._stopped.wait(self.poll_interval):
+            with self._cond:
+                pending = list(self._in_flight.values())
+            if not pending:
+                continue
+            found = list(self._poll_pool.map(lambda job: self._lookup(job.txhash), pending))
+            now = time.monotonic()
+            done, expired = [], []
+            for job, tx in zip(pending, found):
+                if tx is not None:
+                    done.append(job)
+                    self._finish(job, TxResult(job.txhash, int(tx.get("code") or 0), int(tx.get("height") or 0),
+                                               tx.get("raw_log", ""), job.sequence, job.attempts))
+                elif now - job.sent_at > self.confirm_timeout:
+                    expired.append(job)
+            chain_sequence = self._chain_sequence() if expired else None
+            if expired and chain_sequence is None:
+                expired = []  # cannot tell dropped from unindexed right now; look again next poll
+            with self._cond:
+                for job in done + expired:
+                    self._in_flight.pop(job.txhash, None)
+                for job in sorted(expired, key=lambda job: job.sequence, reverse=True):
+                    if job.sequence < chain_sequence:
+                        # Something used this sequence; sending again could pay twice
+                        self._fail(job, ChainError(f"tx {job.txhash} not found but sequence {job.sequence} "
+                                                   f"was used; not resubmitting"))
+                    elif job.attempts >= self.max_attempts:
+                        self._fail(job, ChainError(f"tx {job.txhash} was never included"))
+                    else:
+                        # Dropped from the mempool; later sequences are stuck behind it too,
+                        # so resync from the chain and send it again ahead of new work
+                        self.stats["resubmitted"] += 1
+                        self._queue.appendleft(job)
+                        self._resync = True
+                self._cond.notify_all()
+
+
+def distribute_royalties(pipeline: BroadcastPipeline, payouts: List[Tuple[str, int]],
+                         per_tx: int = 1) -> List[Future]:
+    """
+    Pay royalties into splitter contracts
+
+    Args:
+        payouts: (splitter contract, amount) pairs
+        per_tx: Splitter sends batched into each tx
+    """
+    futures = []
+    for start in range(0, len(payouts), per_tx):
+        batch = payouts[start:start + per_tx]
+        futures.append(pipeline.submit([pipeline.send_funds(contract, amount) for contract, amount in batch],
+                                       memo="ipinvest royalties"))
+    return futures
+
+
+def pipeline_from_env(client: Optional[ChainClient] = None) -> Optional[BroadcastPipeline]:
+    """Pipeline for the platform key in IPINVEST_SIGNER_KEY, or None if it is not set"""
+    from splitter_ado import ANDROMEDA_CHAIN_ID, CHAIN_REST_ENDPOINTS
+    from chain_client import shared_client
+
+    secret = os.environ.get("IPINVEST_SIGNER_KEY")
+    if not secret:
+        return None
+    return BroadcastPipeline(client or shared_client(CHAIN_REST_ENDPOINTS), PrivateKey.from_hex(secret),
+                             os.environ.get("IPINVEST_CHAIN_ID", ANDROMEDA_CHAIN_ID),
+                             max_in_flight=int(os.environ.get("IPINVEST_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pay royalties into every registered splitter contract")
+    parser.add_argument("--amount", type=int, required=True, help="amount per splitter, in uandr")
+    parser.add_argument("--ideas", default="", help="comma-separated idea ids (default: all with a splitter)")
+    parser.add_argument("--per-tx", type=int, default=1, help="splitter sends per tx")
+    args = parser.parse_args(argv)
+
+    pipeline = pipeline_from_env()
+    if pipeline is None:
+        parser.error("IPINVEST_SIGNER_KEY is not set")
+
+    from app import app, SplitterContract
+
+    with app.app_context():
+        query = SplitterContract.query
+        if args.ideas:
+            query = query.filter(SplitterContract.idea_id.in_([int(i) for i in args.ideas.split(",")]))
+        payouts = [(contract.address, args.amount) for contract in query.all()]
+
+    start = time.perf_counter()
+    futures = distribute_royalties(pipeline, payouts, args.per_tx)
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result().to_dict())
+        except ChainError as e:
+            results.append({"error": str(e)})
+    pipeline.close()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"txs": len(futures), "seconds": round(elapsed, 2),
+                      "txs_per_minute": round(len(futures) / elapsed * 60, 1) if elapsed else None,
+                      "stats": pipeline.stats, "results": results}, indent=2))
+    return 0 if all(r.get("code") == CODE_OK for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
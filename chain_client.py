@@ -0,0 +1,369 @@
+"""
+Resilient chain REST queries
+Every call has a deadline. Each endpoint sits behind its own circuit breaker.
+A request that has not answered within the hedge delay (the observed p95
+latency, capped) is duplicated to the next healthy endpoint, and the first answer
+wins. When every endpoint fails, the call is retried with jittered
+exponential backoff until the deadline. One stalled or flapping node
+therefore costs roughly one hedge delay instead of a hung request.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import REGISTRY, track_upstream
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_DEADLINE = 10.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.1
+DEFAULT_BACKOFF_CAP = 2.0
+DEFAULT_HEDGE_AFTER = 0.25
+MIN_HEDGE_AFTER = 0.02
+HEDGE_QUANTILE = 0.95
+LATENCY_WINDOW = 256
+# A demoted endpoint's latency estimate is forgotten after this long, so it gets traffic again
+LATENCY_TTL = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+DEFAULT_WORKERS = 16
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ChainError(Exception):
+    """A chain query failed"""
+
+
+class ChainRequestError(ChainError):
+    """The node rejected the request (4xx); retrying elsewhere will not help"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ChainUnavailable(ChainError):
+    """No endpoint answered before the deadline"""
+
+
+class _Retryable(Exception):
+    """Attempt failed in a way another endpoint or a retry may fix"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one endpoint
+
+    After `failure_threshold` failures in a row the breaker opens and the
+    endpoint is skipped for `reset_timeout` seconds. Then a single probe
+    request is let through: success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Would a request be let through now (without claiming the probe)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.reset_timeout
+        return not self._probing
+
+    def acquire(self) -> bool:
+        """Claim permission to send a request"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self.times_opened += 1
+                return True
+            return False
+
+
+class Endpoint:
+    """One REST base URL with its session, breaker and latency estimate"""
+
+    def __init__(self, url: str, breaker: CircuitBreaker, pool_size: int):
+        self.url = url.rstrip("/")
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.ewma_latency: Optional[float] = None
+        self.observed_at = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def observe(self, seconds: float):
+        self.ewma_latency = seconds if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * seconds
+        self.observed_at = time.monotonic()
+
+    def latency(self) -> Optional[float]:
+        if self.ewma_latency is not None and time.monotonic() - self.observed_at > LATENCY_TTL:
+            self.ewma_latency = None
+        return self.ewma_latency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "requests": self.requests,
+            "failures": self.failures,
+            "times_opened": self.breaker.times_opened,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 2) if self.ewma_latency is not None else None,
+        }
+
+
+def parse_endpoints(urls: Union[str, Iterable[str]]) -> List[str]:
+    """'https://a, https://b' or a list -> ['https://a', 'https://b']"""
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    return [url.strip().rstrip("/") for url in urls if url and url.strip()]
+
+
+class ChainClient:
+    """
+    GET JSON from the first of several equivalent chain REST endpoints to answer
+
+    Args:
+        endpoints: Base URLs, in order of preference
+        timeout: Cap on a single attempt
+        deadline: Cap on the whole call, including hedges and retries
+        retries: Extra rounds after every endpoint has failed
+        hedge_after: Longest wait before hedging; once enough latencies have
+            been observed the delay tracks their p95 below this cap
+        max_hedges: Extra concurrent requests per round for slow endpoints
+    """
+
+    def __init__(self, endpoints: Union[str, Sequence[str]], timeout: float = DEFAULT_TIMEOUT,
+                 deadline: float = DEFAULT_DEADLINE, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, backoff_cap: float = DEFAULT_BACKOFF_CAP,
+                 hedge_after: float = DEFAULT_HEDGE_AFTER, max_hedges: int = 1,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 max_workers: int = DEFAULT_WORKERS, clock=time.monotonic):
+        urls = parse_endpoints(endpoints)
+        if not urls:
+            raise ValueError("at least one chain endpoint is required")
+        self.endpoints = [Endpoint(url, CircuitBreaker(failure_threshold, reset_timeout, clock), max_workers)
+                          for url in urls]
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.hedge_after = hedge_after
+        self.max_hedges = max_hedges
+        self.clock = clock
+        self.hedges = 0
+        self.retried = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chain-query")
+
+    def hedge_delay(self) -> float:
+        """Observed p95 latency, capped at hedge_after so a degraded fleet cannot push it up"""
+        samples = list(self._latencies)
+        if len(samples) < 20:
+            return self.hedge_after
+        samples.sort()
+        return min(self.hedge_after, max(MIN_HEDGE_AFTER, samples[int(HEDGE_QUANTILE * (len(samples) - 1))]))
+
+    def _candidates(self) -> List[Endpoint]:
+        """Endpoints whose breaker would let a request through, configured order first, then faster"""
+        available = [(i, ep, ep.latency()) for i, ep in enumerate(self.endpoints) if ep.breaker.available()]
+        # Only reorder on a clear latency gap so the preferred endpoint keeps most of the traffic
+        fastest = min((latency for _, _, latency in available if latency is not None), default=None)
+        return [ep for _, ep, _ in sorted(available, key=lambda item: (
+            fastest is not None and item[2] is not None and item[2] > 3 * fastest, item[0]))]
+
+    def _attempt(self, endpoint: Endpoint, method: str, path: str, params: Optional[Dict[str, Any]],
+                 body: Optional[Dict[str, Any]], timeout: float, call: str) -> Dict[str, Any]:
+        endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            with track_upstream(call):
+                response = endpoint.session.request(method, f"{endpoint.url}{path}", params=params, json=body,
+                                                    timeout=timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise _Retryable(f"{endpoint.url}: HTTP {response.status_code}")
+                if response.status_code >= 400:
+                    # The node is healthy; the request itself is wrong
+                    endpoint.breaker.record_success()
+                    raise ChainRequestError(response.status_code, response.text[:200])
+                data = response.json()
+        except ChainRequestError:
+            raise
+        except (requests.RequestException, ValueError, _Retryable) as e:
+            endpoint.failures += 1
+            if endpoint.breaker.record_failure():
+                REGISTRY.upstream_circuit_open_total.inc((endpoint.url,))
+            raise _Retryable(str(e)) from e
+        elapsed = time.perf_counter() - start
+        endpoint.breaker.record_success()
+        endpoint.observe(elapsed)
+        self._latencies.append(elapsed)
+        return data
+
+    def _round(self, method: str, path: str, params: Optional[Dict[str, Any]], body: Optional[Dict[str, Any]],
+               call: str, deadline_at: float, max_hedges: int) -> Dict[str, Any]:
+        """One pass over the endpoints: hedge slow ones, fail over on errors, first success wins"""
+        candidates = iter(self._candidates())
+        running = {}
+        hedges = 0
+        errors = []
+
+        def launch() -> bool:
+            for endpoint in candidates:
+                if endpoint.breaker.acquire():
+                    timeout = max(0.001, min(self.timeout, deadline_at - self.clock()))
+                    future = self._pool.submit(self._attempt, endpoint, method, path, params, body, timeout, call)
+                    running[future] = (endpoint, time.perf_counter())
+                    return True
+            return False
+
+        if not launch():
+            raise _Retryable("all endpoint circuits are open")
+        hedge_delay = self.hedge_delay()
+        while running:
+            remaining = deadline_at - self.clock()
+            if remaining <= 0:
+                raise ChainUnavailable(f"{call}: deadline exceeded")
+            can_hedge = hedges < max_hedges
+            done, _ = wait(running, timeout=min(hedge_delay, remaining) if can_hedge else remaining,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and launch():
+                    hedges += 1
+                    self.hedges += 1
+                    REGISTRY.upstream_hedges_total.inc((call,))
+                else:
+                    # Nothing left to hedge with; just wait for what is in flight
+                    hedges = max_hedges
+                continue
+            for future in done:
+                running.pop(future)
+                try:
+                    result = future.result()
+                except _Retryable as e:
+                    errors.append(str(e))
+                    # Fail over right away instead of waiting out the hedge delay
+                    launch()
+                    continue
+                # Endpoints that lost the race are at least this slow; demote them now
+                # rather than when their answer eventually arrives
+                now = time.perf_counter()
+                for endpoint, started in running.values():
+                    endpoint.observe(now - started)
+                return result
+        raise _Retryable("; ".join(errors) or "no endpoint available")
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, call: str = "chain_query",
+            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        GET a JSON document
+
+        Raises:
+            ChainRequestError: The node rejected the request (4xx)
+            ChainUnavailable: No endpoint answered before the deadline
+        """
+        return self._call("GET", path, params, None, call, deadline, self.max_hedges)
+
+    def post(self, path: str, body: Dict[str, Any], call: str = "chain_post",
+             deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        POST a JSON document, e.g. a signed tx broadcast
+
+        Not hedged; fails over and retries like get(). Only use it for requests
+        that are safe to repeat: a re-broadcast signed tx is rejected by the
+        node as a duplicate rather than applied twice.
+        """
+        return self._call("POST", path, None, body, call, deadline, 0)
+
+    def _call(self, method: str, path: str, params: Optional[Dict[str, Any]], body: Optional[Dict[str, Any]],
+              call: str, deadline: Optional[float], max_hedges: int) -> Dict[str, Any]:
+        deadline_at = self.clock() + (deadline if deadline is not None else self.deadline)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                return self._round(method, path, params, body, call, deadline_at, max_hedges)
+            except _Retryable as e:
+                last_error = e
+            remaining = deadline_at - self.clock()
+            if attempt == self.retries or remaining <= 0:
+                break
+            # Full jitter so clients that failed together do not retry together
+            self.retried += 1
+            REGISTRY.upstream_retries_total.inc((call,))
+            time.sleep(min(remaining, random.uniform(0, min(self.backoff_cap, self.backoff * 2 ** attempt))))
+        raise ChainUnavailable(f"{call} failed on every endpoint: {last_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 2),
+            "hedges": self.hedges,
+            "retries": self.retried,
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            endpoint.session.close()
+
+
+_clients: Dict[tuple, ChainClient] = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(endpoints: Union[str, Sequence[str]], **kwargs) -> ChainClient:
+    """
+    One ChainClient per endpoint list, so breaker state and latency history
+    survive across the short-lived objects (e.g. SplitterADO) that use it
+    """
+    key = tuple(parse_endpoints(endpoints))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = ChainClient(list(key), **kwargs)
+        return client
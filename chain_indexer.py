@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Chain indexer for splitter royalty payouts
+Streams wasm execute and bank transfer events for registered splitter
+contracts from the chain REST API, stores deposits and payouts locally with
+a per-contract height checkpoint, and reconciles payouts against Investment
+holdings so royalty dashboards never query the chain live.
+
+Usage:
+    python chain_indexer.py --rest https://rest.andromeda-1.andromeda.io
+    python chain_indexer.py --follow --interval 6
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from chain_client import ChainClient, ChainError
+
+DEFAULT_DENOM = "uandr"
+DEFAULT_PAGE_LIMIT = 100
+DEFAULT_WINDOW = 10_000
+DEFAULT_WORKERS = 8
+CREATOR_SHARE = 0.7
+INVESTOR_SHARE = 0.3
+
+DEPOSIT = "deposit"
+PAYOUT = "payout"
+# IndexerCheckpoint whose height holds the last RoyaltyPayout.id written to the event ledger
+LEDGER_FEED_CHECKPOINT = "ledger:royalty-payouts"
+LEDGER_FEED_BATCH = 1_000
+
+# Tx search keys whose value is a splitter's address
+CONTRACT_EVENTS = ("wasm._contract_address", "transfer.recipient", "transfer.sender")
+
+_COIN = re.compile(r"(\d+)([a-zA-Z][a-zA-Z0-9/:._-]*)")
+
+
+def parse_coins(amount: str) -> List[Tuple[int, str]]:
+    """'700uandr,5ibc/ABC' -> [(700, 'uandr'), (5, 'ibc/ABC')]"""
+    return [(int(value), denom) for value, denom in _COIN.findall(amount or "")]
+
+
+def tx_events(tx_response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flat event list; SDK 0.50 returns `events`, older nodes nest them under `logs`"""
+    if tx_response.get("events"):
+        return tx_response["events"]
+    return [event for log in tx_response.get("logs") or [] for event in log.get("events", [])]
+
+
+def extract_transfers(tx_response: Dict[str, Any], contracts: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Bank transfers into (deposits) and out of (payouts) splitter contracts
+
+    Each row is keyed by (tx_hash, event_index, denom) so re-indexing a
+    window never double counts.
+    """
+    if int(tx_response.get("code") or 0) != 0:
+        return []
+    contracts = set(contracts)
+    rows = []
+    for index, event in enumerate(tx_events(tx_response)):
+        if event.get("type") != "transfer":
+            continue
+        attrs = {a["key"]: a.get("value") for a in event.get("attributes", [])}
+        sender, recipient = attrs.get("sender"), attrs.get("recipient")
+        if sender in contracts:
+            kind, contract, counterparty = PAYOUT, sender, recipient
+        elif recipient in contracts:
+            kind, contract, counterparty = DEPOSIT, recipient, sender
+        else:
+            continue
+        for amount, denom in parse_coins(attrs.get("amount")):
+            rows.append({
+                "tx_hash": tx_response["txhash"],
+                "event_index": index,
+                "height": int(tx_response["height"]),
+                "kind": kind,
+                "contract_address": contract,
+                "counterparty": counterparty,
+                "amount": amount,
+                "denom": denom,
+                "timestamp": tx_response.get("timestamp"),
+            })
+    return rows
+
+
+class ChainEventSource:
+    """
+    Paginated tx search against the Cosmos REST API
+
+    The first page of every contract query is fetched concurrently to
+    learn the totals, then all remaining pages across all queries are
+    fetched concurrently in one pool.
+    """
+
+    def __init__(self, rest_url: str, page_limit: int = DEFAULT_PAGE_LIMIT, max_workers: int = DEFAULT_WORKERS,
+                 timeout: float = 10.0, query_param: str = "query"):
+        self.page_limit = page_limit
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Cosmos SDK >= 0.50 takes `query`; older nodes take `events`
+        self.query_param = query_param
+        # rest_url may list several endpoints; pages are hedged and fail over between them
+        self.client = ChainClient(rest_url, timeout=timeout, deadline=3 * timeout, max_workers=2 * max_workers)
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None, call: str = "indexer_txs") -> Dict[str, Any]:
+        return self.client.get(path, params, call=call)
+
+    def latest_height(self) -> int:
+        data = self._get("/cosmos/base/tendermint/v1beta1/blocks/latest", call="indexer_latest_block")
+        return int(data["block"]["header"]["height"])
+
+    def _page(self, query: str, page: int) -> Dict[str, Any]:
+        return self._get("/cosmos/tx/v1beta1/txs", {
+            self.query_param: query, "page": page, "limit": self.page_limit, "order_by": "ORDER_BY_ASC",
+        })
+
+    def fetch(self, ranges: List[Tuple[str, int, int]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Tx responses per contract for inclusive (contract, from_height, to_height) ranges
+
+        Each contract is searched three ways: contract executions, and bank
+        transfers to and from its address, since a plain MsgSend deposit
+        emits no wasm event. Txs matching several searches are kept once.
+
+        Returns:
+            contract address -> tx responses ordered by height
+        """
+        queries = {(contract, event): f"{event}='{contract}' AND tx.height>={lo} AND tx.height<={hi}"
+                   for contract, lo, hi in ranges for event in CONTRACT_EVENTS}
+        results: Dict[str, List[Dict[str, Any]]] = {contract: [] for contract, _, _ in ranges}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            first_pages = dict(zip(queries, pool.map(lambda key: self._page(queries[key], 1), queries)))
+            pending = []
+            for key, data in first_pages.items():
+                results[key[0]].extend(data.get("tx_responses") or [])
+                total = int(data.get("total") or (data.get("pagination") or {}).get("total") or 0)
+                pages = -(-total // self.page_limit)
+                pending.extend((key, page) for page in range(2, pages + 1))
+            for (key, _), data in zip(pending, pool.map(lambda job: self._page(queries[job[0]], job[1]),
+                                                        pending)):
+                results[key[0]].extend(data.get("tx_responses") or [])
+        for contract, txs in results.items():
+            seen = set()
+            results[contract] = [tx for tx in sorted(txs, key=lambda tx: int(tx["height"]))
+                                 if not (tx["txhash"] in seen or seen.add(tx["txhash"]))]
+        return results
+
+
+class ChainIndexer:
+    """
+    Index splitter deposits and payouts into the local database
+
+    Every registered SplitterContract has its own checkpoint, so a contract
+    registered later is backfilled from its start height without rewinding
+    the others. Each window is committed together with the checkpoint.
+    """
+
+    def __init__(self, source: ChainEventSource, window: int = DEFAULT_WINDOW,
+                 on_payouts: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.source = source
+        self.window = window
+        self.on_payouts = on_payouts
+
+    def run_once(self) -> Dict[str, Any]:
+        """Index every contract up to the current chain height"""
+        from app import db, SplitterContract, IndexerCheckpoint
+
+        latest = self.source.latest_height()
+        stats = {"latest_height": latest, "windows": 0, "txs": 0, "deposits": 0, "payouts": 0}
+        while True:
+            contracts = {c.address: c for c in SplitterContract.query.all()}
+            checkpoints = {cp.name: cp for cp in IndexerCheckpoint.query.filter(
+                IndexerCheckpoint.name.in_([checkpoint_name(a) for a in contracts]))}
+            ranges = []
+            for address, contract in contracts.items():
+                checkpoint = checkpoints.get(checkpoint_name(address))
+                lo = checkpoint.height + 1 if checkpoint else contract.start_height
+                if lo <= latest:
+                    ranges.append((address, lo, min(lo + self.window - 1, latest)))
+            if not ranges:
+                return stats
+
+            txs = self.source.fetch(ranges)
+            rows = []
+            for address, responses in txs.items():
+                stats["txs"] += len(responses)
+                for tx in responses:
+                    rows.extend(row for row in extract_transfers(tx, [address])
+                                if row["contract_address"] == address)
+            new_rows = self._store(rows, contracts)
+            for address, _, hi in ranges:
+                name = checkpoint_name(address)
+                checkpoint = checkpoints.get(name) or IndexerCheckpoint(name=name)
+                checkpoint.height = hi
+                checkpoint.updated_at = datetime.utcnow()
+                db.session.add(checkpoint)
+            reconcile_payouts({contracts[row["contract_address"]].idea_id for row in new_rows})
+            db.session.commit()
+
+            stats["windows"] += 1
+            stats["deposits"] += sum(1 for row in new_rows if row["kind"] == DEPOSIT)
+            stats["payouts"] += sum(1 for row in new_rows if row["kind"] == PAYOUT)
+            payouts = [row for row in new_rows if row["kind"] == PAYOUT]
+            if payouts and self.on_payouts:
+                self.on_payouts(payouts)
+
+    def _store(self, rows: List[Dict[str, Any]], contracts) -> List[Dict[str, Any]]:
+        """Insert rows not seen before; returns them with idea ids attached"""
+        from app import db, RoyaltyPayout
+
+        if not rows:
+            return []
+        keys = {(row["tx_hash"], row["event_index"], row["denom"]) for row in rows}
+        existing = set(db.session.query(RoyaltyPayout.tx_hash, RoyaltyPayout.event_index, RoyaltyPayout.denom)
+                       .filter(RoyaltyPayout.tx_hash.in_({k[0] for k in keys})).all())
+        new_rows = []
+        for row in rows:
+            key = (row["tx_hash"], row["event_index"], row["denom"])
+            if key in existing:
+                continue
+            existing.add(key)
+            row["idea_id"] = contracts[row["contract_address"]].idea_id
+            db.session.add(RoyaltyPayout(
+                idea_id=row["idea_id"], contract_address=row["contract_address"], kind=row["kind"],
+                counterparty=row["counterparty"], amount=row["amount"], denom=row["denom"],
+                height=row["height"], tx_hash=row["tx_hash"], event_index=row["event_index"],
+                block_time=_parse_time(row["timestamp"])))
+            new_rows.append(row)
+        return new_rows
+
+
+def checkpoint_name(contract_address: str) -> str:
+    return f"splitter:{contract_address}"
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def feed_ledger(ledger, batch_size: int = LEDGER_FEED_BATCH, denom: str = DEFAULT_DENOM) -> int:
+    """
+    Append indexed payouts not yet in the event ledger, oldest first
+
+    Run by the process that owns the ledger; the indexer itself only writes
+    RoyaltyPayout rows, so a separate indexer process never appends to a
+    ledger directory another process has open. Returns the events appended.
+    """
+    from app import db, IndexerCheckpoint, RoyaltyPayout
+
+    checkpoint = db.session.get(IndexerCheckpoint, LEDGER_FEED_CHECKPOINT) or \
+        IndexerCheckpoint(name=LEDGER_FEED_CHECKPOINT, height=0)
+    appended = 0
+    while True:
+        rows = RoyaltyPayout.query.filter(RoyaltyPayout.id > checkpoint.height, RoyaltyPayout.kind == PAYOUT,
+                                          RoyaltyPayout.denom == denom).order_by(RoyaltyPayout.id) \
+            .limit(batch_size).all()
+        if not rows:
+            return appended
+        for row in rows:
+            at = row.block_time.replace(tzinfo=timezone.utc).timestamp() if row.block_time else None
+            ledger.append_royalty(row.counterparty, row.idea_id, row.amount / 1_000_000, timestamp=at)
+        checkpoint.height = rows[-1].id
+        checkpoint.updated_at = datetime.utcnow()
+        db.session.add(checkpoint)
+        db.session.commit()
+        appended += len(rows)
+
+
+def reconcile_payouts(idea_ids: Iterable[int], denom: str = DEFAULT_DENOM):
+    """
+    Rebuild RoyaltyReconciliation rows for the given ideas
+
+    Expected amounts split every deposit 70% to the creator and 30% across
+    investors in proportion to their current holdings (primary purchases plus
+    net secondary trades, as for order-book balance checks); received
+    amounts come from indexed payouts. Differences within one base unit per
+    deposit (splitter rounding) count as reconciled.
+    """
+    from app import db, SplitterContract, RoyaltyPayout, RoyaltyReconciliation, idea_token_holdings
+
+    for idea_id in idea_ids:
+        deposit_count, deposited = db.session.query(
+            db.func.count(), db.func.coalesce(db.func.sum(RoyaltyPayout.amount), 0)
+        ).filter(RoyaltyPayout.idea_id == idea_id, RoyaltyPayout.kind == DEPOSIT,
+                 RoyaltyPayout.denom == denom).one()
+        received = dict(db.session.query(RoyaltyPayout.counterparty, db.func.sum(RoyaltyPayout.amount))
+                        .filter_by(idea_id=idea_id, kind=PAYOUT, denom=denom)
+                        .group_by(RoyaltyPayout.counterparty).all())
+        holdings = idea_token_holdings(idea_id)
+        creators = {c.creator_address for c in SplitterContract.query.filter_by(idea_id=idea_id)}
+
+        total_tokens = sum(holdings.values()) or 1
+        expected = {address: deposited * INVESTOR_SHARE * tokens / total_tokens
+                    for address, tokens in holdings.items()}
+        for creator in creators:
+            expected[creator] = expected.get(creator, 0.0) + deposited * CREATOR_SHARE / max(len(creators), 1)
+
+        RoyaltyReconciliation.query.filter_by(idea_id=idea_id).delete()
+        now = datetime.utcnow()
+        for address in sorted(set(expected) | set(received)):
+            want = expected.get(address)
+            got = received.get(address, 0)
+            if want is None:
+                status = "unexpected"
+            elif abs(got - want) <= max(deposit_count, 1):
+                status = "ok"
+            else:
+                status = "underpaid" if got < want else "overpaid"
+            db.session.add(RoyaltyReconciliation(
+                idea_id=idea_id, recipient_address=address, tokens_held=holdings.get(address, 0),
+                expected_amount=want or 0.0, received_amount=got, status=status, updated_at=now))
+
+
+def main(argv=None):
+    from splitter_ado import ANDROMEDA_MAINNET_REST
+
+    parser = argparse.ArgumentParser(description="Index splitter payouts from the chain")
+    parser.add_argument("--rest", default=os.environ.get("IPINVEST_CHAIN_REST", ANDROMEDA_MAINNET_REST),
+                        help="REST endpoint, or several separated by commas for failover")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="blocks per pass")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent page fetches")
+    parser.add_argument("--follow", action="store_true", help="keep polling for new blocks")
+    parser.add_argument("--interval", type=float, default=6.0, help="seconds between polls with --follow")
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    # Payouts reach the event ledger through the web process, which owns it (see feed_ledger)
+    indexer = ChainIndexer(ChainEventSource(args.rest, max_workers=args.workers), args.window)
+    with app.app_context():
+        while True:
+            try:
+                print(json.dumps(indexer.run_once()))
+            except ChainError as e:
+                # Checkpoints only advance on success, so the next poll retries this window
+                if not args.follow:
+                    raise
+                print(json.dumps({"error": str(e)}), file=sys.stderr)
+            if not args.follow:
+                return 0
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+Local stand-in for the Andromeda chain REST API
+Serves the handful of Cosmos SDK endpoints the app talks to from in-memory
+state, so the indexer, query layer and broadcast pipeline can be exercised
+without a network. Broadcast txs are decoded, their signature and account
+sequence are checked like CheckTx does, and splitter `send` messages pay out
+to the configured recipients.
+
+Usage:
+    stub = LocalChainREST()
+    stub.start()
+    stub.add_splitter_send(height=10, splitter="andr1splitter", sender="andr1payer",
+                           payouts={"andr1creator": 700, "andr1investor": 300})
+    ... point SplitterADO / ChainIndexer at stub.url ...
+    stub.inject(slow_rate=0.1, slow_seconds=2.0, error_rate=0.05)   # degrade the node
+    stub.add_account(signer_address); stub.add_splitter("andr1splitter", recipients)
+    stub.stop()
+"""
+
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from cosmos_tx import MSG_EXECUTE_CONTRACT, decode_fields, sign_doc_bytes, tx_hash, verify
+
+_CONDITION = re.compile(r"\s*([\w.]+)\s*(=|>=|<=)\s*'?([^']*?)'?\s*$")
+
+
+def _attributes(**kwargs) -> List[Dict[str, str]]:
+    return [{"key": key, "value": str(value), "index": True} for key, value in kwargs.items()]
+
+
+class LocalChainREST:
+    """In-memory chain with a threaded HTTP front end"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, chain_id: str = "andromeda-local",
+                 block_interval: float = 0.0):
+        self.chain_id = chain_id
+        self.height = 1
+        self.txs: List[Dict[str, Any]] = []
+        self.tx_index: Dict[str, Dict[str, Any]] = {}
+        self.accounts: Dict[str, Dict[str, int]] = {}
+        # Accepted but not yet committed (txhash, decoded messages); committed every
+        # `block_interval` seconds, or straight away when it is 0
+        self.mempool: List[tuple] = []
+        self.block_interval = block_interval
+        self._stopped = threading.Event()
+        self.balances: Dict[str, Dict[str, int]] = {}
+        self.contracts: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[str] = []
+        self.lock = threading.Lock()
+        self.slow_rate = 0.0
+        self.slow_seconds = 0.0
+        self.error_rate = 0.0
+        self.error_status = 503
+        self._random = random.Random(0)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalChainREST":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        if self.block_interval:
+            threading.Thread(target=self._produce_blocks, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalChainREST":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- fault injection -----------------------------------------------------
+
+    def inject(self, slow_rate: float = 0.0, slow_seconds: float = 0.0, error_rate: float = 0.0,
+               error_status: int = 503, seed: Optional[int] = None):
+        """
+        Degrade the node
+
+        Args:
+            slow_rate: Fraction of requests delayed by `slow_seconds` (1.0 with a
+                large delay is a stalled node)
+            error_rate: Fraction of requests answered with `error_status`
+        """
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.error_rate = error_rate
+        self.error_status = error_status
+        if seed is not None:
+            self._random.seed(seed)
+
+    def heal(self):
+        self.inject()
+
+    def _fault(self) -> Optional[tuple]:
+        with self.lock:
+            slow = self._random.random() < self.slow_rate
+            error = self._random.random() < self.error_rate
+        if slow:
+            time.sleep(self.slow_seconds)
+        if error:
+            return self.error_status, {"code": 14, "message": "injected fault"}
+        return None
+
+    # -- chain state ---------------------------------------------------------
+
+    def add_tx(self, height: int, events: List[Dict[str, Any]], timestamp: Optional[str] = None,
+               txhash: Optional[str] = None) -> str:
+        with self.lock:
+            txhash = txhash or hashlib.sha256(f"{len(self.txs)}:{height}".encode()).hexdigest().upper()
+            tx = {
+                "height": str(height),
+                "txhash": txhash,
+                "code": 0,
+                "timestamp": timestamp or "2026-01-01T00:00:00Z",
+                "events": events,
+            }
+            self.txs.append(tx)
+            self.tx_index[txhash] = tx
+            self.txs.sort(key=lambda tx: int(tx["height"]))
+            self.height = max(self.height, height)
+            return txhash
+
+    def _splitter_send_events(self, splitter: str, sender: str, payouts: Dict[str, int], denom: str,
+                              msg_index: int = 0) -> List[Dict[str, Any]]:
+        total = sum(payouts.values())
+        events = [
+            {"type": "message", "attributes": _attributes(action=MSG_EXECUTE_CONTRACT,
+                                                          sender=sender, msg_index=msg_index)},
+            {"type": "transfer", "attributes": _attributes(recipient=splitter, sender=sender,
+                                                           amount=f"{total}{denom}", msg_index=msg_index)},
+            {"type": "execute", "attributes": _attributes(_contract_address=splitter, msg_index=msg_index)},
+            {"type": "wasm", "attributes": _attributes(_contract_address=splitter, action="send",
+                                                       msg_index=msg_index)},
+        ]
+        for recipient, amount in payouts.items():
+            events.append({"type": "transfer", "attributes": _attributes(
+                recipient=recipient, sender=splitter, amount=f"{amount}{denom}", msg_index=msg_index)})
+        with self.lock:
+            for recipient, amount in payouts.items():
+                coins = self.balances.setdefault(recipient, {})
+                coins[denom] = coins.get(denom, 0) + amount
+        return events
+
+    def add_splitter_send(self, height: int, splitter: str, sender: str, payouts: Dict[str, int],
+                          denom: str = "uandr", timestamp: Optional[str] = None) -> str:
+        """A `send` to a splitter and the bank transfers it fans out to recipients"""
+        return self.add_tx(height, self._splitter_send_events(splitter, sender, payouts, denom), timestamp)
+
+    def add_account(self, address: str, sequence: int = 0) -> Dict[str, int]:
+        with self.lock:
+            account = self.accounts[address] = {"account_number": len(self.accounts) + 1, "sequence": sequence}
+            return account
+
+    def add_splitter(self, address: str, recipients: Dict[str, float]):
+        """Instantiated splitter paying `recipients` (address -> fraction) on `send`"""
+        self.contracts[address] = {"get_splitter_config": {"config": {"recipients": [
+            {"recipient": {"address": recipient}, "percent": str(percent)} for recipient, percent in recipients.items()
+        ]}}}
+
+    # -- broadcast -----------------------------------------------------------
+
+    def broadcast(self, tx_bytes: bytes) -> Dict[str, Any]:
+        """CheckTx: signature and sequence checks, then into the mempool"""
+        txhash = tx_hash(tx_bytes)
+        raw = dict(decode_fields(tx_bytes))
+        body, auth_info, signature = raw.get(1, b""), raw.get(2, b""), raw.get(3, b"")
+        signer_info = dict(decode_fields(dict(decode_fields(auth_info))[1]))
+        public_key = dict(decode_fields(dict(decode_fields(signer_info[1]))[2]))[1]
+        sequence = signer_info.get(3, 0)
+        messages = []
+        for number, message in decode_fields(body):
+            if number == 1:
+                any_fields = dict(decode_fields(message))
+                messages.append((any_fields[1].decode(), decode_fields(any_fields.get(2, b""))))
+        sender = next((value.decode() for _, fields in messages for number, value in fields if number == 1), None)
+
+        def reply(code: int, raw_log: str = "") -> Dict[str, Any]:
+            return {"tx_response": {"txhash": txhash, "code": code, "height": "0", "raw_log": raw_log}}
+
+        with self.lock:
+            account = self.accounts.get(sender)
+            if account is None:
+                return reply(9, f"account {sender} not found")
+            if txhash in self.tx_index or any(entry[0] == txhash for entry in self.mempool):
+                return reply(19, "tx already exists in cache")
+            if sequence != account["sequence"]:
+                return reply(32, f"account sequence mismatch, expected {account['sequence']}, "
+                                 f"got {sequence}: incorrect account sequence")
+            sign_doc = sign_doc_bytes(body, auth_info, self.chain_id, account["account_number"])
+            if not verify(public_key, sign_doc, signature):
+                return reply(4, "signature verification failed")
+            account["sequence"] += 1
+            self.mempool.append((txhash, sender, messages))
+        if not self.block_interval:
+            self.commit_block()
+        return reply(0)
+
+    def commit_block(self) -> int:
+        """Include every mempool tx in a new block; returns the number of txs"""
+        with self.lock:
+            pending, self.mempool = self.mempool, []
+            height = self.height + 1
+        for txhash, sender, messages in pending:
+            events = []
+            for index, (type_url, fields) in enumerate(messages):
+                if type_url != MSG_EXECUTE_CONTRACT:
+                    continue
+                values = {}
+                for number, value in fields:
+                    values.setdefault(number, []).append(value)
+                contract = values[2][0].decode()
+                config = self.contracts.get(contract, {}).get("get_splitter_config", {}).get("config")
+                if not config or "send" not in json.loads(values[3][0]):
+                    continue
+                for coin in values.get(5, []):
+                    coin = dict(decode_fields(coin))
+                    amount, denom = int(coin[2]), coin[1].decode()
+                    payouts = {r["recipient"]["address"]: int(amount * float(r["percent"]))
+                               for r in config["recipients"]}
+                    events.extend(self._splitter_send_events(contract, sender, payouts, denom, index))
+            self.add_tx(height, events, txhash=txhash)
+        with self.lock:
+            self.height = height
+        return len(pending)
+
+    def _produce_blocks(self):
+        while not self._stopped.wait(self.block_interval):
+            self.commit_block()
+
+    # -- query matching ------------------------------------------------------
+
+    @staticmethod
+    def _matches(tx: Dict[str, Any], query: str) -> bool:
+        for clause in query.split(" AND "):
+            match = _CONDITION.match(clause)
+            if not match:
+                continue
+            key, op, value = match.groups()
+            if key == "tx.height":
+                height, bound = int(tx["height"]), int(value)
+                if (op == "=" and height != bound) or (op == ">=" and height < bound) or \
+                        (op == "<=" and height > bound):
+                    return False
+                continue
+            event_type, attribute = key.split(".", 1)
+            if not any(event["type"] == event_type and
+                       any(a["key"] == attribute and a["value"] == value for a in event["attributes"])
+                       for event in tx["events"]):
+                return False
+        return True
+
+    def search_txs(self, query: str, page: int, limit: int) -> Dict[str, Any]:
+        with self.lock:
+            matched = [tx for tx in self.txs if self._matches(tx, query)]
+        start = (page - 1) * limit
+        return {
+            "txs": [{} for _ in matched[start:start + limit]],
+            "tx_responses": matched[start:start + limit],
+            "pagination": None,
+            "total": str(len(matched)),
+        }
+
+    # -- HTTP ----------------------------------------------------------------
+
+    def route(self, method: str, path: str, params: Dict[str, List[str]], body: Optional[bytes]):
+        """Return (status, payload) for a request; override or wrap to inject faults"""
+        if path == "/cosmos/base/tendermint/v1beta1/blocks/latest":
+            return 200, {"block": {"header": {"chain_id": self.chain_id, "height": str(self.height)}}}
+        if path == "/cosmos/tx/v1beta1/txs" and method == "POST":
+            tx_bytes = base64.b64decode(json.loads(body or b"{}").get("tx_bytes", ""))
+            return 200, self.broadcast(tx_bytes)
+        if path.startswith("/cosmos/tx/v1beta1/txs/"):
+            tx = self.tx_index.get(path.rsplit("/", 1)[1])
+            if tx is None:
+                return 404, {"code": 5, "message": "tx not found"}
+            return 200, {"tx": {}, "tx_response": tx}
+        if path.startswith("/cosmos/auth/v1beta1/accounts/"):
+            address = path.rsplit("/", 1)[1]
+            account = self.accounts.get(address)
+            if account is None:
+                return 404, {"code": 5, "message": f"account {address} not found"}
+            return 200, {"account": {"@type": "/cosmos.auth.v1beta1.BaseAccount", "address": address,
+                                     "account_number": str(account["account_number"]),
+                                     "sequence": str(account["sequence"])}}
+        if path == "/cosmos/tx/v1beta1/txs" and method == "GET":
+            query = params.get("query", params.get("events", [""]))[0]
+            page = int(params.get("page", ["1"])[0])
+            limit = int(params.get("limit", ["100"])[0])
+            return 200, self.search_txs(query, page, limit)
+        if path.startswith("/cosmos/bank/v1beta1/balances/"):
+            address = path.rsplit("/", 1)[1]
+            coins = self.balances.get(address, {})
+            return 200, {"balances": [{"denom": d, "amount": str(a)} for d, a in sorted(coins.items())],
+                         "pagination": {"next_key": None, "total": str(len(coins))}}
+        match = re.match(r"^/cosmwasm/wasm/v1/contract/([^/]+)/smart/(.+)$", path)
+        if match:
+            contract = self.contracts.get(match.group(1))
+            if contract is None:
+                return 404, {"code": 5, "message": "contract not found"}
+            query_msg = json.loads(unquote(match.group(2)))
+            return 200, {"data": contract.get(next(iter(query_msg)), {})}
+        return 404, {"code": 12, "message": f"Not Implemented: {path}"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                with stub.lock:
+                    stub.requests.append(parsed.path)
+                status, payload = stub._fault() or stub.route(method, parsed.path, parse_qs(parsed.query), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+# Keep tests off the demo database, order journal and event ledger in instance/
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("IPINVEST_ORDERBOOK_DIR", tempfile.mkdtemp(prefix="ipinvest-orderbook-"))
+os.environ.setdefault("IPINVEST_LEDGER_DIR", tempfile.mkdtemp(prefix="ipinvest-ledger-"))
+os.environ.setdefault("IPINVEST_FEATURE_STORE",
+                      os.path.join(tempfile.mkdtemp(prefix="ipinvest-features-"), "features.f32"))
+os.environ.setdefault("IPINVEST_MODEL_DIR", tempfile.mkdtemp(prefix="ipinvest-models-"))
+# Recompute portfolio analytics on read instead of from a background thread
+os.environ.setdefault("IPINVEST_ANALYTICS_INTERVAL", "0")
+# Feed indexed royalty payouts into the ledger on read instead of from a background thread
+os.environ.setdefault("IPINVEST_ROYALTY_FEED_INTERVAL", "0")
+os.environ.setdefault("IPINVEST_OPERATOR_TOKEN", "test-operator-token")
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    from app import app, db, feature_store, init_demo_data, order_engine, portfolio_cache, similar_index
+
+    app.config["TESTING"] = True
+    init_demo_data()
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+    order_engine.books.clear()
+    portfolio_cache.mark_dirty()
+    feature_store.clear()
+    similar_index.mark_stale()
@@ -0,0 +1,188 @@
+"""
+Local signing for Cosmos SDK transactions
+Builds MsgExecuteContract transactions, encodes them as protobuf
+(SIGN_MODE_DIRECT) and signs them with a secp256k1 key held by the server.
+Only the handful of messages the royalty pipeline sends are covered, and
+the elliptic-curve work is left to coincurve (libsecp256k1), which signs
+in constant time; this module only encodes the SignDoc and transaction.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+import coincurve
+from coincurve.ecdsa import cdata_to_der, der_to_cdata, deserialize_compact, serialize_compact
+
+# Order of the secp256k1 group; valid private keys lie in [1, N)
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+MSG_EXECUTE_CONTRACT = "/cosmwasm.wasm.v1.MsgExecuteContract"
+SECP256K1_PUBKEY = "/cosmos.crypto.secp256k1.PubKey"
+SIGN_MODE_DIRECT = 1
+
+# -- bech32 -------------------------------------------------------------------
+
+_BECH32 = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+
+def _polymod(values: Iterable[int]) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if (top >> i) & 1 else 0
+    return checksum
+
+
+def bech32_encode(prefix: str, data: bytes) -> str:
+    acc, bits, words = 0, 0, []
+    for byte in data:
+        acc = (acc << 8) | byte
+        bits += 8
+        while bits >= 5:
+            bits -= 5
+            words.append((acc >> bits) & 31)
+    if bits:
+        words.append((acc << (5 - bits)) & 31)
+    expanded = [ord(c) >> 5 for c in prefix] + [0] + [ord(c) & 31 for c in prefix]
+    checksum = _polymod(expanded + words + [0] * 6) ^ 1
+    words += [(checksum >> 5 * (5 - i)) & 31 for i in range(6)]
+    return prefix + "1" + "".join(_BECH32[w] for w in words)
+
+
+# -- keys ---------------------------------------------------------------------
+
+
+class PrivateKey:
+    """secp256k1 signing key backed by libsecp256k1"""
+
+    def __init__(self, secret: int):
+        if not 0 < secret < N:
+            raise ValueError("private key out of range")
+        self._key = coincurve.PrivateKey(secret.to_bytes(32, "big"))
+        self.public_key = self._key.public_key.format(compressed=True)
+
+    @classmethod
+    def from_hex(cls, value: str) -> "PrivateKey":
+        return cls(int(value.strip().removeprefix("0x"), 16))
+
+    def address(self, prefix: str = "andr") -> str:
+        return bech32_encode(prefix, hashlib.new("ripemd160", hashlib.sha256(self.public_key).digest()).digest())
+
+    def sign(self, message: bytes) -> bytes:
+        """64-byte r||s signature over sha256(message); RFC 6979 nonce, low-S as the SDK requires"""
+        return serialize_compact(der_to_cdata(self._key.sign(message)))
+
+
+def verify(public_key: bytes, message: bytes, signature: bytes) -> bool:
+    try:
+        return coincurve.PublicKey(public_key).verify(cdata_to_der(deserialize_compact(signature)), message)
+    except ValueError:
+        return False
+
+
+# -- protobuf -----------------------------------------------------------------
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _bytes_field(number: int, value) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+    return _varint(number << 3 | 2) + _varint(len(value)) + value if value else b""
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value) if value else b""
+
+
+def decode_fields(data: bytes) -> List[Tuple[int, Any]]:
+    """(field number, int or bytes) pairs of a protobuf message, in order"""
+    fields, i = [], 0
+    while i < len(data):
+        key, i = _read_varint(data, i)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, i = _read_varint(data, i)
+        elif wire_type == 2:
+            length, i = _read_varint(data, i)
+            value, i = data[i:i + length], i + length
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        fields.append((number, value))
+    return fields
+
+
+def _read_varint(data: bytes, i: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, i
+
+
+def _coin(denom: str, amount) -> bytes:
+    return _bytes_field(1, denom) + _bytes_field(2, str(amount))
+
+
+def _any(type_url: str, value: bytes) -> bytes:
+    return _bytes_field(1, type_url) + _bytes_field(2, value)
+
+
+def execute_contract_msg(sender: str, contract: str, msg: Dict[str, Any],
+                         funds: Iterable[Tuple[str, int]] = ()) -> bytes:
+    """Any-wrapped MsgExecuteContract; funds are (denom, amount) pairs"""
+    value = (_bytes_field(1, sender) + _bytes_field(2, contract) +
+             _bytes_field(3, json.dumps(msg, separators=(",", ":"))) +
+             b"".join(_bytes_field(5, _coin(denom, amount)) for denom, amount in funds))
+    return _any(MSG_EXECUTE_CONTRACT, value)
+
+
+def sign_tx(key: PrivateKey, messages: List[bytes], chain_id: str, account_number: int, sequence: int,
+            fee: Tuple[str, int], gas_limit: int, memo: str = "") -> bytes:
+    """
+    Signed TxRaw bytes
+
+    Args:
+        messages: Any-wrapped messages, e.g. from execute_contract_msg()
+        fee: (denom, amount)
+    """
+    body = b"".join(_bytes_field(1, message) for message in messages) + _bytes_field(2, memo)
+    signer_info = (_bytes_field(1, _any(SECP256K1_PUBKEY, _bytes_field(1, key.public_key))) +
+                   _bytes_field(2, _bytes_field(1, _varint_field(1, SIGN_MODE_DIRECT))) +
+                   _varint_field(3, sequence))
+    auth_info = _bytes_field(1, signer_info) + _bytes_field(2, _bytes_field(1, _coin(*fee)) +
+                                                               _varint_field(2, gas_limit))
+    signature = key.sign(sign_doc_bytes(body, auth_info, chain_id, account_number))
+    return _bytes_field(1, body) + _bytes_field(2, auth_info) + _bytes_field(3, signature)
+
+
+def sign_doc_bytes(body: bytes, auth_info: bytes, chain_id: str, account_number: int) -> bytes:
+    """The SignDoc a SIGN_MODE_DIRECT signature covers"""
+    return (_bytes_field(1, body) + _bytes_field(2, auth_info) + _bytes_field(3, chain_id) +
+            _varint_field(4, account_number))
+
+
+def tx_hash(tx_bytes: bytes) -> str:
+    return hashlib.sha256(tx_bytes).hexdigest().upper()
+
+
+def encode_broadcast(tx_bytes: bytes, mode: str = "BROADCAST_MODE_SYNC") -> Dict[str, str]:
+    return {"tx_bytes": base64.b64encode(tx_bytes).decode(), "mode": mode}
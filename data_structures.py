@@ -1,6 +1,11 @@
 # data_structures.py
 
+import numpy as np
+
+
 class IdeaMetadata:
+    __slots__ = ("title", "description", "field", "inventor", "predicted_value", "total_tokens")
+
     def __init__(self, title, description, field, inventor, predicted_value, total_tokens):
         self.title = title
         self.description = description
@@ -9,7 +14,22 @@ class IdeaMetadata:
         self.predicted_value = predicted_value
         self.total_tokens = total_tokens
 
+
+class Holding:
+    __slots__ = ("idea", "tokens")
+
+    def __init__(self, idea, tokens):
+        self.idea = idea
+        self.tokens = tokens
+
+    def __getitem__(self, key):
+        # Keeps the old {"idea": ..., "tokens": ...} access working
+        return getattr(self, key)
+
+
 class InvestorProfile:
+    __slots__ = ("name", "wallet_address", "risk_preference", "investments")
+
     def __init__(self, name, wallet_address, risk_preference):
         self.name = name
         self.wallet_address = wallet_address
@@ -17,21 +37,119 @@ class InvestorProfile:
         self.investments = []
 
     def add_investment(self, idea_title, tokens_owned):
-        self.investments.append({"idea": idea_title, "tokens": tokens_owned})
-2. CosmWasm Smart Contracts (Rust)
-ip_token.rs – NFT Contract (CW721)
-rust
-Copy
-Edit
-// ip_token.rs
-use cosmwasm_std::{Binary, DepsMut, Env, MessageInfo, Response, StdResult};
-use cw721_base::{ContractError, ExecuteMsg, InstantiateMsg};
-
-pub fn instantiate(
-    deps: DepsMut,
-    _env: Env,
-    info: MessageInfo,
-    msg: InstantiateMsg,
-) -> StdResult<Response> {
-    cw721_base::Cw721Contract::default().instantiate(deps, _env, info, msg)
-}
+        self.investments.append(Holding(idea_title, tokens_owned))
+
+
+class HoldingsStore:
+    """
+    Columnar holdings: one row per (wallet, idea, tokens) purchase
+
+    Wallets and ideas are interned to dense int32 ids and rows live in
+    growable NumPy arrays, so a holding costs 16 bytes and per-wallet or
+    per-idea totals are a single bincount instead of a Python loop.
+    """
+
+    def __init__(self, capacity=1024):
+        self.wallet_ids = np.zeros(capacity, dtype=np.int32)
+        self.idea_ids = np.zeros(capacity, dtype=np.int32)
+        self.tokens = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self.wallets = []
+        self.ideas = []
+        self._wallet_index = {}
+        self._idea_index = {}
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (wallet, idea, tokens) tuples, e.g. an Investment query"""
+        rows = list(rows)
+        store = cls(capacity=max(len(rows), 1))
+        if rows:
+            store.extend([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+        return store
+
+    def wallet_id(self, wallet):
+        wallet_id = self._wallet_index.get(wallet)
+        if wallet_id is None:
+            wallet_id = self._wallet_index[wallet] = len(self.wallets)
+            self.wallets.append(wallet)
+        return wallet_id
+
+    def idea_id(self, idea):
+        idea_id = self._idea_index.get(idea)
+        if idea_id is None:
+            idea_id = self._idea_index[idea] = len(self.ideas)
+            self.ideas.append(idea)
+        return idea_id
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.tokens):
+            return
+        capacity = max(needed, 2 * len(self.tokens))
+        for name in ("wallet_ids", "idea_ids", "tokens"):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def add(self, wallet, idea, tokens):
+        self._reserve(1)
+        self.wallet_ids[self.size] = self.wallet_id(wallet)
+        self.idea_ids[self.size] = self.idea_id(idea)
+        self.tokens[self.size] = tokens
+        self.size += 1
+
+    def extend(self, wallets, ideas, tokens):
+        """Append many rows; keys are interned once per distinct value"""
+        tokens = np.asarray(tokens, dtype=np.int64)
+        count = len(tokens)
+        self._reserve(count)
+        for column, keys, index, intern in ((self.wallet_ids, wallets, self._wallet_index, self.wallet_id),
+                                            (self.idea_ids, ideas, self._idea_index, self.idea_id)):
+            lookup = index.get
+            column[self.size:self.size + count] = np.fromiter(
+                (lookup(key) if key in index else intern(key) for key in keys), dtype=np.int32, count=count)
+        self.tokens[self.size:self.size + count] = tokens
+        self.size += count
+
+    @property
+    def nbytes(self):
+        return self.wallet_ids[:self.size].nbytes + self.idea_ids[:self.size].nbytes + self.tokens[:self.size].nbytes
+
+    def tokens_by_wallet(self):
+        """Total tokens per wallet id (index into self.wallets)"""
+        return np.bincount(self.wallet_ids[:self.size], weights=self.tokens[:self.size],
+                           minlength=len(self.wallets)).astype(np.int64)
+
+    def tokens_by_idea(self):
+        """Total tokens per idea id (index into self.ideas)"""
+        return np.bincount(self.idea_ids[:self.size], weights=self.tokens[:self.size],
+                           minlength=len(self.ideas)).astype(np.int64)
+
+    def positions(self):
+        """
+        Net position per (wallet, idea) pair
+
+        Returns:
+            (wallet_ids, idea_ids, tokens) arrays sorted by wallet then idea
+        """
+        keys = (self.wallet_ids[:self.size].astype(np.int64) << 32) | self.idea_ids[:self.size]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if self.size else np.array([], int)
+        unique = sorted_keys[starts]
+        totals = np.add.reduceat(self.tokens[:self.size][order], starts) if self.size else np.array([], np.int64)
+        return (unique >> 32).astype(np.int32), (unique & 0xFFFFFFFF).astype(np.int32), totals
+
+    def wallet_holdings(self, wallet):
+        """idea -> tokens for one wallet"""
+        wallet_id = self._wallet_index.get(wallet)
+        if wallet_id is None:
+            return {}
+        mask = self.wallet_ids[:self.size] == wallet_id
+        totals = np.bincount(self.idea_ids[:self.size][mask], weights=self.tokens[:self.size][mask])
+        return {self.ideas[i]: int(totals[i]) for i in np.flatnonzero(totals)}
@@ -59,22 +59,22 @@ def demo_ml_models():
     print("\n🤖 Testing ML Models...")
     
     try:
-        from valuation_model import ValuationModel
+        import tempfile
+        from valuation_model import FEATURE_COLUMNS, ValuationModel
         from rl_recommender import RLRecommender
+        from feature_store import FeatureStore
+        from app import SAMPLE_IDEAS
         import numpy as np
         
+        # Feature rows for the sample ideas, as the app keeps them
+        store = FeatureStore(os.path.join(tempfile.mkdtemp(prefix="ipinvest-demo-"), "features.f32"))
+        store.rebuild([dict(idea, id=i, tokens_sold=0, status='active') for i, idea in enumerate(SAMPLE_IDEAS, 1)])
+        
         # Test valuation model
         print("📊 Testing Valuation Model...")
         model = ValuationModel()
-        
-        # Simulate features for a patent
-        features = np.array([
-            500,  # Description length
-            15,   # Field complexity
-            1,    # AI indicator
-            0,    # Blockchain indicator
-            1.2   # Random factor
-        ])
+        features = store.valuation_features()[1]
+        print(f"   Features: {dict(zip(FEATURE_COLUMNS, features.tolist()))}")
         
         # Note: In demo, we'll simulate the prediction
         predicted_value = np.random.uniform(500000, 3000000)
@@ -82,8 +82,7 @@ def demo_ml_models():
         
         # Test RL recommender
         print("🎯 Testing RL Recommender...")
-        token_data = np.random.rand(10)
-        recommender = RLRecommender(token_data)
+        recommender = RLRecommender.from_feature_store(store)
         print("   RL Agent initialized successfully")
         
         return True
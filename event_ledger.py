@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Append-only investment event ledger
+Purchases, transfers and royalty payouts are written as fixed-width binary
+records to rolling segment files. State (per-wallet holdings, per-idea
+supply and royalties) is rebuilt by memory-mapping segments and replaying
+them in vectorized batches, starting from the latest snapshot.
+
+Usage:
+    python event_ledger.py backfill   # import Investment/Trade rows from DATABASE_URL
+    python event_ledger.py rebuild    # replay from the latest snapshot and print stats
+    python event_ledger.py snapshot
+"""
+
+import calendar
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+PURCHASE = 1
+TRANSFER = 2
+ROYALTY = 3
+EVENT_KINDS = {PURCHASE: "purchase", TRANSFER: "transfer", ROYALTY: "royalty"}
+
+# seq, timestamp (us), kind, idea_id, from wallet, to wallet, tokens, amount
+EVENT_STRUCT = struct.Struct("<QqB3xIIIqd")
+EVENT_DTYPE = np.dtype({
+    "names": ["seq", "ts", "kind", "idea_id", "src", "dst", "tokens", "amount"],
+    "formats": ["<u8", "<i8", "u1", "<u4", "<u4", "<u4", "<i8", "<f8"],
+    "offsets": [0, 8, 16, 20, 24, 28, 32, 40],
+    "itemsize": EVENT_STRUCT.size,
+})
+RECORD_SIZE = EVENT_STRUCT.size
+
+SEGMENT_EVENTS = 1_000_000
+SNAPSHOT_EVERY = 1_000_000
+NO_WALLET = 0
+_WALLET_SHIFT = np.uint64(32)
+
+
+class LedgerState:
+    """
+    Materialized ledger state
+
+    Holdings are kept as a sorted array of (wallet_id << 32 | idea_id) keys
+    with token counts, plus a small dict of live deltas that is folded into
+    the arrays in bulk. Per-idea and per-wallet totals are dense arrays
+    indexed by id.
+    """
+
+    def __init__(self):
+        self.last_seq = 0
+        self.event_count = 0
+        self.tokens_sold = np.zeros(1, dtype=np.int64)
+        self.idea_volume = np.zeros(1, dtype=np.float64)
+        self.idea_royalties = np.zeros(1, dtype=np.float64)
+        self.wallet_royalties = np.zeros(1, dtype=np.float64)
+        self.holding_keys = np.zeros(0, dtype=np.uint64)
+        self.holding_tokens = np.zeros(0, dtype=np.int64)
+        self._pending: Dict[int, int] = {}
+        self._pending_batches: List[tuple] = []
+        self._pending_batch_rows = 0
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if size <= len(array):
+            return array
+        grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def apply_batch(self, events: np.ndarray):
+        """Fold a structured EVENT_DTYPE array into the state"""
+        if not len(events):
+            return
+        kind, idea, src, dst = events["kind"], events["idea_id"], events["src"], events["dst"]
+        tokens, amount = events["tokens"], events["amount"]
+        purchase = kind == PURCHASE
+        transfer = kind == TRANSFER
+        royalty = kind == ROYALTY
+
+        n_ideas = int(idea.max()) + 1
+        n_wallets = int(max(src.max(), dst.max())) + 1
+        self.tokens_sold = self._grow(self.tokens_sold, n_ideas)
+        self.idea_volume = self._grow(self.idea_volume, n_ideas)
+        self.idea_royalties = self._grow(self.idea_royalties, n_ideas)
+        self.wallet_royalties = self._grow(self.wallet_royalties, n_wallets)
+
+        self.tokens_sold[:n_ideas] += np.bincount(idea[purchase], weights=tokens[purchase],
+                                                  minlength=n_ideas).astype(np.int64)
+        trade = purchase | transfer
+        self.idea_volume[:n_ideas] += np.bincount(idea[trade], weights=amount[trade], minlength=n_ideas)
+        self.idea_royalties[:n_ideas] += np.bincount(idea[royalty], weights=amount[royalty], minlength=n_ideas)
+        self.wallet_royalties[:n_wallets] += np.bincount(dst[royalty], weights=amount[royalty],
+                                                         minlength=n_wallets)
+
+        idea64 = idea.astype(np.uint64)
+        keys = np.concatenate([
+            (dst[trade].astype(np.uint64) << _WALLET_SHIFT) | idea64[trade],
+            (src[transfer].astype(np.uint64) << _WALLET_SHIFT) | idea64[transfer],
+        ])
+        deltas = np.concatenate([tokens[trade], -tokens[transfer]])
+        # Sorting dominates replay, so defer merges until the deltas rival the base
+        self._pending_batches.append((keys, deltas))
+        self._pending_batch_rows += len(keys)
+        if self._pending_batch_rows >= max(len(self.holding_keys), SEGMENT_EVENTS):
+            self._merge_batches()
+
+        self.last_seq = int(events["seq"][-1])
+        self.event_count += len(events)
+
+    def apply_one(self, seq: int, kind: int, idea_id: int, src: int, dst: int, tokens: int, amount: float):
+        """Cheap single-event update for live appends"""
+        self.tokens_sold = self._grow(self.tokens_sold, idea_id + 1)
+        self.idea_volume = self._grow(self.idea_volume, idea_id + 1)
+        self.idea_royalties = self._grow(self.idea_royalties, idea_id + 1)
+        self.wallet_royalties = self._grow(self.wallet_royalties, max(src, dst) + 1)
+        if kind == PURCHASE:
+            self.tokens_sold[idea_id] += tokens
+        if kind in (PURCHASE, TRANSFER):
+            self.idea_volume[idea_id] += amount
+            key = (dst << 32) | idea_id
+            self._pending[key] = self._pending.get(key, 0) + tokens
+        if kind == TRANSFER:
+            key = (src << 32) | idea_id
+            self._pending[key] = self._pending.get(key, 0) - tokens
+        if kind == ROYALTY:
+            self.idea_royalties[idea_id] += amount
+            self.wallet_royalties[dst] += amount
+        self.last_seq = seq
+        self.event_count += 1
+        if len(self._pending) > 100_000:
+            self.compact()
+
+    def _merge_batches(self):
+        if self._pending_batches:
+            keys = np.concatenate([k for k, _ in self._pending_batches])
+            deltas = np.concatenate([d for _, d in self._pending_batches])
+            self._pending_batches = []
+            self._pending_batch_rows = 0
+            self._merge_holdings(keys, deltas)
+
+    def _merge_holdings(self, keys: np.ndarray, deltas: np.ndarray):
+        if not len(keys):
+            return
+        all_keys = np.concatenate([self.holding_keys, keys])
+        all_tokens = np.concatenate([self.holding_tokens, deltas])
+        order = np.argsort(all_keys)
+        sorted_keys = all_keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        unique = sorted_keys[starts]
+        totals = np.add.reduceat(all_tokens[order], starts)
+        nonzero = totals != 0
+        self.holding_keys = unique[nonzero]
+        self.holding_tokens = totals[nonzero]
+
+    def compact(self):
+        """Fold live and batched deltas into the sorted holding arrays"""
+        self._merge_batches()
+        if self._pending:
+            keys = np.fromiter(self._pending.keys(), dtype=np.uint64, count=len(self._pending))
+            deltas = np.fromiter(self._pending.values(), dtype=np.int64, count=len(self._pending))
+            self._pending = {}
+            self._merge_holdings(keys, deltas)
+
+    def wallet_holdings(self, wallet_id: int) -> Dict[int, int]:
+        """idea_id -> tokens for one wallet"""
+        self._merge_batches()
+        lo = np.searchsorted(self.holding_keys, np.uint64(wallet_id) << _WALLET_SHIFT)
+        hi = np.searchsorted(self.holding_keys, np.uint64(wallet_id + 1) << _WALLET_SHIFT)
+        holdings = {int(k) & 0xFFFFFFFF: int(t) for k, t in zip(self.holding_keys[lo:hi], self.holding_tokens[lo:hi])}
+        for key, delta in self._pending.items():
+            if key >> 32 == wallet_id:
+                idea_id = key & 0xFFFFFFFF
+                holdings[idea_id] = holdings.get(idea_id, 0) + delta
+        return {idea_id: tokens for idea_id, tokens in holdings.items() if tokens}
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        self.compact()
+        return {
+            "meta": np.array([self.last_seq, self.event_count], dtype=np.int64),
+            "tokens_sold": self.tokens_sold,
+            "idea_volume": self.idea_volume,
+            "idea_royalties": self.idea_royalties,
+            "wallet_royalties": self.wallet_royalties,
+            "holding_keys": self.holding_keys,
+            "holding_tokens": self.holding_tokens,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "LedgerState":
+        state = cls()
+        state.last_seq, state.event_count = (int(v) for v in arrays["meta"])
+        for name in ("tokens_sold", "idea_volume", "idea_royalties", "wallet_royalties",
+                     "holding_keys", "holding_tokens"):
+            setattr(state, name, np.array(arrays[name]))
+        return state
+
+
+class EventLedger:
+    """
+    Segmented binary event log with snapshots
+
+    Files in `directory`:
+        segment-<first seq>.log   fixed-width EVENT_DTYPE records
+        wallets.txt               wallet address per line; line N is wallet id N
+        snapshot-<seq>.npz        LedgerState arrays as of <seq>
+        consumers/<name>.offset   last seq processed by a downstream consumer
+    """
+
+    def __init__(self, directory: str, segment_events: int = SEGMENT_EVENTS,
+                 snapshot_every: Optional[int] = SNAPSHOT_EVERY):
+        self.directory = directory
+        self.segment_events = segment_events
+        self.snapshot_every = snapshot_every
+        os.makedirs(os.path.join(directory, "consumers"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._wallet_ids: Dict[str, int] = {}
+        self._wallets: List[str] = [""]
+        self._load_wallets()
+        self._wallet_file = open(os.path.join(directory, "wallets.txt"), "a")
+        self.last_seq = self._recover_segments()
+        self._segment = None
+        self._segment_count = 0
+        self.state = self.rebuild()
+        self._since_snapshot = self.last_seq - self.state_snapshot_seq
+
+    # -- wallets -------------------------------------------------------------
+
+    def _load_wallets(self):
+        path = os.path.join(self.directory, "wallets.txt")
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                self._wallet_ids[line[:-1]] = len(self._wallets)
+                self._wallets.append(line[:-1])
+
+    def wallet_id(self, address: str, create: bool = True) -> int:
+        wallet_id = self._wallet_ids.get(address)
+        if wallet_id is None and create:
+            if "\n" in address:
+                raise ValueError("wallet address may not contain newlines")
+            wallet_id = self._wallet_ids[address] = len(self._wallets)
+            self._wallets.append(address)
+            self._wallet_file.write(address + "\n")
+            self._wallet_file.flush()
+        return wallet_id or NO_WALLET
+
+    def wallet_address(self, wallet_id: int) -> str:
+        return self._wallets[wallet_id]
+
+    def wallet_summary(self, address: str) -> Dict[str, Any]:
+        """Holdings, royalties received and the seq they are current as of, read consistently under the lock"""
+        with self._lock:
+            wallet_id = self.wallet_id(address, create=False)
+            state = self.state
+            royalties = state.wallet_royalties
+            return {
+                "holdings": state.wallet_holdings(wallet_id) if wallet_id else {},
+                "royalties_received": float(royalties[wallet_id]) if 0 < wallet_id < len(royalties) else 0.0,
+                "as_of_seq": state.last_seq,
+            }
+
+    # -- segments ------------------------------------------------------------
+
+    def _segment_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.log")))
+
+    @staticmethod
+    def _segment_first_seq(path: str) -> int:
+        return int(os.path.basename(path)[len("segment-"):-len(".log")])
+
+    def _recover_segments(self) -> int:
+        """Trim torn records and return the last durable seq"""
+        last_seq = 0
+        for path in self._segment_paths():
+            size = os.path.getsize(path)
+            if size % RECORD_SIZE:
+                os.truncate(path, size - size % RECORD_SIZE)
+                size -= size % RECORD_SIZE
+            if size:
+                last_seq = self._segment_first_seq(path) + size // RECORD_SIZE - 1
+        return last_seq
+
+    def _open_segment(self, first_seq: int):
+        if self._segment is not None:
+            self._segment.close()
+        paths = self._segment_paths()
+        if paths and os.path.getsize(paths[-1]) // RECORD_SIZE < self.segment_events:
+            path = paths[-1]
+        else:
+            path = os.path.join(self.directory, f"segment-{first_seq:016d}.log")
+        self._segment = open(path, "ab")
+        self._segment_count = os.path.getsize(path) // RECORD_SIZE
+
+    def read(self, after_seq: int = 0, batch_events: int = SEGMENT_EVENTS) -> Iterator[np.ndarray]:
+        """
+        Yield EVENT_DTYPE batches with seq > after_seq, oldest first
+
+        Batches are memory-mapped views of the segment files, so readers
+        share the page cache instead of copying the log.
+        """
+        if self._segment is not None:
+            self._segment.flush()
+        for path in self._segment_paths():
+            first = self._segment_first_seq(path)
+            count = os.path.getsize(path) // RECORD_SIZE
+            if not count or first + count - 1 <= after_seq:
+                continue
+            events = np.memmap(path, dtype=EVENT_DTYPE, mode="r", shape=(count,))
+            start = max(0, after_seq + 1 - first)
+            for lo in range(start, count, batch_events):
+                yield events[lo:lo + batch_events]
+
+    # -- writes --------------------------------------------------------------
+
+    def append(self, kind: int, idea_id: int, tokens: int = 0, amount: float = 0.0,
+               from_wallet: Optional[str] = None, to_wallet: Optional[str] = None,
+               timestamp: Optional[float] = None) -> int:
+        """Append one event and update the live state; returns its seq"""
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"unknown event kind {kind}")
+        with self._lock:
+            src = self.wallet_id(from_wallet) if from_wallet else NO_WALLET
+            dst = self.wallet_id(to_wallet) if to_wallet else NO_WALLET
+            seq = self.last_seq + 1
+            if self._segment is None or self._segment_count >= self.segment_events:
+                self._open_segment(seq)
+            ts = int((time.time() if timestamp is None else timestamp) * 1_000_000)
+            self._segment.write(EVENT_STRUCT.pack(seq, ts, kind, idea_id, src, dst, tokens, amount))
+            self._segment.flush()
+            self._segment_count += 1
+            self.last_seq = seq
+            self.state.apply_one(seq, kind, idea_id, src, dst, tokens, amount)
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self._write_snapshot()
+            return seq
+
+    def append_purchase(self, wallet: str, idea_id: int, tokens: int, amount: float,
+                        timestamp: Optional[float] = None) -> int:
+        return self.append(PURCHASE, idea_id, tokens, amount, to_wallet=wallet, timestamp=timestamp)
+
+    def append_transfer(self, seller: str, buyer: str, idea_id: int, tokens: int, amount: float,
+                        timestamp: Optional[float] = None) -> int:
+        return self.append(TRANSFER, idea_id, tokens, amount, from_wallet=seller, to_wallet=buyer,
+                           timestamp=timestamp)
+
+    def append_royalty(self, wallet: str, idea_id: int, amount: float, timestamp: Optional[float] = None) -> int:
+        return self.append(ROYALTY, idea_id, 0, amount, to_wallet=wallet, timestamp=timestamp)
+
+    def append_many(self, events: List[tuple]):
+        """
+        Bulk append (kind, idea_id, tokens, amount, from_wallet, to_wallet, timestamp) tuples
+
+        Used for backfills; writes whole buffers and applies the batch to
+        the state in one vectorized pass.
+        """
+        with self._lock:
+            records = np.zeros(len(events), dtype=EVENT_DTYPE)
+            for i, (kind, idea_id, tokens, amount, src, dst, ts) in enumerate(events):
+                records[i] = (self.last_seq + 1 + i, int(ts * 1_000_000), kind, idea_id,
+                              self.wallet_id(src) if src else NO_WALLET,
+                              self.wallet_id(dst) if dst else NO_WALLET, tokens, amount)
+            written = 0
+            while written < len(records):
+                if self._segment is None or self._segment_count >= self.segment_events:
+                    self._open_segment(int(records[written]["seq"]))
+                chunk = records[written:written + self.segment_events - self._segment_count]
+                self._segment.write(chunk.tobytes())
+                self._segment_count += len(chunk)
+                written += len(chunk)
+            if self._segment is not None:
+                self._segment.flush()
+            if len(records):
+                self.last_seq = int(records[-1]["seq"])
+                self.state.apply_batch(records)
+                self._since_snapshot += len(records)
+                if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                    self._write_snapshot()
+
+    # -- snapshots and replay ------------------------------------------------
+
+    def _snapshot_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "snapshot-*.npz")))
+
+    @property
+    def state_snapshot_seq(self) -> int:
+        paths = self._snapshot_paths()
+        return int(os.path.basename(paths[-1])[len("snapshot-"):-len(".npz")]) if paths else 0
+
+    def _write_snapshot(self):
+        arrays = self.state.to_arrays()
+        path = os.path.join(self.directory, f"snapshot-{self.state.last_seq:016d}.npz")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        for old in self._snapshot_paths()[:-2]:
+            os.remove(old)
+        self._since_snapshot = 0
+
+    def snapshot(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.flush()
+            self._write_snapshot()
+
+    def rebuild(self, use_snapshot: bool = True) -> LedgerState:
+        """Load the newest usable snapshot and replay the tail of the log"""
+        state = LedgerState()
+        if use_snapshot:
+            for path in reversed(self._snapshot_paths()):
+                try:
+                    with np.load(path) as arrays:
+                        candidate = LedgerState.from_arrays(arrays)
+                except (OSError, ValueError, KeyError):
+                    continue
+                if candidate.last_seq <= self.last_seq:
+                    state = candidate
+                    break
+        for batch in self.read(after_seq=state.last_seq):
+            state.apply_batch(batch)
+        state.compact()
+        return state
+
+    # -- downstream consumers ------------------------------------------------
+
+    def consumer(self, name: str) -> "LedgerConsumer":
+        return LedgerConsumer(self, name)
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        self._wallet_file.close()
+
+
+class LedgerConsumer:
+    """
+    Named reader with a persisted offset, for rollups fed by the ledger
+
+        consumer = ledger.consumer("portfolio-rollup")
+        for batch in consumer.poll():
+            update_rollup(batch)
+        consumer.commit()
+    """
+
+    def __init__(self, ledger: EventLedger, name: str):
+        self.ledger = ledger
+        self.name = name
+        self._path = os.path.join(ledger.directory, "consumers", f"{name}.offset")
+        self.offset = 0
+        if os.path.exists(self._path):
+            with open(self._path) as f:
+                self.offset = int(f.read().strip() or 0)
+        self._position = self.offset
+
+    def poll(self, batch_events: int = 100_000) -> Iterator[np.ndarray]:
+        for batch in self.ledger.read(after_seq=self._position, batch_events=batch_events):
+            self._position = int(batch["seq"][-1])
+            yield batch
+
+    def commit(self):
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self._position))
+        os.replace(tmp_path, self._path)
+        self.offset = self._position
+
+
+def ledger_stats(ledger: EventLedger) -> Dict[str, Any]:
+    state = ledger.state
+    with ledger._lock:
+        state.compact()
+    return {
+        "last_seq": state.last_seq,
+        "events": state.event_count,
+        "wallets": len(ledger._wallets) - 1,
+        "tokens_sold": int(state.tokens_sold.sum()),
+        "volume": float(state.idea_volume.sum()),
+        "royalties_paid": float(state.idea_royalties.sum()),
+        "open_positions": int(len(state.holding_keys)),
+    }
+
+
+def backfill_from_database(ledger: EventLedger, batch_size: int = 100_000) -> int:
+    """Import existing Investment and Trade rows in created_at order"""
+    from app import app, db, Investment, Trade
+
+    with app.app_context():
+        rows = db.session.query(
+            db.literal(PURCHASE), Investment.idea_id, Investment.tokens_purchased, Investment.amount_paid,
+            db.literal(None), Investment.investor_address, Investment.created_at
+        ).union_all(db.session.query(
+            db.literal(TRANSFER), Trade.idea_id, Trade.tokens, Trade.amount,
+            Trade.seller_address, Trade.buyer_address, Trade.created_at
+        )).order_by(db.text("7")).yield_per(batch_size)
+
+        total = 0
+        batch = []
+        for kind, idea_id, tokens, amount, src, dst, created_at in rows:
+            # created_at is naive UTC; .timestamp() would read it as local time
+            at = calendar.timegm(created_at.utctimetuple()) + created_at.microsecond / 1e6
+            batch.append((kind, idea_id, tokens, amount, src, dst, at))
+            if len(batch) >= batch_size:
+                ledger.append_many(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            ledger.append_many(batch)
+            total += len(batch)
+    return total
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IPInvest event ledger maintenance")
+    parser.add_argument("command", choices=["backfill", "rebuild", "snapshot", "stats"])
+    parser.add_argument("--dir", default=os.environ.get("IPINVEST_LEDGER_DIR", os.path.join("instance", "ledger")))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    ledger = EventLedger(args.dir)
+    if args.command == "backfill":
+        if ledger.last_seq:
+            parser.error(f"{args.dir} already holds {ledger.last_seq} events")
+        print(f"Imported {backfill_from_database(ledger):,} events")
+        ledger.snapshot()
+    elif args.command == "rebuild":
+        start = time.perf_counter()
+        state = ledger.rebuild(use_snapshot=False)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {state.event_count:,} events in {elapsed:.2f}s "
+              f"({state.event_count / max(elapsed, 1e-9):,.0f} events/s)")
+    elif args.command == "snapshot":
+        ledger.snapshot()
+    print(json.dumps(ledger_stats(ledger), indent=2))
+    ledger.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Faceted marketplace filtering
+Filters active ideas by field, token price, predicted value and remaining
+supply, and computes every facet count from one grouped query.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Index, and_, case, func, literal
+
+# Token price bucket edges; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (0, 500, 1000, 2000, 3000, 5000)
+DEFAULT_PER_PAGE = 60
+MAX_PER_PAGE = 200
+
+
+def price_bucket_labels() -> List[str]:
+    labels = [f"{lo:,}-{hi:,}" for lo, hi in zip(PRICE_BUCKET_EDGES, PRICE_BUCKET_EDGES[1:])]
+    labels.append(f"{PRICE_BUCKET_EDGES[-1]:,}+")
+    return labels
+
+
+def register_facet_indexes(Idea) -> list:
+    """Attach the composite indexes backing the marketplace filters to the idea table"""
+    return [
+        # Covers the facet query so it scans the index, not the wide idea rows
+        Index('ix_idea_facets', Idea.status, Idea.field, Idea.token_price, Idea.predicted_value,
+              Idea.total_tokens, Idea.tokens_sold),
+        Index('ix_idea_status_price', Idea.status, Idea.token_price),
+        Index('ix_idea_status_value', Idea.status, Idea.predicted_value),
+        Index('ix_idea_status_available', Idea.status, Idea.total_tokens - Idea.tokens_sold),
+    ]
+
+
+class MarketplaceFilters:
+    """Marketplace query parameters"""
+
+    def __init__(self, fields: Optional[List[str]] = None,
+                 min_price: Optional[float] = None, max_price: Optional[float] = None,
+                 min_value: Optional[float] = None, max_value: Optional[float] = None,
+                 min_available: Optional[int] = None,
+                 page: int = 1, per_page: int = DEFAULT_PER_PAGE):
+        self.fields = [f for f in (fields or []) if f]
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_value = min_value
+        self.max_value = max_value
+        self.min_available = min_available
+        self.page = max(1, page)
+        self.per_page = max(1, min(per_page, MAX_PER_PAGE))
+
+    @classmethod
+    def from_args(cls, args) -> "MarketplaceFilters":
+        """Build from request.args (?field=...&field=...&min_price=...)"""
+        return cls(
+            fields=args.getlist('field'),
+            min_price=args.get('min_price', type=float),
+            max_price=args.get('max_price', type=float),
+            min_value=args.get('min_value', type=float),
+            max_value=args.get('max_value', type=float),
+            min_available=args.get('min_available', type=int),
+            page=args.get('page', 1, type=int),
+            per_page=args.get('per_page', DEFAULT_PER_PAGE, type=int),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'field': self.fields,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'min_available': self.min_available,
+            'page': self.page,
+            'per_page': self.per_page,
+        }
+
+    def price_conditions(self, Idea) -> list:
+        conditions = []
+        if self.min_price is not None:
+            conditions.append(Idea.token_price >= self.min_price)
+        if self.max_price is not None:
+            conditions.append(Idea.token_price <= self.max_price)
+        return conditions
+
+    def field_conditions(self, Idea) -> list:
+        return [Idea.field.in_(self.fields)] if self.fields else []
+
+    def base_conditions(self, Idea) -> list:
+        """Filters that apply to every facet (everything except field and price)"""
+        conditions = [Idea.status == 'active']
+        if self.min_value is not None:
+            conditions.append(Idea.predicted_value >= self.min_value)
+        if self.max_value is not None:
+            conditions.append(Idea.predicted_value <= self.max_value)
+        if self.min_available is not None:
+            conditions.append(Idea.total_tokens - Idea.tokens_sold >= self.min_available)
+        return conditions
+
+    def all_conditions(self, Idea) -> list:
+        return self.base_conditions(Idea) + self.field_conditions(Idea) + self.price_conditions(Idea)
+
+
+def filter_ideas(session, Idea, filters: MarketplaceFilters) -> list:
+    """One page of ideas matching every filter, newest first"""
+    return (session.query(Idea)
+            .filter(*filters.all_conditions(Idea))
+            .order_by(Idea.id.desc())
+            .limit(filters.per_page)
+            .offset((filters.page - 1) * filters.per_page)
+            .all())
+
+
+def compute_facets(session, Idea, filters: MarketplaceFilters) -> Dict[str, Any]:
+    """
+    Facet counts from a single grouped query
+
+    Rows are grouped by (field, price bucket, inside-price-range flag) over
+    ideas matching the non-facet filters. Each facet is then rolled up in
+    Python with its own filter left out, so selecting a field still shows
+    counts for the other fields and vice versa.
+    """
+    edges = PRICE_BUCKET_EDGES
+    bucket = case(*[(Idea.token_price < edge, i) for i, edge in enumerate(edges[1:])],
+                  else_=len(edges) - 1)
+    price_conditions = filters.price_conditions(Idea)
+    in_price = case((and_(*price_conditions), 1), else_=0) if price_conditions else literal(1)
+
+    rows = (session.query(Idea.field, bucket.label('bucket'), in_price.label('in_price'),
+                          func.count(), func.sum(Idea.predicted_value), func.sum(Idea.tokens_sold))
+            .filter(*filters.base_conditions(Idea))
+            .group_by(Idea.field, 'bucket', 'in_price')
+            .all())
+
+    labels = price_bucket_labels()
+    selected = set(filters.fields)
+    field_counts: Dict[str, int] = {}
+    bucket_counts = [0] * len(labels)
+    total = 0
+    total_value = 0.0
+    total_tokens_sold = 0
+    for field, bucket_index, inside, count, value_sum, sold_sum in rows:
+        field_selected = not selected or field in selected
+        if inside:
+            field_counts[field] = field_counts.get(field, 0) + count
+        if field_selected:
+            bucket_counts[bucket_index] += count
+        if inside and field_selected:
+            total += count
+            total_value += value_sum or 0.0
+            total_tokens_sold += sold_sum or 0
+
+    return {
+        'total': total,
+        'total_value': total_value,
+        'total_tokens_sold': total_tokens_sold,
+        'fields': [{'field': f, 'count': c, 'selected': f in selected}
+                   for f, c in sorted(field_counts.items(), key=lambda item: (-item[1], item[0]))],
+        'price_buckets': [{'label': label,
+                           'min': edges[i],
+                           'max': edges[i + 1] if i + 1 < len(edges) else None,
+                           'count': bucket_counts[i]}
+                          for i, label in enumerate(labels)],
+    }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped idea feature store
+One fixed-width float32 row per idea, indexed by idea id, in a single file
+mapped MAP_SHARED. Rows are written when an idea is submitted, bought or
+traded, so valuation, recommendation and scoring code read features as
+numpy views instead of recomputing them from the Idea table, and every
+worker process shares one page-cached copy.
+
+Usage:
+    python feature_store.py rebuild   # rewrite every row from DATABASE_URL
+    python feature_store.py stats
+"""
+
+import json
+import os
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from valuation_model import FEATURE_COLUMNS, extract_features
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# ValuationModel inputs come first so they are one contiguous slice of a row
+COLUMNS = FEATURE_COLUMNS + [
+    'present', 'active', 'token_price', 'predicted_value', 'total_tokens', 'tokens_sold',
+    'funding_progress', 'upside', 'trade_count', 'trade_volume', 'last_trade_price',
+]
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+WIDTH = len(COLUMNS)
+TRADE_COLUMNS = ('trade_count', 'trade_volume', 'last_trade_price')
+
+MAGIC = b'IPFS'
+VERSION = 1
+# magic, version, width, rows (highest idea id + 1)
+HEADER_STRUCT = struct.Struct('<4sIII')
+HEADER_SIZE = 64
+INITIAL_CAPACITY = 1024
+ROW_BYTES = WIDTH * 4
+
+# Per-idea trade totals for rebuild()
+TRADE_STATS_SQL = """
+    SELECT idea_id, COUNT(*) AS trade_count, SUM(amount) AS trade_volume,
+           (SELECT t2.price FROM trade t2 WHERE t2.idea_id = trade.idea_id
+            ORDER BY t2.created_at DESC, t2.id DESC LIMIT 1) AS last_trade_price
+    FROM trade
+    GROUP BY idea_id
+"""
+IDEAS_SQL = """
+    SELECT id, title, description, field, predicted_value, total_tokens, tokens_sold, token_price, status
+    FROM idea
+"""
+
+
+def _value(idea, name):
+    return idea[name] if isinstance(idea, dict) else getattr(idea, name)
+
+
+def idea_row(idea) -> np.ndarray:
+    """
+    Feature row for an Idea (or a dict with the same keys), trade columns left at zero
+    """
+    row = np.zeros(WIDTH, dtype=np.float32)
+    row[:len(FEATURE_COLUMNS)] = extract_features(_value(idea, 'title'), _value(idea, 'description'),
+                                                  _value(idea, 'field'))
+    total_tokens = _value(idea, 'total_tokens') or 0
+    tokens_sold = _value(idea, 'tokens_sold') or 0
+    token_price = _value(idea, 'token_price') or 0.0
+    predicted_value = _value(idea, 'predicted_value') or 0.0
+    row[COLUMN_INDEX['present']] = 1
+    row[COLUMN_INDEX['active']] = (_value(idea, 'status') or 'active') == 'active'
+    row[COLUMN_INDEX['token_price']] = token_price
+    row[COLUMN_INDEX['predicted_value']] = predicted_value
+    row[COLUMN_INDEX['total_tokens']] = total_tokens
+    row[COLUMN_INDEX['tokens_sold']] = tokens_sold
+    row[COLUMN_INDEX['funding_progress']] = tokens_sold / total_tokens if total_tokens else 0.0
+    # Investor pool's share of predicted value per token, relative to the token price
+    row[COLUMN_INDEX['upside']] = (predicted_value * 0.3) / (token_price * total_tokens) \
+        if token_price and total_tokens else 0.0
+    return row
+
+
+class FeatureStore:
+    """
+    Fixed-width float32 feature rows in a shared memory-mapped file
+
+    The file grows by doubling; other processes notice the larger file and
+    remap on their next read past their mapped size. Writes take a thread
+    lock plus an flock on the file so counters stay exact across workers.
+    """
+
+    def __init__(self, path: str, initial_capacity: int = INITIAL_CAPACITY):
+        self.path = path
+        self._lock = threading.RLock()
+        self._rows = None
+        self._mapped_bytes = 0
+        self.created = False
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._file_lock():
+            if not self._valid_header():
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, HEADER_SIZE + initial_capacity * ROW_BYTES)
+                self._write_header(0)
+                self.created = True
+        self._remap()
+
+    # -- file handling ---------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _valid_header(self) -> bool:
+        header = os.pread(self._fd, HEADER_STRUCT.size, 0)
+        if len(header) < HEADER_STRUCT.size:
+            return False
+        magic, version, width, _ = HEADER_STRUCT.unpack(header)
+        return magic == MAGIC and version == VERSION and width == WIDTH
+
+    def _write_header(self, rows: int):
+        os.pwrite(self._fd, HEADER_STRUCT.pack(MAGIC, VERSION, WIDTH, rows), 0)
+
+    @property
+    def rows(self) -> int:
+        """Highest idea id written plus one"""
+        return HEADER_STRUCT.unpack(os.pread(self._fd, HEADER_STRUCT.size, 0))[3]
+
+    @property
+    def capacity(self) -> int:
+        return (self._mapped_bytes - HEADER_SIZE) // ROW_BYTES
+
+    def _remap(self):
+        size = os.fstat(self._fd).st_size
+        if size != self._mapped_bytes:
+            capacity = (size - HEADER_SIZE) // ROW_BYTES
+            self._rows = np.memmap(self.path, dtype=np.float32, mode='r+', offset=HEADER_SIZE,
+                                   shape=(capacity, WIDTH))
+            self._mapped_bytes = size
+
+    def _ensure_capacity(self, rows: int):
+        """Grow the file to hold `rows` rows; caller holds the file lock"""
+        self._remap()
+        if rows <= self.capacity:
+            return
+        capacity = max(self.capacity, 1)
+        while capacity < rows:
+            capacity *= 2
+        os.ftruncate(self._fd, HEADER_SIZE + capacity * ROW_BYTES)
+        self._remap()
+
+    def _mark_rows(self, rows: int):
+        if rows > self.rows:
+            self._write_header(rows)
+
+    # -- writes ----------------------------------------------------------------
+
+    def update_idea(self, idea):
+        """Write the Idea-derived columns of one row, keeping its trade totals"""
+        row = idea_row(idea)
+        idea_id = int(_value(idea, 'id'))
+        with self._file_lock():
+            self._ensure_capacity(idea_id + 1)
+            trade = [COLUMN_INDEX[name] for name in TRADE_COLUMNS]
+            row[trade] = self._rows[idea_id, trade]
+            self._rows[idea_id] = row
+            self._mark_rows(idea_id + 1)
+
+    def record_trades(self, fills: Iterable[Any]):
+        """Add matching engine fills to each idea's trade count, volume and last price"""
+        fills = list(fills)
+        if not fills:
+            return
+        with self._file_lock():
+            self._ensure_capacity(max(fill.idea_id for fill in fills) + 1)
+            for fill in fills:
+                row = self._rows[fill.idea_id]
+                row[COLUMN_INDEX['trade_count']] += 1
+                row[COLUMN_INDEX['trade_volume']] += fill.quantity * fill.price
+                row[COLUMN_INDEX['last_trade_price']] = fill.price
+
+    def rebuild(self, ideas: Iterable[Any], trade_stats: Optional[Dict[int, Dict[str, float]]] = None) -> int:
+        """
+        Rewrite every row from scratch
+
+        Args:
+            ideas: Idea rows or dicts
+            trade_stats: idea id -> {'trade_count', 'trade_volume', 'last_trade_price'}
+
+        Returns:
+            Number of ideas written
+        """
+        ideas = list(ideas)
+        trade_stats = trade_stats or {}
+        rows = max((int(_value(idea, 'id')) for idea in ideas), default=-1) + 1
+        matrix = np.zeros((rows, WIDTH), dtype=np.float32)
+        for idea in ideas:
+            idea_id = int(_value(idea, 'id'))
+            matrix[idea_id] = idea_row(idea)
+            for name, value in trade_stats.get(idea_id, {}).items():
+                matrix[idea_id, COLUMN_INDEX[name]] = value or 0.0
+        with self._file_lock():
+            self._ensure_capacity(rows)
+            self._rows[:rows] = matrix
+            self._rows[rows:] = 0
+            self._write_header(rows)
+        return len(ideas)
+
+    def clear(self):
+        with self._file_lock():
+            self._remap()
+            self._rows[:] = 0
+            self._write_header(0)
+
+    def flush(self):
+        with self._lock:
+            self._rows.flush()
+
+    # -- zero-copy reads -------------------------------------------------------
+
+    def matrix(self) -> np.ndarray:
+        """All rows as a (rows, WIDTH) view of the mapping; row i is idea i"""
+        rows = self.rows
+        if rows > self.capacity:
+            with self._lock:
+                self._remap()
+        return self._rows[:rows]
+
+    def column(self, name: str) -> np.ndarray:
+        """One column as a strided view, indexed by idea id"""
+        return self.matrix()[:, COLUMN_INDEX[name]]
+
+    def valuation_features(self) -> np.ndarray:
+        """ValuationModel inputs (FEATURE_COLUMNS) for every idea, as a view"""
+        return self.matrix()[:, :len(FEATURE_COLUMNS)]
+
+    def row(self, idea_id: int) -> Optional[np.ndarray]:
+        matrix = self.matrix()
+        if idea_id >= len(matrix) or not matrix[idea_id, COLUMN_INDEX['present']]:
+            return None
+        return matrix[idea_id]
+
+    def as_dict(self, idea_id: int) -> Optional[Dict[str, float]]:
+        row = self.row(idea_id)
+        return None if row is None else {name: float(value) for name, value in zip(COLUMNS, row)}
+
+    def stats(self) -> Dict[str, Any]:
+        matrix = self.matrix()
+        return {
+            'path': self.path,
+            'width': WIDTH,
+            'rows': len(matrix),
+            'ideas': int(np.count_nonzero(matrix[:, COLUMN_INDEX['present']])),
+            'capacity': self.capacity,
+            'bytes': self._mapped_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._rows is not None:
+                self._rows.flush()
+                self._rows = None
+            os.close(self._fd)
+
+
+def load_trade_stats(connection) -> Dict[int, Dict[str, float]]:
+    from sqlalchemy import text
+
+    return {row.idea_id: {'trade_count': row.trade_count, 'trade_volume': row.trade_volume,
+                          'last_trade_price': row.last_trade_price}
+            for row in connection.execute(text(TRADE_STATS_SQL))}
+
+
+def rebuild_from_database(store: FeatureStore, connection) -> int:
+    from sqlalchemy import text
+
+    ideas = [dict(row._mapping) for row in connection.execute(text(IDEAS_SQL))]
+    return store.rebuild(ideas, load_trade_stats(connection))
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else 'stats'
+    from app import app, db, feature_store
+
+    if command == 'rebuild':
+        with app.app_context(), db.engine.connect() as connection:
+            written = rebuild_from_database(feature_store, connection)
+        feature_store.flush()
+        print(f"Wrote {written} ideas to {feature_store.path}")
+    elif command == 'stats':
+        print(json.dumps(feature_store.stats(), indent=2))
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
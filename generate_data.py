@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for IPInvest
+Bulk-loads ideas, users and investments with skewed, realistic
+distributions and writes the matching ValuationModel training CSV.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/big.db python generate_data.py \\
+        --ideas 1000000 --users 500000 --investments 5000000 --csv patent_dataset.csv
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from search import bulk_load
+from valuation_model import FEATURE_COLUMNS, FIELD_COMPLEXITY, extract_features
+
+DEFAULT_SEED = 42
+INSERT_CHUNK = 250_000
+HISTORY_DAYS = 730
+WHALE_FRACTION = 0.01
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+FIRST_NAMES = ["Alice", "Bob", "Sarah", "Mike", "Priya", "Wei", "Fatima", "Carlos", "Yuki", "Olga",
+               "Kwame", "Elena", "Ravi", "Hannah", "Diego", "Mei", "Omar", "Ingrid", "Tunde", "Lucia"]
+LAST_NAMES = ["Chen", "Johnson", "Williams", "Rodriguez", "Patel", "Kim", "Nguyen", "Okafor", "Schmidt",
+              "Rossi", "Tanaka", "Silva", "Cohen", "Ivanova", "Mensah", "Dubois", "Haddad", "Larsen"]
+ADJECTIVES = ["Adaptive", "Autonomous", "Scalable", "Low-Power", "Self-Healing", "Distributed", "Modular",
+              "Next-Generation", "Bio-Inspired", "Secure", "Real-Time", "Portable", "High-Density", "Quantum-Safe"]
+NOUNS = ["Sensor Array", "Battery Cell", "Diagnosis Engine", "Supply Chain Ledger", "Drug Delivery System",
+         "Imaging Pipeline", "Control Algorithm", "Storage Medium", "Wearable Monitor", "Routing Protocol",
+         "Catalyst", "Antenna Design", "Recommendation Engine", "Encryption Scheme", "Robotic Gripper"]
+APPLICATIONS = ["smart cities", "rural clinics", "electric vehicles", "precision farming", "satellite networks",
+                "retail logistics", "drug discovery", "grid storage", "personal finance", "live streaming"]
+DESCRIPTION_PHRASES = [
+    "Patented approach that reduces cost by an order of magnitude",
+    "Uses machine learning to adapt to changing conditions",
+    "Validated in a pilot with three industrial partners",
+    "Blockchain audit trail for every transaction",
+    "Designed for mass manufacturing with existing tooling",
+    "Open licensing model with royalty sharing for token holders",
+    "Peer-reviewed results show significant efficiency gains",
+    "AI model trained on a proprietary dataset",
+    "Compatible with current regulatory frameworks",
+    "Prototype available with field trial data",
+]
+RISK_PREFERENCES = ["conservative", "moderate", "aggressive"]
+RISK_WEIGHTS = [0.3, 0.5, 0.2]
+
+FIELDS = list(FIELD_COMPLEXITY)
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def random_timestamps(rng: np.random.Generator, n: int, end: datetime) -> np.ndarray:
+    """Uniform datetime64[us] values over the HISTORY_DAYS before `end`"""
+    offsets = rng.integers(0, HISTORY_DAYS * 86_400_000_000, n).astype("timedelta64[us]")
+    return np.datetime64(end, "us") - offsets
+
+
+def format_timestamps(stamps: np.ndarray) -> list:
+    """datetime64 values in SQLAlchemy's SQLite DateTime storage format"""
+    return np.char.replace(np.datetime_as_string(stamps, unit="us"), "T", " ").tolist()
+
+
+def random_addresses(rng: np.random.Generator, n: int) -> List[str]:
+    """Bech32-looking andr1 addresses"""
+    table = np.frombuffer(BECH32_CHARSET.encode(), dtype=np.uint8)
+    body = table[rng.integers(0, 32, (n, 38))]
+    return ["andr1" + b.decode() for b in np.ascontiguousarray(body).view("S38").ravel()]
+
+
+def generate_ideas(rng: np.random.Generator, n: int):
+    """Idea text columns and field indices; field popularity is Zipf-skewed"""
+    field_idx = rng.choice(len(FIELDS), n, p=zipf_weights(len(FIELDS), 0.8))
+    adj = rng.integers(0, len(ADJECTIVES), n)
+    noun = rng.integers(0, len(NOUNS), n)
+    app = rng.integers(0, len(APPLICATIONS), n)
+    phrase_count = rng.integers(1, 5, n)
+    phrase_idx = rng.integers(0, len(DESCRIPTION_PHRASES), (n, 4))
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+
+    titles = [f"{ADJECTIVES[a]} {NOUNS[b]} for {APPLICATIONS[c]}" for a, b, c in zip(adj, noun, app)]
+    descriptions = [". ".join(DESCRIPTION_PHRASES[p] for p in row[:k]) + "."
+                    for row, k in zip(phrase_idx.tolist(), phrase_count.tolist())]
+    inventors = [f"Dr. {FIRST_NAMES[a]} {LAST_NAMES[b]}" for a, b in zip(first, last)]
+    return titles, descriptions, field_idx, inventors
+
+
+def predicted_values(rng: np.random.Generator, features: np.ndarray) -> np.ndarray:
+    """Lognormal valuations driven by the training features, so the model has signal to learn"""
+    log_value = (13.0
+                 + 0.08 * features[:, 2]          # field_complexity
+                 + 0.002 * features[:, 0]         # description_length
+                 + 0.35 * features[:, 3]          # ai_indicator
+                 + 0.15 * features[:, 4]          # blockchain_indicator
+                 + rng.normal(0, 0.25, len(features)))
+    return np.exp(log_value)
+
+
+def _insert(conn, table, columns: Sequence[str], rows) -> int:
+    """
+    executemany in the paramstyle of whatever DATABASE_URL points at
+
+    The statement is compiled by SQLAlchemy for the connection's dialect. The
+    columns are untyped so values reach the driver as generated (timestamps
+    stay ISO strings), and positional drivers such as sqlite3 get the row
+    tuples as they are.
+    """
+    from sqlalchemy import column, insert, table as table_clause
+
+    compiled = insert(table_clause(table.name, *(column(name) for name in columns))).compile(dialect=conn.dialect)
+    rows = list(rows)
+    if not rows:
+        return 0
+    if conn.dialect.positional:
+        order = [columns.index(name) for name in compiled.positiontup]
+        params = rows if order == list(range(len(columns))) else [tuple(row[i] for i in order) for row in rows]
+    else:
+        params = [dict(zip(columns, row)) for row in rows]
+    conn.exec_driver_sql(str(compiled), params)
+    return len(rows)
+
+
+def generate(ideas: int, users: int, investments: int, seed: int = DEFAULT_SEED,
+             csv_path: Optional[str] = None) -> Dict[str, float]:
+    """
+    Recreate the app database tables (DATABASE_URL) and bulk-load a synthetic dataset
+
+    Args:
+        ideas: Number of Idea rows
+        users: Number of User rows (investor wallets)
+        investments: Number of Investment rows
+        seed: RNG seed; the same seed always produces the same dataset
+        csv_path: Optional ValuationModel training CSV to write
+
+    Returns:
+        Seconds spent per stage
+    """
+    from app import app, db, Idea, Investment, User
+
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    timings = {}
+
+    start = time.perf_counter()
+    titles, descriptions, field_idx, inventors = generate_ideas(rng, ideas)
+    fields = [FIELDS[i] for i in field_idx]
+    features = np.array([extract_features(t, d, f) for t, d, f in zip(titles, descriptions, fields)],
+                        dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+    values = predicted_values(rng, features)
+    prices = values / 1000
+    idea_created = random_timestamps(rng, ideas, now)
+
+    wallets = random_addresses(rng, users)
+    # Power-law activity: a handful of whale wallets place a large share of orders
+    wallet_weights = rng.pareto(1.16, users) + 1
+    wallet_weights /= wallet_weights.sum()
+    whale_cutoff = np.quantile(wallet_weights, 1 - WHALE_FRACTION)
+    # Idea popularity is skewed too, independent of id order
+    idea_weights = zipf_weights(ideas, 1.1)[rng.permutation(ideas)]
+
+    inv_wallet = rng.choice(users, investments, p=wallet_weights).astype(np.int32)
+    inv_idea = rng.choice(ideas, investments, p=idea_weights).astype(np.int32)
+    inv_tokens = rng.geometric(0.35, investments).astype(np.int32)
+    inv_tokens[wallet_weights[inv_wallet] >= whale_cutoff] *= 10
+    tokens_sold = np.bincount(inv_idea, weights=inv_tokens, minlength=ideas).astype(np.int64)
+    total_tokens = np.maximum(1000, -(-tokens_sold // 1000) * 1000)
+    # Purchases happen between the idea's listing and now
+    inv_created = idea_created[inv_idea] + (
+        (np.datetime64(now, "us") - idea_created[inv_idea]) * rng.random(investments)).astype("timedelta64[us]")
+    timings["generate"] = time.perf_counter() - start
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        engine = db.engine
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.commit()
+
+            start = time.perf_counter()
+            with conn.begin(), bulk_load(conn):
+                _insert(conn, Idea.__table__,
+                        ("id", "title", "description", "field", "inventor", "predicted_value", "total_tokens",
+                         "tokens_sold", "token_price", "nft_id", "created_at", "status"),
+                        zip(range(1, ideas + 1), titles, descriptions, fields, inventors,
+                            values.tolist(), total_tokens.tolist(), tokens_sold.tolist(), prices.tolist(),
+                            (f"IP-GEN-{seed}-{i}" for i in range(ideas)), format_timestamps(idea_created),
+                            ["active"] * ideas))
+            timings["ideas"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            first = rng.integers(0, len(FIRST_NAMES), users)
+            last = rng.integers(0, len(LAST_NAMES), users)
+            risk = rng.choice(len(RISK_PREFERENCES), users, p=RISK_WEIGHTS)
+            with conn.begin():
+                _insert(conn, User.__table__,
+                        ("name", "wallet_address", "risk_preference", "created_at"),
+                        zip((f"{FIRST_NAMES[a]} {LAST_NAMES[b]}" for a, b in zip(first, last)), wallets,
+                            (RISK_PREFERENCES[r] for r in risk), format_timestamps(random_timestamps(rng, users, now))))
+            timings["users"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with conn.begin():
+                for lo in range(0, investments, INSERT_CHUNK):
+                    hi = min(lo + INSERT_CHUNK, investments)
+                    idea_ids = inv_idea[lo:hi]
+                    tokens = inv_tokens[lo:hi]
+                    _insert(conn, Investment.__table__,
+                            ("investor_address", "idea_id", "tokens_purchased", "amount_paid",
+                             "transaction_hash", "created_at"),
+                            zip((wallets[w] for w in inv_wallet[lo:hi].tolist()),
+                                (idea_ids + 1).tolist(), tokens.tolist(),
+                                (tokens * prices[idea_ids]).tolist(),
+                                (f"TX-GEN-{seed}-{i:x}" for i in range(lo, hi)),
+                                format_timestamps(inv_created[lo:hi])))
+            timings["investments"] = time.perf_counter() - start
+
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("PRAGMA synchronous=FULL")
+                conn.commit()
+
+    if csv_path:
+        start = time.perf_counter()
+        write_training_csv(csv_path, features, values)
+        timings["csv"] = time.perf_counter() - start
+    return timings
+
+
+def write_training_csv(path: str, features: np.ndarray, valuations: np.ndarray):
+    """CSV in the layout ValuationModel.train expects: FEATURE_COLUMNS + valuation"""
+    import pandas as pd
+
+    df = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    df["valuation"] = valuations
+    df.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic IPInvest dataset")
+    parser.add_argument("--ideas", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--investments", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--csv", default=None, help="also write the ValuationModel training CSV here")
+    args = parser.parse_args(argv)
+
+    if args.ideas < 1 or args.users < 1:
+        parser.error("--ideas and --users must be at least 1")
+
+    start = time.perf_counter()
+    timings = generate(args.ideas, args.users, args.investments, args.seed, args.csv)
+    for stage, seconds in timings.items():
+        print(f"{stage:<12} {seconds:6.2f}s")
+    print(f"{'total':<12} {time.perf_counter() - start:6.2f}s "
+          f"({args.ideas:,} ideas, {args.users:,} users, {args.investments:,} investments)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Trending leaderboards maintained on every purchase
+Each board is a sliding-window counter: totals per key plus a ring of
+time buckets, so expiring old activity only touches the keys in the
+expired bucket. The top entries are kept sorted as purchases arrive and
+recomputed with a bounded heap only when an expiry lowers a leader, so
+reads return a prepared list in O(k).
+"""
+
+import calendar
+import heapq
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Tuple
+
+DAY = 86_400
+HOUR = 3_600
+MAX_K = 50
+DEFAULT_K = 5
+
+MOST_FUNDED = "most_funded_today"
+FASTEST_SELLING = "fastest_selling"
+HOTTEST_FIELDS = "hottest_fields"
+
+# Investments recent enough to count towards any board, oldest first
+RECENT_INVESTMENTS_SQL = """
+    SELECT investment.idea_id, idea.title, idea.field, idea.total_tokens,
+           investment.tokens_purchased, investment.amount_paid, investment.created_at
+    FROM investment JOIN idea ON idea.id = investment.idea_id
+    WHERE investment.created_at >= :since
+    ORDER BY investment.created_at
+"""
+
+
+class SlidingTopK:
+    """
+    Per-key sums over the last `window` seconds with the top `capacity` keys kept sorted
+
+    Args:
+        window: seconds of history counted
+        buckets: resolution; an event expires between window - window/buckets
+            and window seconds after it happened
+    """
+
+    def __init__(self, window: float, buckets: int = 60, capacity: int = MAX_K,
+                 clock: Callable[[], float] = time.time):
+        self.window = window
+        self.bucket_seconds = window / buckets
+        self.buckets = buckets
+        self.capacity = capacity
+        self.clock = clock
+        self.totals: Dict[Hashable, float] = {}
+        self.counts: Dict[Hashable, int] = {}
+        # (bucket number, {key: [amount, count]}), oldest first
+        self._ring: Deque[Tuple[int, Dict[Hashable, List[float]]]] = deque()
+        self._top: List[Tuple[float, Hashable]] = []  # (total, key), largest first
+        self.recomputes = 0
+
+    def _bucket(self, at: float) -> int:
+        return int(at // self.bucket_seconds)
+
+    def add(self, key: Hashable, amount: float, at: Optional[float] = None):
+        now = self.clock()
+        at = now if at is None else at
+        number = self._bucket(at)
+        self._expire(self._bucket(now))
+        if number <= self._bucket(now) - self.buckets:
+            return  # already outside the window
+
+        # Events arrive in time order, so the target bucket is almost always the newest
+        if self._ring and self._ring[-1][0] == number:
+            counts = self._ring[-1][1]
+        elif not self._ring or self._ring[-1][0] < number:
+            counts = {}
+            self._ring.append((number, counts))
+        else:
+            counts = next((c for n, c in self._ring if n == number), None)
+            if counts is None:
+                counts = {}
+                self._ring = deque(sorted([*self._ring, (number, counts)], key=lambda bucket: bucket[0]))
+        entry = counts.setdefault(key, [0.0, 0])
+        entry[0] += amount
+        entry[1] += 1
+
+        total = self.totals.get(key, 0.0) + amount
+        self.totals[key] = total
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self._raise(key, total)
+
+    def _raise(self, key: Hashable, total: float):
+        """Move a key whose total went up into place among the leaders; O(capacity)"""
+        for i, (_, leader) in enumerate(self._top):
+            if leader == key:
+                del self._top[i]
+                break
+        else:
+            if len(self._top) >= self.capacity and total <= self._top[-1][0]:
+                return
+        position = len(self._top)
+        while position and self._top[position - 1][0] < total:
+            position -= 1
+        self._top.insert(position, (total, key))
+        del self._top[self.capacity:]
+
+    def _expire(self, current: int):
+        lowered = False
+        leaders = None
+        while self._ring and self._ring[0][0] <= current - self.buckets:
+            _, counts = self._ring.popleft()
+            if leaders is None:
+                leaders = {key for _, key in self._top}
+            for key, (amount, count) in counts.items():
+                remaining = self.totals[key] - amount
+                if self.counts[key] - count <= 0:
+                    del self.totals[key], self.counts[key]
+                else:
+                    self.totals[key] = remaining
+                    self.counts[key] -= count
+                lowered = lowered or key in leaders
+        if lowered:
+            # A leader went down; someone outside the list may now belong in it
+            self._top = [(total, key) for key, total in
+                         heapq.nlargest(self.capacity, self.totals.items(), key=lambda item: item[1])]
+            self.recomputes += 1
+
+    def top(self, k: int = DEFAULT_K) -> List[Tuple[Hashable, float, int]]:
+        """(key, total, events) for the k largest totals in the window"""
+        self._expire(self._bucket(self.clock()))
+        return [(key, total, self.counts[key]) for total, key in self._top[:k]]
+
+    def clear(self):
+        self.totals.clear()
+        self.counts.clear()
+        self._ring.clear()
+        self._top = []
+
+
+class Leaderboards:
+    """
+    "Most funded today", "fastest selling" and "hottest fields", fed by record_purchase()
+
+    Fastest selling ranks ideas by the share of their token supply sold in
+    the last hour; the other two rank funding raised in the last 24 hours.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.boards = {
+            MOST_FUNDED: SlidingTopK(DAY, buckets=288, clock=clock),
+            FASTEST_SELLING: SlidingTopK(HOUR, buckets=60, clock=clock),
+            HOTTEST_FIELDS: SlidingTopK(DAY, buckets=288, clock=clock),
+        }
+        # Title and field of ideas still counted by an idea board
+        self.ideas: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def record_purchase(self, idea_id: int, title: str, field: str, total_tokens: int, tokens: int,
+                        amount: float, at: Optional[float] = None):
+        with self._lock:
+            self.ideas[idea_id] = (title, field)
+            self.boards[MOST_FUNDED].add(idea_id, amount, at)
+            self.boards[FASTEST_SELLING].add(idea_id, tokens / total_tokens if total_tokens else 0.0, at)
+            self.boards[HOTTEST_FIELDS].add(field, amount, at)
+            self._prune()
+
+    def _prune(self):
+        """Drop ideas whose purchases have all expired; waits for the map to double, so O(1) amortized"""
+        funded, selling = self.boards[MOST_FUNDED].totals, self.boards[FASTEST_SELLING].totals
+        if len(self.ideas) > 2 * (len(funded) + len(selling)):
+            self.ideas = {idea_id: info for idea_id, info in self.ideas.items()
+                          if idea_id in funded or idea_id in selling}
+
+    def rebuild(self, rows: Iterable[Any]):
+        """Replay recent investments (RECENT_INVESTMENTS_SQL rows, oldest first)"""
+        with self._lock:
+            for board in self.boards.values():
+                board.clear()
+            self.ideas.clear()
+        for row in rows:
+            created_at = row.created_at
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at)
+            self.record_purchase(row.idea_id, row.title, row.field, row.total_tokens, row.tokens_purchased,
+                                 row.amount_paid, at=calendar.timegm(created_at.utctimetuple()))
+
+    def snapshot(self, k: int = DEFAULT_K) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            funded = self.boards[MOST_FUNDED].top(k)
+            selling = self.boards[FASTEST_SELLING].top(k)
+            fields = self.boards[HOTTEST_FIELDS].top(k)
+            self._prune()
+            ideas = self.ideas
+            return {
+                MOST_FUNDED: [{"idea_id": idea_id, "title": ideas[idea_id][0], "field": ideas[idea_id][1],
+                               "amount": round(total, 2), "investments": count}
+                              for idea_id, total, count in funded],
+                FASTEST_SELLING: [{"idea_id": idea_id, "title": ideas[idea_id][0], "field": ideas[idea_id][1],
+                                   "supply_sold_last_hour": round(total, 4), "investments": count}
+                                  for idea_id, total, count in selling],
+                HOTTEST_FIELDS: [{"field": field, "amount": round(total, 2), "investments": count}
+                                 for field, total, count in fields],
+            }
+
+
+def load_recent(connection, window: float = DAY, now: Optional[float] = None):
+    from sqlalchemy import text
+
+    since = datetime.utcfromtimestamp((now or time.time()) - window)
+    return list(connection.execute(text(RECENT_INVESTMENTS_SQL), {"since": since}))
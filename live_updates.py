@@ -0,0 +1,176 @@
+"""
+Live funding updates over server-sent events
+invest() and submit_idea() publish into a Broadcaster; rapid updates to the
+same idea are coalesced, each flushed update is serialized once into a
+shared ring of SSE frames, and every subscriber reads from that ring, so
+fan-out cost does not grow with the number of updates per idea.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+DEFAULT_FLUSH_INTERVAL = 0.2
+DEFAULT_HEARTBEAT = 15.0
+DEFAULT_BUFFER = 4096
+
+IDEA_UPDATE = "idea"
+NEW_IDEA = "new_idea"
+RESET = "reset"
+
+
+class Broadcaster:
+    """
+    Coalescing publish/subscribe hub for SSE streams
+
+    publish() only records the latest payload per (event, key); a background
+    flusher turns pending payloads into frames every `flush_interval` and
+    wakes all subscribers with one notify_all(). Frames carry monotonically
+    increasing ids, so reconnecting clients resume via Last-Event-ID.
+    """
+
+    def __init__(self, flush_interval: float = DEFAULT_FLUSH_INTERVAL, heartbeat: float = DEFAULT_HEARTBEAT,
+                 buffer_size: int = DEFAULT_BUFFER):
+        self.flush_interval = flush_interval
+        self.heartbeat = heartbeat
+        # (frame id, idea id or None, encoded frame)
+        self.frames: Deque[Tuple[int, Optional[int], bytes]] = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self.subscribers = 0
+        self.published = 0
+        self.flushed = 0
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    # -- publishing ----------------------------------------------------------
+
+    def publish(self, event: str, payload: Dict[str, Any], idea_id: Optional[int] = None):
+        """Queue an update; a newer update for the same (event, idea) replaces it"""
+        with self._pending_lock:
+            # Only per-idea updates coalesce; other events are all delivered
+            key = (event, idea_id) if idea_id is not None else (event, None, self.published)
+            self._pending[key] = payload
+            self.published += 1
+        self._ensure_flusher()
+
+    def publish_idea(self, idea):
+        """Funding progress for an idea row"""
+        self.publish(IDEA_UPDATE, {
+            "idea_id": idea.id,
+            "tokens_sold": idea.tokens_sold or 0,
+            "total_tokens": idea.total_tokens,
+            "tokens_available": idea.total_tokens - (idea.tokens_sold or 0),
+            "progress": round((idea.tokens_sold or 0) / idea.total_tokens * 100, 2) if idea.total_tokens else 0,
+        }, idea_id=idea.id)
+
+    def flush(self) -> int:
+        """Encode pending updates into frames and wake subscribers; returns frames written"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        with self._cond:
+            for key, payload in pending.items():
+                self.last_id += 1
+                data = json.dumps(payload, separators=(",", ":"))
+                frame = f"id: {self.last_id}\nevent: {key[0]}\ndata: {data}\n\n".encode()
+                self.frames.append((self.last_id, key[1], frame))
+            self.flushed += len(pending)
+            self._cond.notify_all()
+        return len(pending)
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._pending_lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._stopped.clear()
+                    self._flusher = threading.Thread(target=self._run, name="sse-flusher", daemon=True)
+                    self._flusher.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # -- subscribing ---------------------------------------------------------
+
+    def _frames_after(self, last_seen: int, ideas: Optional[Set[int]]) -> Tuple[list, int, bool]:
+        """Frames newer than last_seen for the subscription; flags a gap if the ring overflowed"""
+        frames = self.frames
+        newest = frames[-1][0] if frames else last_seen
+        if newest <= last_seen:
+            return [], last_seen, False
+        # Frame ids are contiguous, so only the newest (newest - last_seen) entries are walked
+        count = min(newest - last_seen, len(frames))
+        lagged = count < newest - last_seen
+        selected = [frame for _, idea_id, frame in islice(reversed(frames), count)
+                    if ideas is None or idea_id is None or idea_id in ideas]
+        selected.reverse()
+        return selected, newest, lagged
+
+    def subscribe(self, ideas: Optional[Iterable[int]] = None, last_event_id: Optional[int] = None,
+                  timeout: Optional[float] = None) -> Iterator[bytes]:
+        """
+        Yield encoded SSE frames for a client
+
+        Args:
+            ideas: Only updates for these idea ids (plus new-idea events); None for everything
+            last_event_id: Resume after this frame id; None starts at the live edge
+            timeout: Stop after this many seconds (tests and load shedding)
+        """
+        ideas = set(ideas) if ideas else None
+        deadline = time.monotonic() + timeout if timeout else None
+        self._ensure_flusher()
+        with self._cond:
+            self.subscribers += 1
+            last_seen = self.last_id if last_event_id is None else last_event_id
+            # An id from before a server restart cannot be resumed
+            stale = last_seen > self.last_id
+            last_seen = min(last_seen, self.last_id)
+        try:
+            yield f"retry: 3000\n: connected {last_seen}\n\n".encode()
+            if stale:
+                yield f"event: {RESET}\ndata: {{}}\n\n".encode()
+            last_write = time.monotonic()
+            while not self._stopped.is_set():
+                with self._cond:
+                    if self.last_id <= last_seen:
+                        wait = self.heartbeat - (time.monotonic() - last_write)
+                        if deadline:
+                            wait = min(wait, deadline - time.monotonic())
+                        if wait > 0:
+                            self._cond.wait(wait)
+                    frames, last_seen, lagged = self._frames_after(last_seen, ideas)
+                if lagged:
+                    frames.insert(0, f"event: {RESET}\ndata: {{}}\n\n".encode())
+                now = time.monotonic()
+                if frames:
+                    yield b"".join(frames)
+                    last_write = now
+                elif now - last_write >= self.heartbeat:
+                    yield b": keepalive\n\n"
+                    last_write = now
+                if deadline and now >= deadline:
+                    return
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "flushed": self.flushed,
+            "last_event_id": self.last_id,
+            "buffered_frames": len(self.frames),
+        }
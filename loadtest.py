@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the whole app
+Seeds a scratch database, replaces the chain REST API with a local stub and
+drives a weighted mix of browse, idea_detail, invest, portfolio,
+recommendation and splitter-query requests from a growing number of
+closed-loop clients. Each stage reports throughput, error rate and
+p50/p95/p99 latency per route; the ramp stops once more clients no longer
+buy more throughput, and that knee is reported as the saturation point.
+
+Usage:
+    python loadtest.py --rows 100000 --stages 1,2,4,8,16,32 --seconds 10
+    python loadtest.py --mode server --mix browse=50,invest=50 --output load.json
+    python loadtest.py --baseline load.json --threshold 0.10   # after a change
+"""
+
+import argparse
+import bisect
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+DEFAULT_ROWS = 100_000
+DEFAULT_STAGES = (1, 2, 4, 8, 16, 32, 64)
+DEFAULT_STAGE_SECONDS = 10.0
+DEFAULT_MIX = {"browse": 30, "idea_detail": 25, "invest": 15, "portfolio": 10, "recommendations": 10,
+               "splitter": 10}
+# A stage must beat the best throughput so far by this much to count as scaling
+SATURATION_GAIN = 0.05
+# Stop after this many stages in a row that don't scale
+SATURATION_PATIENCE = 2
+MAX_ERROR_RATE = 0.01
+DEFAULT_THRESHOLD = 0.10
+WALLET_SAMPLE = 1_000
+
+LOAD_SPLITTER = "andr1loadsplitter"
+LOAD_CREATOR = "andr1loadcreator"
+LOAD_TREASURY = "andr1loadtreasury"
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+# name -> function(targets, rng) returning (method, path, json body)
+ROUTES: Dict[str, Callable[["Targets", random.Random], Request]] = {}
+
+
+def route(name: str):
+    """Register a request type for the workload mix"""
+    def decorator(fn):
+        ROUTES[name] = fn
+        return fn
+    return decorator
+
+
+class Targets:
+    """
+    Ideas and wallets the workload picks from
+
+    Ideas are drawn in proportion to tokens sold, so popular ideas get the
+    same share of detail views and purchases they get in the seeded history.
+    """
+
+    def __init__(self, idea_ids: Sequence[int], popularity: Sequence[float], wallets: Sequence[str],
+                 splitter: str = LOAD_SPLITTER, creator: str = LOAD_CREATOR):
+        self.idea_ids = list(idea_ids)
+        self.cum_weights = list(np.cumsum(popularity, dtype=float))
+        self.wallets = list(wallets)
+        self.splitter = splitter
+        self.creator = creator
+
+    def idea(self, rng: random.Random) -> int:
+        return self.idea_ids[bisect.bisect(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+    def wallet(self, rng: random.Random) -> str:
+        return rng.choice(self.wallets)
+
+    @classmethod
+    def from_database(cls, app_module, wallets: int = WALLET_SAMPLE, seed: int = 42) -> "Targets":
+        Idea, User, db = app_module.Idea, app_module.User, app_module.db
+        with app_module.app.app_context():
+            ideas = db.session.query(Idea.id, Idea.tokens_sold).filter_by(status='active').order_by(Idea.id).all()
+            addresses = [row[0] for row in db.session.query(User.wallet_address).order_by(User.id)]
+        sample = random.Random(seed).sample(addresses, min(wallets, len(addresses)))
+        return cls([idea_id for idea_id, _ in ideas], [(sold or 0) + 1 for _, sold in ideas], sample)
+
+
+@route("browse")
+def browse(targets: Targets, rng: random.Random) -> Request:
+    return "GET", "/", None
+
+
+@route("idea_detail")
+def idea_detail(targets: Targets, rng: random.Random) -> Request:
+    return "GET", f"/idea/{targets.idea(rng)}", None
+
+
+@route("invest")
+def invest(targets: Targets, rng: random.Random) -> Request:
+    return "POST", f"/invest/{targets.idea(rng)}", {"tokens": 1, "wallet_address": targets.wallet(rng)}
+
+
+@route("portfolio")
+def portfolio(targets: Targets, rng: random.Random) -> Request:
+    return "GET", f"/portfolio/{targets.wallet(rng)}", None
+
+
+@route("recommendations")
+def recommendations(targets: Targets, rng: random.Random) -> Request:
+    return "GET", f"/api/recommendations?wallet={targets.wallet(rng)}&limit=10", None
+
+
+@route("splitter")
+def splitter_query(targets: Targets, rng: random.Random) -> Request:
+    return "POST", "/api/splitter/query", {"splitter_address": targets.splitter, "creator_address": targets.creator}
+
+
+class ClientTransport:
+    """Requests through Flask's test client, one client per worker thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method: str, path: str, body: Optional[Dict[str, Any]]) -> int:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HTTPTransport:
+    """Requests over HTTP to a running server, one connection per worker thread"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parsed = urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, method: str, path: str, body: Optional[Dict[str, Any]]) -> int:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port,
+                                                                              timeout=self.timeout)
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        try:
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            raise
+        return response.status
+
+
+def serve(app, host: str = "127.0.0.1", port: int = 0):
+    """Threaded werkzeug server for `app` on a background thread; returns (server, base_url)"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass  # one access-log line per request would dominate the run
+
+    server = make_server(host, port, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def latency_stats(latencies: Sequence[float], errors: int, seconds: float) -> Dict[str, float]:
+    """Throughput, error rate and latency percentiles (ms) for one route or the whole stage"""
+    count = len(latencies)
+    if not count:
+        return {"requests": 0, "throughput": 0.0, "error_rate": 0.0,
+                "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "requests": count,
+        "throughput": count / seconds if seconds else 0.0,
+        "error_rate": errors / count,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(max(latencies) * 1000),
+    }
+
+
+def run_stage(transport, targets: Targets, mix: Dict[str, float], concurrency: int, seconds: float,
+              seed: int = 42) -> Dict[str, Any]:
+    """
+    `concurrency` clients each sending the next request as soon as the last one returns
+
+    Requests still in flight at the deadline are allowed to finish and count
+    towards the stage; the stage lasts until the last one does.
+    """
+    names = list(mix)
+    cum_weights = list(np.cumsum([mix[name] for name in names], dtype=float))
+    # One list of (route index, latency, status) per client; status None is a transport failure
+    samples: List[List[Tuple[int, float, Optional[int]]]] = [[] for _ in range(concurrency)]
+    ready = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client(number: int):
+        rng = random.Random(seed * 1_000_003 + number)
+        out = samples[number]
+        ready.wait()
+        while time.perf_counter() < deadline[0]:
+            index = bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+            method, path, body = ROUTES[names[index]](targets, rng)
+            start = time.perf_counter()
+            try:
+                status = transport.send(method, path, body)
+            except Exception:
+                status = None
+            out.append((index, time.perf_counter() - start, status))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    deadline[0] = start + seconds
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    per_route: Dict[int, List[float]] = {i: [] for i in range(len(names))}
+    errors = [0] * len(names)
+    statuses: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    for out in samples:
+        for index, latency, status in out:
+            per_route[index].append(latency)
+            key = str(status) if status is not None else "failed"
+            statuses[names[index]][key] = statuses[names[index]].get(key, 0) + 1
+            if status is None or status >= 400:
+                errors[index] += 1
+    everything = [latency for out in samples for _, latency, _ in out]
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "total": latency_stats(everything, sum(errors), elapsed),
+        "routes": {name: {**latency_stats(per_route[i], errors[i], elapsed), "statuses": statuses[name]}
+                   for i, name in enumerate(names)},
+    }
+
+
+def find_saturation(stages: Sequence[Dict[str, Any]], gain: float = SATURATION_GAIN,
+                    max_error_rate: float = MAX_ERROR_RATE) -> Optional[Dict[str, Any]]:
+    """
+    The fewest clients that get within `gain` of the best healthy throughput
+
+    Beyond that point extra clients only wait in line: latency grows and
+    throughput stays flat. Stages over the error budget don't count.
+    `saturated` is False when the knee is the last stage run, i.e. the
+    ramp ended before throughput levelled off.
+    """
+    healthy = [stage for stage in stages if stage["total"]["error_rate"] <= max_error_rate]
+    if not healthy:
+        return None
+    peak = max(stage["total"]["throughput"] for stage in healthy)
+    knee = next(stage for stage in healthy if stage["total"]["throughput"] >= peak * (1 - gain))
+    return {
+        "concurrency": knee["concurrency"],
+        "throughput": knee["total"]["throughput"],
+        "p99_ms": knee["total"]["p99_ms"],
+        "peak_throughput": peak,
+        "saturated": knee["concurrency"] < max(stage["concurrency"] for stage in stages),
+    }
+
+
+def ramp(transport, targets: Targets, mix: Dict[str, float], stages: Sequence[int] = DEFAULT_STAGES,
+         seconds: float = DEFAULT_STAGE_SECONDS, gain: float = SATURATION_GAIN,
+         patience: int = SATURATION_PATIENCE, max_error_rate: float = MAX_ERROR_RATE,
+         log=None) -> Dict[str, Any]:
+    """
+    Run each concurrency level in turn until throughput stops scaling
+
+    Args:
+        stages: increasing client counts
+        patience: stop after this many stages in a row that neither beat the
+            best throughput by `gain` nor stay within the error budget (0: run them all)
+    """
+    unknown = set(mix) - set(ROUTES)
+    if unknown:
+        raise ValueError(f"unknown routes: {', '.join(sorted(unknown))}")
+    results = []
+    best = 0.0
+    flat = 0
+    for concurrency in stages:
+        stage = run_stage(transport, targets, mix, concurrency, seconds)
+        results.append(stage)
+        total = stage["total"]
+        if log:
+            log(f"  clients={concurrency:<4} {total['throughput']:8.1f} req/s  errors={total['error_rate']:6.2%}  "
+                f"p50={total['p50_ms']:.1f}ms p95={total['p95_ms']:.1f}ms p99={total['p99_ms']:.1f}ms")
+        if total["throughput"] > best * (1 + gain) and total["error_rate"] <= max_error_rate:
+            best, flat = total["throughput"], 0
+        else:
+            flat += 1
+            if patience and flat >= patience:
+                break
+    return {"stages": results, "saturation": find_saturation(results, gain, max_error_rate)}
+
+
+def compare_load(baseline: Dict[str, Any], current: Dict[str, Any],
+                 threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Regressions between two load reports
+
+    Flags a drop in saturation throughput, and any route whose p99 grew at
+    the baseline's saturation concurrency, by more than `threshold`.
+    """
+    regressions = []
+    before, after = baseline.get("saturation"), current.get("saturation")
+    if before and after and after["throughput"] < before["throughput"] * (1 - threshold):
+        regressions.append({"metric": "saturation_throughput", "baseline": before["throughput"],
+                            "current": after["throughput"],
+                            "change": after["throughput"] / before["throughput"] - 1})
+    if not before:
+        return regressions
+    stage = lambda report: next((s for s in report["stages"] if s["concurrency"] == before["concurrency"]), None)
+    old, new = stage(baseline), stage(current)
+    if old and new:
+        for name, stats in old["routes"].items():
+            now = new["routes"].get(name)
+            if now and stats["p99_ms"] and now["p99_ms"] > stats["p99_ms"] * (1 + threshold):
+                regressions.append({"metric": f"{name}.p99_ms", "concurrency": before["concurrency"],
+                                    "baseline": stats["p99_ms"], "current": now["p99_ms"],
+                                    "change": now["p99_ms"] / stats["p99_ms"] - 1})
+    return regressions
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'browse=30,invest=15' -> {'browse': 30.0, 'invest': 15.0}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def route_table(stage: Dict[str, Any]) -> str:
+    lines = [f"{'route':<16} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for name, stats in stage["routes"].items():
+        lines.append(f"{name:<16} {stats['throughput']:8.1f} {stats['error_rate']:7.2%} {stats['p50_ms']:8.1f} "
+                     f"{stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}")
+    return "\n".join(lines)
+
+
+def run_load_test(rows: int = DEFAULT_ROWS, mix: Optional[Dict[str, float]] = None,
+                  stages: Sequence[int] = DEFAULT_STAGES, seconds: float = DEFAULT_STAGE_SECONDS,
+                  mode: str = "client", chain_delay: float = 0.0, patience: int = SATURATION_PATIENCE,
+                  seed: int = 42) -> Dict[str, Any]:
+    """
+    Seed a scratch database with `rows` investments and ramp the mixed workload against it
+
+    Args:
+        mode: 'client' drives the WSGI app in-process; 'server' starts a
+            threaded HTTP server and goes through real sockets
+        chain_delay: seconds the chain stub waits before answering each query
+    """
+    from benchmarks import _git_commit, seed_investments, use_scratch_environment
+    from chain_stub import LocalChainREST
+
+    mix = mix or dict(DEFAULT_MIX)
+    workdir = tempfile.mkdtemp(prefix="ipinvest-load-")
+    use_scratch_environment(workdir)
+    # Refresh portfolio analytics on the app's own timer, as in production, not on every read after a write
+    os.environ.pop("IPINVEST_ANALYTICS_INTERVAL", None)
+    chain = LocalChainREST().start()
+    chain.add_splitter(LOAD_SPLITTER, {LOAD_CREATOR: 0.7, LOAD_TREASURY: 0.3})
+    chain.balances[LOAD_CREATOR] = {"uandr": 1_000_000}
+    if chain_delay:
+        chain.inject(slow_rate=1.0, slow_seconds=chain_delay)
+    # Read when splitter_ado is imported, i.e. with app.py just below
+    os.environ["IPINVEST_CHAIN_REST"] = chain.url
+    import app as app_module
+
+    server = None
+    try:
+        seed_start = time.perf_counter()
+        with app_module.app.app_context():
+            seed_investments(app_module, rows, seed)
+            app_module.init_demo_data()
+        app_module.portfolio_cache.mark_dirty()
+        targets = Targets.from_database(app_module, seed=seed)
+        print(f"Seeded {rows:,} investments in {time.perf_counter() - seed_start:.1f}s", file=sys.stderr)
+
+        if mode == "server":
+            server, url = serve(app_module.app)
+            transport = HTTPTransport(url)
+        else:
+            transport = ClientTransport(app_module.app)
+        report = ramp(transport, targets, mix, stages, seconds, patience=patience,
+                      log=lambda line: print(line, file=sys.stderr))
+    finally:
+        if server is not None:
+            server.shutdown()
+        chain.stop()
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": mode,
+            "rows": rows,
+            "mix": mix,
+            "stage_seconds": seconds,
+            "chain_delay": chain_delay,
+        },
+        **report,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPInvest concurrent load test")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="investment rows to seed")
+    parser.add_argument("--stages", default=",".join(str(s) for s in DEFAULT_STAGES),
+                        help="comma-separated concurrent client counts")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_STAGE_SECONDS, help="duration of each stage")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help=f"route=weight pairs from: {', '.join(ROUTES)}")
+    parser.add_argument("--mode", choices=["client", "server"], default="client")
+    parser.add_argument("--chain-delay-ms", type=float, default=0.0, help="latency added by the chain stub")
+    parser.add_argument("--all-stages", action="store_true", help="keep ramping after saturation")
+    parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed regression as a fraction (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(ROUTES)
+    if unknown or not mix:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}" if unknown else "empty --mix")
+    stages = [int(s) for s in args.stages.split(",") if s]
+    report = run_load_test(args.rows, mix, stages, args.seconds, args.mode, args.chain_delay_ms / 1000,
+                           patience=0 if args.all_stages else SATURATION_PATIENCE)
+
+    saturation = report["saturation"]
+    if saturation:
+        knee = next(s for s in report["stages"] if s["concurrency"] == saturation["concurrency"])
+        state = "saturates" if saturation["saturated"] else "still scaling"
+        print(f"\n{state} at {saturation['concurrency']} clients: {saturation['throughput']:.1f} req/s, "
+              f"p99 {saturation['p99_ms']:.1f}ms\n{route_table(knee)}", file=sys.stderr)
+    else:
+        print("\nEvery stage exceeded the error budget", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_load(json.load(f), report, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.1f} -> {r['current']:.1f} ({r['change']:+.1%})",
+                  file=sys.stderr)
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
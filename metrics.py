@@ -0,0 +1,309 @@
+"""
+Request instrumentation for the IPInvest Flask app
+Per-route latency histograms, per-request SQL statement counts and
+upstream (chain REST) call timings, exposed in Prometheus text format
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Latency buckets in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements issued by a single request
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+# Opt-in slow request profiling, e.g. IPINVEST_PROFILE_SLOW_MS=500
+PROFILE_SLOW_MS_ENV = "IPINVEST_PROFILE_SLOW_MS"
+PROFILE_INTERVAL_MS_ENV = "IPINVEST_PROFILE_INTERVAL_MS"
+
+
+class Histogram:
+    """Fixed-bucket histogram, one series per label tuple"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base.rstrip(',')}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{base.rstrip(',')}}} {series[-1]}")
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter, one value per label tuple"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, labels).rstrip(',')}}} {value}")
+        return lines
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}",')
+    return "".join(parts)
+
+
+class MetricsRegistry:
+    """All metrics exported at /metrics"""
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            "ipinvest_http_request_duration_seconds",
+            "Flask request latency by route",
+            ("route", "method", "status"))
+        self.request_sql_statements = Histogram(
+            "ipinvest_http_request_sql_statements",
+            "SQL statements executed per request",
+            ("route", "method"), buckets=SQL_COUNT_BUCKETS)
+        self.request_sql_seconds = Histogram(
+            "ipinvest_http_request_sql_duration_seconds",
+            "Time spent in SQL per request",
+            ("route", "method"))
+        self.sql_statements_total = CounterMetric(
+            "ipinvest_sql_statements_total",
+            "SQL statements executed, by route",
+            ("route",))
+        self.upstream_latency = Histogram(
+            "ipinvest_upstream_request_duration_seconds",
+            "Latency of upstream chain REST/RPC calls",
+            ("call",))
+        self.upstream_errors_total = CounterMetric(
+            "ipinvest_upstream_errors_total",
+            "Failed upstream chain REST/RPC calls",
+            ("call",))
+        self.upstream_retries_total = CounterMetric(
+            "ipinvest_upstream_retries_total",
+            "Upstream chain calls retried after every endpoint failed",
+            ("call",))
+        self.upstream_hedges_total = CounterMetric(
+            "ipinvest_upstream_hedges_total",
+            "Hedged requests sent to a second endpoint because the first was slow",
+            ("call",))
+        self.upstream_circuit_open_total = CounterMetric(
+            "ipinvest_upstream_circuit_open_total",
+            "Times an endpoint's circuit breaker opened",
+            ("endpoint",))
+        self._metrics = [
+            self.request_latency, self.request_sql_statements, self.request_sql_seconds,
+            self.sql_statements_total, self.upstream_latency, self.upstream_errors_total,
+            self.upstream_retries_total, self.upstream_hedges_total, self.upstream_circuit_open_total,
+        ]
+
+    def register(self, metric):
+        """Add an extra Histogram/CounterMetric to the /metrics output"""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def track_upstream(call: str, registry: MetricsRegistry = None):
+    """Time an upstream call, e.g. `with track_upstream("query_balance"): ...`"""
+    registry = registry or REGISTRY
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.upstream_errors_total.inc((call,))
+        raise
+    finally:
+        registry.upstream_latency.observe((call,), time.perf_counter() - start)
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for in-flight requests
+
+    A single daemon thread samples the stacks of registered request threads
+    every `interval` seconds. Requests slower than `threshold` get their
+    hottest stacks dumped by the caller.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.005, max_depth: int = 30):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_depth = max_depth
+        self._active: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, thread_id: int):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ipinvest-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._stack_key(frame)] += 1
+
+    def _stack_key(self, frame) -> Tuple[str, ...]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    @staticmethod
+    def format_report(samples: Counter, top: int = 5) -> str:
+        total = sum(samples.values()) or 1
+        lines = []
+        for stack, count in samples.most_common(top):
+            lines.append(f"{count}/{total} samples ({100.0 * count / total:.0f}%)")
+            lines.extend(f"    {entry}" for entry in stack)
+        return "\n".join(lines)
+
+
+def _profiler_from_env() -> Optional[SlowRequestProfiler]:
+    slow_ms = os.environ.get(PROFILE_SLOW_MS_ENV)
+    if not slow_ms:
+        return None
+    interval_ms = float(os.environ.get(PROFILE_INTERVAL_MS_ENV, "5"))
+    return SlowRequestProfiler(float(slow_ms) / 1000.0, interval_ms / 1000.0)
+
+
+def init_metrics(app, registry: MetricsRegistry = None, profiler: Optional[SlowRequestProfiler] = None):
+    """
+    Install request hooks, SQLAlchemy listeners and the /metrics endpoint
+
+    Args:
+        app: Flask application
+        registry: Metrics registry (default: module-level REGISTRY)
+        profiler: Slow request profiler (default: enabled via IPINVEST_PROFILE_SLOW_MS)
+    """
+    from flask import Response, g, has_request_context, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    registry = registry or REGISTRY
+    profiler = profiler or _profiler_from_env()
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, so a failed statement leaves nothing behind on the connection
+        context._ipinvest_start = time.perf_counter()
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_ipinvest_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if has_request_context() and "ipinvest_sql" in g:
+            stats = g.ipinvest_sql
+            stats[0] += 1
+            stats[1] += elapsed
+
+    @app.before_request
+    def _start_request_timer():
+        g.ipinvest_start = time.perf_counter()
+        g.ipinvest_sql = [0, 0.0]
+        if profiler is not None:
+            profiler.begin(threading.get_ident())
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("ipinvest_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        statements, sql_seconds = g.pop("ipinvest_sql", (0, 0.0))
+
+        registry.request_latency.observe((route, request.method, str(response.status_code)), elapsed)
+        registry.request_sql_statements.observe((route, request.method), statements)
+        registry.request_sql_seconds.observe((route, request.method), sql_seconds)
+        registry.sql_statements_total.inc((route,), statements)
+
+        if profiler is not None:
+            samples = profiler.end(threading.get_ident())
+            if elapsed >= profiler.threshold and samples:
+                app.logger.warning(
+                    "Slow request %s %s took %.1f ms (%d SQL statements)\n%s",
+                    request.method, route, elapsed * 1000, statements,
+                    profiler.format_report(samples))
+        return response
+
+    @app.teardown_request
+    def _release_profiler(exc):
+        # after_request is skipped on unhandled exceptions
+        if profiler is not None:
+            profiler.end(threading.get_ident())
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    return registry
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped model artifacts shared by every worker process
+Models are exported as plain .npy arrays (a flattened random forest for
+ValuationModel, the policy MLP weights for RLRecommender) and opened with
+np.load(mmap_mode='r'), so N workers share one page-cached copy instead of
+N unpickled ones. Versions are published side by side and a CURRENT file
+is swapped with os.replace, so workers pick up a new model on their next
+read without a restart.
+
+Usage:
+    python model_artifacts.py export-valuation valuation_model.pkl scaler.pkl
+    python model_artifacts.py export-policy rl_agent.zip
+    python model_artifacts.py memory --workers 4   # RSS/PSS per worker, pickle vs mmap
+    python model_artifacts.py status
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+VALUATION = "valuation"
+POLICY = "policy"
+CURRENT = "CURRENT"
+DEFAULT_CHECK_INTERVAL = 2.0
+DEFAULT_KEEP_VERSIONS = 3
+
+
+def model_dir() -> str:
+    """IPINVEST_MODEL_DIR, else the app's instance/models whatever the working directory"""
+    return os.environ.get("IPINVEST_MODEL_DIR",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "models"))
+
+
+# -- publishing -----------------------------------------------------------------
+
+
+def publish(name: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None,
+            root: Optional[str] = None, keep: int = DEFAULT_KEEP_VERSIONS) -> str:
+    """
+    Write a new version of a model and make it current
+
+    The version directory is fully written under a temporary name and
+    renamed into place before CURRENT is swapped, so readers only ever see
+    a complete version. Older versions beyond `keep` are removed; workers
+    still mapping one keep their pages until they remap (unlinked files
+    stay valid while mapped).
+
+    Returns:
+        The new version string
+    """
+    base = os.path.join(root or model_dir(), name)
+    os.makedirs(base, exist_ok=True)
+    token = uuid.uuid4().hex
+    # Sorts by publish time; the suffix keeps two publishes in the same microsecond apart
+    version = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')}-{token[:6]}"
+    staging = os.path.join(base, f".tmp-{token}")
+    os.makedirs(staging)
+    for key, array in arrays.items():
+        np.save(os.path.join(staging, f"{key}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({**(meta or {}), "name": name, "version": version, "arrays": sorted(arrays)}, f)
+    os.rename(staging, os.path.join(base, version))
+
+    pointer = os.path.join(base, f".{CURRENT}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(base, CURRENT))
+
+    versions = sorted(v for v in os.listdir(base) if not v.startswith(".") and v != CURRENT)
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(base, old), ignore_errors=True)
+    return version
+
+
+def current_version(name: str, root: Optional[str] = None) -> Optional[str]:
+    try:
+        with open(os.path.join(root or model_dir(), name, CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_version(name: str, version: str, root: Optional[str] = None):
+    """(meta, {array name: read-only memmap}) for one published version"""
+    path = os.path.join(root or model_dir(), name, version)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return meta, {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r") for key in meta["arrays"]}
+
+
+class SharedModel:
+    """
+    Current version of a published model, remapped when CURRENT changes
+
+    Args:
+        name: model name under the model directory
+        factory: builds the model object from (meta, arrays)
+        check_interval: seconds between CURRENT checks; 0 checks on every get()
+    """
+
+    def __init__(self, name: str, factory: Callable[[Dict[str, Any], Dict[str, np.ndarray]], Any],
+                 root: Optional[str] = None, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.name = name
+        self.factory = factory
+        self.root = root
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self.model = None
+        self.reloads = 0
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The current model, or None if nothing has been published"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = now
+                version = current_version(self.name, self.root)
+                if version and version != self.version:
+                    meta, arrays = open_version(self.name, version, self.root)
+                    # Swap the reference in one assignment; requests holding the old model finish with it
+                    self.model, self.version = self.factory(meta, arrays), version
+                    self.reloads += 1
+        return self.model
+
+    def status(self) -> Dict[str, Any]:
+        self.get()
+        return {"name": self.name, "version": self.version, "loaded": self.model is not None,
+                "reloads": self.reloads}
+
+
+_shared: Dict[tuple, SharedModel] = {}
+
+
+def shared_model(name: str, root: Optional[str] = None) -> SharedModel:
+    """Process-wide SharedModel for a published model (see FACTORIES)"""
+    key = (name, os.path.abspath(root or model_dir()))
+    if key not in _shared:
+        _shared[key] = SharedModel(name, FACTORIES[name], root)
+    return _shared[key]
+
+
+# -- valuation forest -----------------------------------------------------------
+
+
+class FlatForest:
+    """
+    RandomForestRegressor + StandardScaler as flat node arrays
+
+    All trees' nodes are concatenated; leaves point at themselves so every
+    (sample, tree) pair can be walked down in lockstep, one vectorized step
+    per tree level.
+    """
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.roots = arrays["roots"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.depth = int(meta["max_depth"])
+
+    @staticmethod
+    def export(forest, scaler) -> Dict[str, np.ndarray]:
+        """Arrays for publish() from a fitted forest and scaler"""
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            roots.append(offset)
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+        return {
+            "roots": np.array(roots, dtype=np.int64),
+            "left": np.concatenate(left).astype(np.int32),
+            "right": np.concatenate(right).astype(np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold),
+            "value": np.concatenate(value),
+            "mean": np.asarray(scaler.mean_, dtype=np.float64),
+            "scale": np.asarray(scaler.scale_, dtype=np.float64),
+        }
+
+    def predict(self, features) -> np.ndarray:
+        """Predictions for a (n, n_features) array or one feature vector"""
+        X = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        # Trees split on float32 inputs, as sklearn does
+        X = ((X - self.mean) / self.scale).astype(np.float32).astype(np.float64)
+        rows = np.repeat(np.arange(len(X)), len(self.roots))
+        nodes = np.tile(self.roots, len(X))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].reshape(len(X), len(self.roots)).mean(axis=1)
+
+
+def publish_valuation_model(forest, scaler, root: Optional[str] = None) -> str:
+    depth = max(estimator.tree_.max_depth for estimator in forest.estimators_)
+    return publish(VALUATION, FlatForest.export(forest, scaler),
+                   {"max_depth": depth, "trees": len(forest.estimators_)}, root)
+
+
+# -- recommender policy ---------------------------------------------------------
+
+
+class PolicyNetwork:
+    """
+    Deterministic action of a stable-baselines3 MlpPolicy, in numpy
+
+    Runs the policy half of the MLP extractor and the action head, which is
+    what PPO.predict(obs, deterministic=True) computes for a Box action space.
+    """
+
+    ACTIVATIONS = {"tanh": np.tanh, "relu": lambda x: np.maximum(x, 0)}
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.layers = [(arrays[f"policy_{i}_weight"], arrays[f"policy_{i}_bias"]) for i in range(meta["layers"])]
+        self.action = (arrays["action_weight"], arrays["action_bias"])
+        self.activation = self.ACTIVATIONS[meta.get("activation", "tanh")]
+        self.low, self.high = meta.get("low", 0.0), meta.get("high", 1.0)
+
+    @staticmethod
+    def export(state_dict: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Arrays for publish() from a policy state_dict (tensors or arrays)"""
+        def array(key):
+            value = state_dict[key]
+            return value.detach().cpu().numpy() if hasattr(value, "detach") else np.asarray(value)
+
+        arrays = {"action_weight": array("action_net.weight"), "action_bias": array("action_net.bias")}
+        linear = sorted({int(key.split(".")[2]) for key in state_dict
+                         if key.startswith("mlp_extractor.policy_net.") and key.endswith(".weight")})
+        for i, index in enumerate(linear):
+            arrays[f"policy_{i}_weight"] = array(f"mlp_extractor.policy_net.{index}.weight")
+            arrays[f"policy_{i}_bias"] = array(f"mlp_extractor.policy_net.{index}.bias")
+        return arrays
+
+    def predict(self, observation) -> np.ndarray:
+        x = np.asarray(observation, dtype=np.float32)
+        for weight, bias in self.layers:
+            x = self.activation(x @ weight.T + bias)
+        weight, bias = self.action
+        return np.clip(x @ weight.T + bias, self.low, self.high)
+
+
+def publish_policy(state_dict: Dict[str, Any], activation: str = "tanh", low: float = 0.0, high: float = 1.0,
+                   root: Optional[str] = None) -> str:
+    arrays = PolicyNetwork.export(state_dict)
+    layers = sum(1 for key in arrays if key.endswith("_weight")) - 1
+    return publish(POLICY, arrays, {"layers": layers, "activation": activation, "low": low, "high": high}, root)
+
+
+FACTORIES = {VALUATION: FlatForest, POLICY: PolicyNetwork}
+
+
+# -- memory accounting ----------------------------------------------------------
+
+
+def memory_usage() -> Dict[str, int]:
+    """
+    This process's memory in kB: RSS split into anonymous/file/shmem pages,
+    plus PSS (shared pages divided among the processes mapping them)
+    """
+    usage = {}
+    fields = {"VmRSS": "rss_kb", "RssAnon": "rss_anon_kb", "RssFile": "rss_file_kb", "RssShmem": "rss_shmem_kb"}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0])
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["pss_kb"] = int(line.split()[1])
+    except OSError:  # not Linux
+        import resource
+        usage["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def _worker(load: Callable[[], Any], features: np.ndarray, ready, results, index: int):
+    model = load()
+    model.predict(features)
+    ready.wait()
+    results[index] = memory_usage()
+    time.sleep(0.5)  # stay alive while siblings read their PSS
+
+
+def measure_workers(load: Callable[[], Any], features: np.ndarray, workers: int) -> Dict[str, Any]:
+    """Fork `workers` processes that each load and use a model; mean MB per worker"""
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    manager = context.Manager()
+    results = manager.dict()
+    ready = context.Event()
+    procs = [context.Process(target=_worker, args=(load, features, ready, results, i)) for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    time.sleep(1.0)
+    ready.set()
+    for proc in procs:
+        proc.join()
+    per_worker = [dict(results[i]) for i in range(workers)]
+    manager.shutdown()
+    return {key.replace("_kb", "_mb"): round(float(np.mean([w.get(key, 0) for w in per_worker])) / 1024, 1)
+            for key in ("rss_kb", "rss_anon_kb", "rss_file_kb", "pss_kb")}
+
+
+def run_memory_comparison(workers: int = 4, trees: int = 200, samples: int = 20_000,
+                          seed: int = 42) -> Dict[str, Any]:
+    """Per-worker MB for a joblib-unpickled forest vs the shared mmap artifact"""
+    import tempfile
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    X = rng.random((samples, 5))
+    y = X @ [3e6, 1e6, 5e5, 2e5, 1e5] + rng.normal(0, 1e5, samples)
+    scaler = StandardScaler().fit(X)
+    forest = RandomForestRegressor(n_estimators=trees, random_state=seed, n_jobs=-1).fit(scaler.transform(X), y)
+
+    workdir = tempfile.mkdtemp(prefix="ipinvest-models-")
+    pickle_path = os.path.join(workdir, "valuation_model.pkl")
+    joblib.dump(forest, pickle_path)
+    publish_valuation_model(forest, scaler, root=workdir)
+    del forest
+
+    flat = SharedModel(VALUATION, FlatForest, root=workdir).get()
+    reference = joblib.load(pickle_path).predict(scaler.transform(X[:100]))
+    assert np.allclose(flat.predict(X[:100]), reference)
+
+    results = {
+        "workers": workers,
+        "trees": trees,
+        "pickle_mb": round(os.path.getsize(pickle_path) / 2 ** 20, 1),
+        "baseline": measure_workers(lambda: _Noop(), X[:100], workers),
+        "joblib": measure_workers(lambda: joblib.load(pickle_path), scaler.transform(X[:100]), workers),
+        "mmap": measure_workers(lambda: SharedModel(VALUATION, FlatForest, root=workdir).get(), X[:100], workers),
+    }
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+class _Noop:
+    def predict(self, features):
+        return features
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish and inspect shared model artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    val = sub.add_parser("export-valuation", help="publish a trained ValuationModel")
+    val.add_argument("model", nargs="?", default="valuation_model.pkl")
+    val.add_argument("scaler", nargs="?", default="scaler.pkl")
+    pol = sub.add_parser("export-policy", help="publish an RLRecommender PPO policy")
+    pol.add_argument("agent", nargs="?", default="rl_agent.zip")
+    mem = sub.add_parser("memory", help="per-worker memory, joblib pickle vs shared mmap")
+    mem.add_argument("--workers", type=int, default=4)
+    mem.add_argument("--trees", type=int, default=200)
+    sub.add_parser("status", help="current version of each model")
+    args = parser.parse_args(argv)
+
+    if args.command == "export-valuation":
+        import joblib
+        print(publish_valuation_model(joblib.load(args.model), joblib.load(args.scaler)))
+    elif args.command == "export-policy":
+        from stable_baselines3 import PPO
+        agent = PPO.load(args.agent)
+        space = agent.action_space
+        print(publish_policy(agent.policy.state_dict(), low=float(np.min(space.low)), high=float(np.max(space.high))))
+    elif args.command == "memory":
+        print(json.dumps(run_memory_comparison(args.workers, args.trees), indent=2))
+    elif args.command == "status":
+        print(json.dumps({name: current_version(name) for name in (VALUATION, POLICY)}, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
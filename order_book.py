@@ -0,0 +1,409 @@
+"""
+Secondary market for idea tokens
+One in-memory price-time-priority order book per idea with limit and market
+orders, partial fills, and a journal + snapshot for crash recovery.
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BUY = "buy"
+SELL = "sell"
+LIMIT = "limit"
+MARKET = "market"
+
+OPEN = "open"
+FILLED = "filled"
+CANCELLED = "cancelled"
+
+PRICE_DECIMALS = 2
+SNAPSHOT_EVERY = 10_000
+
+
+class OrderError(ValueError):
+    """Rejected order or cancel request"""
+
+
+class Order:
+    __slots__ = ("order_id", "idea_id", "wallet", "side", "order_type", "price",
+                 "quantity", "remaining", "timestamp", "status")
+
+    def __init__(self, order_id: int, idea_id: int, wallet: str, side: str, order_type: str,
+                 price: Optional[float], quantity: int, timestamp: float,
+                 remaining: Optional[int] = None, status: str = OPEN):
+        self.order_id = order_id
+        self.idea_id = idea_id
+        self.wallet = wallet
+        self.side = side
+        self.order_type = order_type
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity if remaining is None else remaining
+        self.timestamp = timestamp
+        self.status = status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Order":
+        return cls(**data)
+
+
+class Fill:
+    """One match between a resting (maker) and an incoming (taker) order"""
+
+    __slots__ = ("idea_id", "price", "quantity", "buy_order_id", "sell_order_id",
+                 "buyer", "seller", "taker_side", "timestamp")
+
+    def __init__(self, idea_id: int, price: float, quantity: int, buy_order_id: int, sell_order_id: int,
+                 buyer: str, seller: str, taker_side: str, timestamp: float):
+        self.idea_id = idea_id
+        self.price = price
+        self.quantity = quantity
+        self.buy_order_id = buy_order_id
+        self.sell_order_id = sell_order_id
+        self.buyer = buyer
+        self.seller = seller
+        self.taker_side = taker_side
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class OrderBook:
+    """
+    Price-time priority book for one idea
+
+    Bids live in a max-heap keyed on (-price, order_id) and asks in a
+    min-heap keyed on (price, order_id); order ids increase with arrival so
+    they double as time priority. Cancels are lazy: the order is marked and
+    skipped when it reaches the top of its heap.
+    """
+
+    def __init__(self, idea_id: int):
+        self.idea_id = idea_id
+        self.bids: List[Tuple[float, int, Order]] = []
+        self.asks: List[Tuple[float, int, Order]] = []
+        self.orders: Dict[int, Order] = {}
+        # side -> price -> resting quantity, for O(levels) depth queries
+        self.levels: Dict[str, Dict[float, int]] = {BUY: {}, SELL: {}}
+        self.last_price: Optional[float] = None
+
+    def _top(self, heap) -> Optional[Order]:
+        while heap and heap[0][2].status != OPEN:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self) -> Optional[Order]:
+        return self._top(self.bids)
+
+    def best_ask(self) -> Optional[Order]:
+        return self._top(self.asks)
+
+    def _rest(self, order: Order):
+        self.orders[order.order_id] = order
+        if order.side == BUY:
+            heapq.heappush(self.bids, (-order.price, order.order_id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.order_id, order))
+        level = self.levels[order.side]
+        level[order.price] = level.get(order.price, 0) + order.remaining
+
+    def _reduce_level(self, order: Order, quantity: int):
+        level = self.levels[order.side]
+        left = level[order.price] - quantity
+        if left:
+            level[order.price] = left
+        else:
+            del level[order.price]
+
+    def submit(self, order: Order, undo: Optional[List[Tuple[Order, int]]] = None) -> List[Fill]:
+        """
+        Match an incoming order; a limit remainder rests, a market remainder is cancelled
+
+        A resting order from the same wallet is cancelled instead of traded
+        against. Every maker touched is appended to `undo` as (order, quantity
+        taken) for rollback().
+        """
+        fills = []
+        opposite = self.asks if order.side == BUY else self.bids
+        while order.remaining:
+            maker = self._top(opposite)
+            if maker is None:
+                break
+            if order.order_type == LIMIT and (
+                    (order.side == BUY and maker.price > order.price) or
+                    (order.side == SELL and maker.price < order.price)):
+                break
+            if maker.wallet == order.wallet:
+                heapq.heappop(opposite)
+                self.cancel(maker.order_id)
+                if undo is not None:
+                    undo.append((maker, 0))
+                continue
+            quantity = min(order.remaining, maker.remaining)
+            order.remaining -= quantity
+            maker.remaining -= quantity
+            self._reduce_level(maker, quantity)
+            if not maker.remaining:
+                maker.status = FILLED
+                del self.orders[maker.order_id]
+                heapq.heappop(opposite)
+            if undo is not None:
+                undo.append((maker, quantity))
+            buy, sell = (order, maker) if order.side == BUY else (maker, order)
+            fills.append(Fill(self.idea_id, maker.price, quantity, buy.order_id, sell.order_id,
+                              buy.wallet, sell.wallet, order.side, order.timestamp))
+            self.last_price = maker.price
+
+        if not order.remaining:
+            order.status = FILLED
+        elif order.order_type == LIMIT:
+            self._rest(order)
+        else:
+            order.status = CANCELLED
+        return fills
+
+    def rollback(self, order: Order, undo: List[Tuple[Order, int]], last_price: Optional[float]):
+        """Reverse a submit(): take the incoming order off the book and restore the makers it touched"""
+        if order.status == OPEN:
+            self.orders.pop(order.order_id)
+            self._reduce_level(order, order.remaining)
+            # Removed outright, not lazily: its order id is handed out again
+            heap = self.bids if order.side == BUY else self.asks
+            heap[:] = [entry for entry in heap if entry[2] is not order]
+            heapq.heapify(heap)
+        order.status = CANCELLED
+        for maker, quantity in reversed(undo):
+            maker.remaining += quantity
+            if maker.status == OPEN:
+                level = self.levels[maker.side]
+                level[maker.price] = level.get(maker.price, 0) + quantity
+            else:
+                maker.status = OPEN
+                self._rest(maker)
+        self.last_price = last_price
+
+    def cancel(self, order_id: int) -> Order:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            raise OrderError(f"order {order_id} is not open on idea {self.idea_id}")
+        order.status = CANCELLED
+        self._reduce_level(order, order.remaining)
+        return order
+
+    def depth(self, levels: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Aggregated price levels, best first"""
+        bids = sorted(self.levels[BUY].items(), reverse=True)[:levels]
+        asks = sorted(self.levels[SELL].items())[:levels]
+        return {
+            "bids": [{"price": p, "quantity": q} for p, q in bids],
+            "asks": [{"price": p, "quantity": q} for p, q in asks],
+        }
+
+    def open_quantity(self, wallet: str, side: str) -> int:
+        return sum(o.remaining for o in self.orders.values() if o.wallet == wallet and o.side == side)
+
+    def resting_orders(self) -> List[Order]:
+        return sorted(self.orders.values(), key=lambda o: o.order_id)
+
+
+class MatchingEngine:
+    """
+    All order books, with optional durability
+
+    With a `journal_dir`, every accepted command is appended to
+    journal.jsonl once it has been applied and its fills persisted, and the
+    full book state is written to snapshot.json every `snapshot_every`
+    commands. Recovery loads the
+    snapshot and replays only the journal tail, so rebuilding after a
+    restart is deterministic and bounded.
+    """
+
+    def __init__(self, journal_dir: Optional[str] = None, snapshot_every: int = SNAPSHOT_EVERY,
+                 fsync: bool = False):
+        self.books: Dict[int, OrderBook] = {}
+        self.journal_dir = journal_dir
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.seq = 0
+        self.next_order_id = 1
+        self.recovered_fills: List[Fill] = []
+        self._since_snapshot = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            self.recovered_fills = self._recover()
+            self._journal = open(self._journal_path, "a", buffering=1)
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.journal_dir, "journal.jsonl")
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.journal_dir, "snapshot.json")
+
+    def book(self, idea_id: int) -> OrderBook:
+        book = self.books.get(idea_id)
+        if book is None:
+            book = self.books[idea_id] = OrderBook(idea_id)
+        return book
+
+    def submit(self, idea_id: int, wallet: str, side: str, quantity: int,
+               order_type: str = LIMIT, price: Optional[float] = None,
+               timestamp: Optional[float] = None, balance: Optional[Callable[[], int]] = None,
+               on_fills: Optional[Callable[[List[Fill]], None]] = None) -> Tuple[Order, List[Fill]]:
+        """
+        Validate, match and journal a new order
+
+        Args:
+            balance: tokens the wallet holds; a sell may not exceed it minus the
+                wallet's resting sells. Checked under the engine lock.
+            on_fills: persists the fills before the lock is released, so the
+                next balance check already sees them. If it raises, the match
+                is rolled back and nothing is journaled.
+
+        Returns:
+            (order, fills) — order.status tells whether anything rests on the book
+        """
+        if side not in (BUY, SELL):
+            raise OrderError("side must be 'buy' or 'sell'")
+        if order_type not in (LIMIT, MARKET):
+            raise OrderError("type must be 'limit' or 'market'")
+        if int(quantity) != quantity or quantity <= 0:
+            raise OrderError("quantity must be a positive integer")
+        if order_type == LIMIT:
+            if price is None or not math.isfinite(price) or price <= 0:
+                raise OrderError("limit orders need a positive price")
+            price = round(float(price), PRICE_DECIMALS)
+        else:
+            price = None
+
+        with self._lock:
+            if side == SELL and balance is not None:
+                available = balance() - self.book(idea_id).open_quantity(wallet, SELL)
+                if quantity > available:
+                    raise OrderError(f"Only {available} tokens available to sell")
+            command = {"op": "submit", "idea_id": idea_id, "wallet": wallet, "side": side,
+                       "type": order_type, "price": price, "quantity": int(quantity),
+                       "ts": time.time() if timestamp is None else timestamp}
+            book = self.book(idea_id)
+            last_price, undo = book.last_price, []
+            order, fills = self._apply_submit(command, undo)
+            if on_fills is not None and fills:
+                try:
+                    on_fills(fills)
+                except BaseException:
+                    book.rollback(order, undo, last_price)
+                    self.next_order_id -= 1
+                    raise
+            self._log(command)
+            return order, fills
+
+    def cancel(self, idea_id: int, order_id: int) -> Order:
+        with self._lock:
+            book = self.books.get(idea_id)
+            if book is None or order_id not in book.orders:
+                raise OrderError(f"order {order_id} is not open on idea {idea_id}")
+            order = book.cancel(order_id)
+            self._log({"op": "cancel", "idea_id": idea_id, "order_id": order_id})
+            return order
+
+    def _apply_submit(self, command: Dict[str, Any],
+                      undo: Optional[List[Tuple[Order, int]]] = None) -> Tuple[Order, List[Fill]]:
+        order = Order(self.next_order_id, command["idea_id"], command["wallet"], command["side"],
+                      command["type"], command["price"], command["quantity"], command["ts"])
+        self.next_order_id += 1
+        return order, self.book(command["idea_id"]).submit(order, undo)
+
+    def _apply(self, command: Dict[str, Any]) -> List[Fill]:
+        if command["op"] == "submit":
+            return self._apply_submit(command)[1]
+        self.book(command["idea_id"]).cancel(command["order_id"])
+        return []
+
+    def _log(self, command: Dict[str, Any]):
+        """Journal a command that has already been applied"""
+        self.seq += 1
+        if self._journal is None:
+            return
+        command["seq"] = self.seq
+        self._journal.write(json.dumps(command, separators=(",", ":")) + "\n")
+        if self.fsync:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            # The snapshot already includes this command, so the journal starts empty
+            self._write_snapshot(self.seq)
+            self._journal.close()
+            self._journal = open(self._journal_path, "w", buffering=1)
+            self._since_snapshot = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "next_order_id": self.next_order_id,
+            "books": {
+                str(idea_id): {"last_price": book.last_price,
+                               "orders": [o.to_dict() for o in book.resting_orders()]}
+                for idea_id, book in self.books.items()
+            },
+        }
+
+    def _write_snapshot(self, seq: int):
+        state = self.snapshot()
+        state["seq"] = seq
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+
+    def _load_snapshot(self, state: Dict[str, Any]):
+        self.seq = state["seq"]
+        self.next_order_id = state["next_order_id"]
+        for idea_id, data in state["books"].items():
+            book = self.book(int(idea_id))
+            book.last_price = data["last_price"]
+            for order_data in data["orders"]:
+                book._rest(Order.from_dict(order_data))
+
+    def _recover(self) -> List[Fill]:
+        """Load the snapshot and replay newer journal entries; returns the replayed fills"""
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path) as f:
+                self._load_snapshot(json.load(f))
+        fills = []
+        if os.path.exists(self._journal_path):
+            good_bytes = 0
+            with open(self._journal_path) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn final write
+                    good_bytes += len(line)
+                    command = json.loads(line)
+                    if command["seq"] <= self.seq:
+                        continue
+                    self.seq = command["seq"]
+                    fills.extend(self._apply(command))
+                    self._since_snapshot += 1
+            # Drop a torn tail so new commands start on a fresh line
+            if good_bytes != os.path.getsize(self._journal_path):
+                os.truncate(self._journal_path, good_bytes)
+        return fills
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,289 @@
+"""
+Portfolio risk analytics for every wallet at once
+Holdings are loaded as a sparse wallet x idea matrix and valuation, field
+exposure, concentration (HHI) and top positions are computed for all
+wallets in one vectorized pass. Results are cached and refreshed in the
+background so page views never aggregate holdings themselves.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+TOP_POSITIONS = 5
+DEFAULT_REFRESH_INTERVAL = 300.0
+MIN_REFRESH_GAP = 5.0
+
+# Net tokens and cost per (wallet, idea): primary purchases plus secondary trades
+POSITIONS_SQL = """
+    SELECT wallet, idea_id, SUM(tokens) AS tokens, SUM(cost) AS cost FROM (
+        SELECT investor_address AS wallet, idea_id, tokens_purchased AS tokens, amount_paid AS cost
+        FROM investment
+        UNION ALL
+        SELECT buyer_address, idea_id, tokens, amount FROM trade
+        UNION ALL
+        SELECT seller_address, idea_id, -tokens, -amount FROM trade
+    ) AS positions
+    GROUP BY wallet, idea_id
+    HAVING SUM(tokens) > 0
+"""
+IDEAS_SQL = "SELECT id, title, field, token_price FROM idea"
+
+
+class PortfolioSnapshot:
+    """
+    Precomputed analytics for all wallets
+
+    Per-wallet arrays are indexed by the row in `wallets`; `top_*` arrays
+    have TOP_POSITIONS columns padded with -1 / 0.
+    """
+
+    def __init__(self, wallets: np.ndarray, ideas: pd.DataFrame, fields: np.ndarray,
+                 total_value: np.ndarray, total_cost: np.ndarray, positions: np.ndarray,
+                 hhi: np.ndarray, field_exposure: np.ndarray, field_hhi: np.ndarray,
+                 top_ideas: np.ndarray, top_values: np.ndarray, top_tokens: np.ndarray,
+                 computed_at: datetime, seconds: float):
+        self.wallets = wallets
+        self.wallet_index = {wallet: i for i, wallet in enumerate(wallets)}
+        self.ideas = ideas
+        self.fields = fields
+        self.total_value = total_value
+        self.total_cost = total_cost
+        self.positions = positions
+        self.hhi = hhi
+        self.field_exposure = field_exposure
+        self.field_hhi = field_hhi
+        self.top_ideas = top_ideas
+        self.top_values = top_values
+        self.top_tokens = top_tokens
+        self.computed_at = computed_at
+        self.seconds = seconds
+
+    def wallet(self, address: str) -> Optional[Dict[str, Any]]:
+        """Analytics for one wallet, or None if it holds nothing"""
+        row = self.wallet_index.get(address)
+        if row is None:
+            return None
+        value = float(self.total_value[row])
+        exposure = self.field_exposure[row]
+        top = []
+        for column, position_value, tokens in zip(self.top_ideas[row], self.top_values[row], self.top_tokens[row]):
+            if column < 0:
+                break
+            idea = self.ideas.iloc[column]
+            top.append({
+                "idea_id": int(idea["id"]),
+                "title": idea["title"],
+                "field": idea["field"],
+                "tokens": int(tokens),
+                "value": float(position_value),
+                "weight": float(position_value / value) if value else 0.0,
+            })
+        return {
+            "wallet_address": address,
+            "total_value": value,
+            "cost_basis": float(self.total_cost[row]),
+            "unrealized_pnl": value - float(self.total_cost[row]),
+            "positions": int(self.positions[row]),
+            "hhi": float(self.hhi[row]),
+            "effective_positions": float(1 / self.hhi[row]) if self.hhi[row] else 0.0,
+            "field_hhi": float(self.field_hhi[row]),
+            "field_exposure": {self.fields[i]: float(exposure[i]) for i in np.flatnonzero(exposure)},
+            "top_positions": top,
+            "computed_at": self.computed_at.isoformat(),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        held = self.total_value > 0
+        return {
+            "wallets": int(len(self.wallets)),
+            "total_value": float(self.total_value.sum()),
+            "median_hhi": float(np.median(self.hhi[held])) if held.any() else 0.0,
+            "concentrated_wallets": int((self.hhi[held] > 0.5).sum()),
+            "field_value": {field: float(v) for field, v in zip(
+                self.fields, (self.field_exposure * self.total_value[:, None]).sum(axis=0))},
+            "computed_at": self.computed_at.isoformat(),
+            "compute_seconds": self.seconds,
+        }
+
+
+def compute_snapshot(positions: pd.DataFrame, ideas: pd.DataFrame, top: int = TOP_POSITIONS) -> PortfolioSnapshot:
+    """
+    Compute analytics for every wallet
+
+    Args:
+        positions: Columns wallet, idea_id, tokens, cost (one row per net position)
+        ideas: Columns id, title, field, token_price
+        top: Number of largest positions kept per wallet
+    """
+    start = time.perf_counter()
+    ideas = ideas.reset_index(drop=True)
+    idea_column = pd.Index(ideas["id"])
+    positions = positions[idea_column.get_indexer(positions["idea_id"]) >= 0]
+    wallet_codes, wallets = pd.factorize(positions["wallet"])
+    idea_codes = idea_column.get_indexer(positions["idea_id"])
+    field_codes, fields = pd.factorize(ideas["field"], sort=True)
+    n_wallets, n_ideas, n_fields = len(wallets), len(ideas), len(fields)
+
+    tokens = positions["tokens"].to_numpy(dtype=np.float64)
+    prices = ideas["token_price"].to_numpy(dtype=np.float64)
+    holdings = sparse.csr_matrix((tokens, (wallet_codes, idea_codes)), shape=(n_wallets, n_ideas))
+    holdings.sum_duplicates()
+    # Same sparsity structure as holdings, so entries line up one-to-one
+    values = holdings.copy()
+    values.data = holdings.data * prices[holdings.indices]
+
+    total_value = np.asarray(values.sum(axis=1)).ravel()
+    total_cost = np.bincount(wallet_codes, weights=positions["cost"].to_numpy(dtype=np.float64),
+                             minlength=n_wallets)
+    counts = np.diff(values.indptr)
+    safe_total = np.where(total_value > 0, total_value, 1.0)
+    hhi = np.asarray(values.power(2).sum(axis=1)).ravel() / safe_total ** 2
+
+    field_matrix = sparse.csr_matrix((np.ones(n_ideas), (np.arange(n_ideas), field_codes)),
+                                     shape=(n_ideas, n_fields))
+    field_exposure = np.asarray((values @ field_matrix).todense()) / safe_total[:, None]
+    field_hhi = (field_exposure ** 2).sum(axis=1)
+
+    # Top positions: order entries by (row, -weight) with one float argsort (weights are in
+    # [0, 1], so each row's keys stay inside [row - 0.5, row]) and keep the first `top` per row
+    rows = np.repeat(np.arange(n_wallets), counts)
+    order = np.argsort(rows - 0.5 * values.data / safe_total[rows])
+    rank = np.arange(len(order)) - values.indptr[rows[order]]
+    keep = order[rank < top]
+    slots = (rows[keep], rank[rank < top])
+    top_ideas = np.full((n_wallets, top), -1, dtype=np.int64)
+    top_values = np.zeros((n_wallets, top))
+    top_tokens = np.zeros((n_wallets, top), dtype=np.int64)
+    top_ideas[slots] = values.indices[keep]
+    top_values[slots] = values.data[keep]
+    top_tokens[slots] = holdings.data[keep]
+
+    return PortfolioSnapshot(np.asarray(wallets), ideas, np.asarray(fields), total_value, total_cost, counts,
+                             hhi, field_exposure, field_hhi, top_ideas, top_values, top_tokens,
+                             datetime.utcnow(), time.perf_counter() - start)
+
+
+def load_snapshot(connection) -> PortfolioSnapshot:
+    """Aggregate positions in SQL and compute the snapshot"""
+    positions = pd.read_sql_query(POSITIONS_SQL, connection)
+    ideas = pd.read_sql_query(IDEAS_SQL, connection)
+    return compute_snapshot(positions, ideas)
+
+
+class AnalyticsCache:
+    """
+    Latest PortfolioSnapshot plus a background refresher
+
+    The refresher recomputes every `interval` seconds, or sooner (but at
+    most once per `min_gap`) after mark_dirty(). Readers never block on a
+    refresh once the first snapshot exists. With interval=0 there is no
+    refresher and a dirty cache is recomputed on the next read instead.
+    """
+
+    def __init__(self, loader: Callable[[], PortfolioSnapshot], interval: float = DEFAULT_REFRESH_INTERVAL,
+                 min_gap: float = MIN_REFRESH_GAP):
+        self.loader = loader
+        self.interval = interval
+        self.min_gap = min_gap
+        self.snapshot: Optional[PortfolioSnapshot] = None
+        self.refreshes = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> PortfolioSnapshot:
+        with self._lock:
+            self._dirty.clear()
+            snapshot = self.loader()
+            self.snapshot = snapshot
+            self.refreshes += 1
+            self.last_error = None
+            return snapshot
+
+    def get(self) -> PortfolioSnapshot:
+        """Current snapshot; computed synchronously only the very first time"""
+        snapshot = self.snapshot
+        if snapshot is None or (not self.interval and self._dirty.is_set()):
+            return self.refresh()
+        self._ensure_refresher()
+        return snapshot
+
+    def mark_dirty(self):
+        self._dirty.set()
+
+    def _ensure_refresher(self):
+        if self.interval and (self._thread is None or not self._thread.is_alive()):
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped.clear()
+                    self._thread = threading.Thread(target=self._run, name="portfolio-analytics", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._dirty.wait(self.interval)
+            if self._stopped.wait(self.min_gap if self._dirty.is_set() else 0):
+                return
+            try:
+                self.refresh()
+            except Exception as e:  # keep serving the previous snapshot
+                self.last_error = str(e)
+
+    def stop(self):
+        self._stopped.set()
+        self._dirty.set()
+
+
+def recommend(snapshot: Optional[PortfolioSnapshot], ideas: List[Any], wallet: Optional[str] = None,
+              risk_preference: str = "moderate", limit: Optional[int] = None,
+              upside: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    Rank active ideas by upside, adjusted for the wallet's current exposure
+
+    Upside is the investor pool's share of predicted value per token
+    relative to the token price. With a wallet, ideas in fields the wallet
+    is already heavy in and ideas it already holds are discounted; the
+    discount is stronger for conservative investors.
+
+    Args:
+        upside: per-idea upside indexed by idea id, e.g. the feature store's
+            `upside` column; computed from `ideas` when omitted or too short
+    """
+    if not ideas:
+        return []
+    ids = np.array([idea.id for idea in ideas])
+    if upside is not None and ids.max() < len(upside):
+        upside = np.asarray(upside, dtype=np.float64)[ids]
+    else:
+        upside = np.array([(idea.predicted_value * 0.3) / (idea.token_price * idea.total_tokens)
+                           if idea.token_price and idea.total_tokens else 0.0 for idea in ideas])
+    spread = upside.max() - upside.min()
+    base = 0.6 + 0.35 * ((upside - upside.min()) / spread if spread else np.ones(len(ideas)))
+
+    profile = snapshot.wallet(wallet) if snapshot is not None and wallet else None
+    penalty_weight = {"conservative": 0.8, "moderate": 0.5, "aggressive": 0.2}.get(risk_preference, 0.5)
+    held = {p["idea_id"]: p["weight"] for p in profile["top_positions"]} if profile else {}
+    exposure = profile["field_exposure"] if profile else {}
+
+    scored = []
+    for idea, score in zip(ideas, base):
+        field_weight = exposure.get(idea.field, 0.0)
+        adjusted = score * (1 - penalty_weight * field_weight) * (1 - penalty_weight * held.get(idea.id, 0.0))
+        if not profile:
+            reason = f"High potential in {idea.field} sector"
+        elif field_weight == 0:
+            reason = f"Diversifies your portfolio into {idea.field}"
+        else:
+            reason = f"{field_weight:.0%} of your portfolio is already in {idea.field}"
+        scored.append({"idea_id": idea.id, "title": idea.title, "score": float(adjusted), "reason": reason})
+    scored.sort(key=lambda item: -item["score"])
+    return scored[:limit]
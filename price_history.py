@@ -0,0 +1,172 @@
+"""
+Token price history
+Every trade and valuation update is stored as a raw price point and folded
+into minute, hour and day OHLCV bars with an upsert, so chart queries read
+a bounded number of pre-aggregated rows whatever the length of the history.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+RANGE_PRESETS = {"1d": 1, "7d": 7, "30d": 30, "90d": 90, "1y": 365, "all": None}
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS_LIMIT = 2000
+
+TRADE = "trade"
+PRIMARY = "primary"
+VALUATION = "valuation"
+
+
+def bucket_start(at: datetime, seconds: int) -> datetime:
+    """Floor a naive UTC datetime to its bar boundary"""
+    epoch = int(at.replace(tzinfo=timezone.utc).timestamp())
+    return datetime.utcfromtimestamp(epoch - epoch % seconds)
+
+
+_UPSERTS: Dict[tuple, Any] = {}
+
+
+def _bar_upsert(PriceBar, dialect: str):
+    """Build the bar upsert once per table and dialect; it is executed with parameters"""
+    key = (PriceBar.__table__, dialect)
+    if key not in _UPSERTS:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        bars = PriceBar.__table__.c
+        stmt = insert(PriceBar.__table__)
+        new = stmt.excluded
+        _UPSERTS[key] = stmt.on_conflict_do_update(
+            index_elements=[bars.idea_id, bars.resolution, bars.bucket_start],
+            set_={
+                "open": case((new.open_at < bars.open_at, new.open), else_=bars.open),
+                "open_at": case((new.open_at < bars.open_at, new.open_at), else_=bars.open_at),
+                "close": case((new.close_at >= bars.close_at, new.close), else_=bars.close),
+                "close_at": case((new.close_at >= bars.close_at, new.close_at), else_=bars.close_at),
+                "high": case((new.high > bars.high, new.high), else_=bars.high),
+                "low": case((new.low < bars.low, new.low), else_=bars.low),
+                "volume": bars.volume + new.volume,
+                "amount": bars.amount + new.amount,
+                "points": bars.points + new.points,
+            })
+    return _UPSERTS[key]
+
+
+def record_price(session, PricePoint, PriceBar, idea_id: int, price: float, tokens: int = 0,
+                 amount: float = 0.0, source: str = TRADE, at: Optional[datetime] = None):
+    """
+    Add a price point and update its minute/hour/day bars in the current transaction
+
+    Bars are upserted keyed on (idea_id, resolution, bucket_start); open and
+    close follow the earliest and latest point times, so late or replayed
+    points land in the right place.
+    """
+    at = at or datetime.utcnow()
+    session.add(PricePoint(idea_id=idea_id, price=price, tokens=tokens, amount=amount,
+                           source=source, created_at=at))
+    dialect = session.get_bind(mapper=PriceBar).dialect.name
+    session.execute(_bar_upsert(PriceBar, dialect), [{
+        "idea_id": idea_id, "resolution": seconds, "bucket_start": bucket_start(at, seconds),
+        "open": price, "high": price, "low": price, "close": price, "open_at": at, "close_at": at,
+        "volume": tokens, "amount": amount, "points": 1,
+    } for seconds in RESOLUTIONS.values()])
+
+
+def bucket_count(start: datetime, end: datetime, seconds: int) -> int:
+    """Bars of `seconds` that a window touches"""
+    return int((end - bucket_start(start, seconds)).total_seconds() // seconds) + 1
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int = DEFAULT_MAX_POINTS) -> Optional[str]:
+    """Finest bar size that keeps the window within max_points buckets; None if even days exceed it"""
+    for name, seconds in RESOLUTIONS.items():
+        if bucket_count(start, end, seconds) <= max_points:
+            return name
+    return None
+
+
+def query_history(session, PricePoint, PriceBar, idea_id: int,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  resolution: Optional[str] = None, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+    """
+    Price series for a chart
+
+    Args:
+        session: SQLAlchemy session
+        idea_id: Idea to chart
+        start: Window start (default: first recorded point)
+        end: Window end (default: now)
+        resolution: 'raw', 'minute', 'hour' or 'day'; picked automatically when omitted
+        max_points: Upper bound on returned points
+
+    Returns:
+        Resolution used and a list of OHLCV points, oldest first. When even
+        day bars exceed max_points, only the newest max_points days are
+        returned, with `truncated` set and `start` moved to the first of them.
+
+    Raises:
+        ValueError: an explicit resolution would return more than max_points points
+    """
+    max_points = max(1, min(max_points, MAX_POINTS_LIMIT))
+    end = end or datetime.utcnow()
+    if start is None:
+        first = (session.query(PricePoint.created_at)
+                 .filter(PricePoint.idea_id == idea_id)
+                 .order_by(PricePoint.created_at)
+                 .limit(1).scalar())
+        start = first or end - timedelta(days=1)
+
+    if resolution is not None and resolution != "raw" and resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of raw, {', '.join(RESOLUTIONS)}")
+
+    if resolution is None or resolution == "raw":
+        # Sparse histories are returned point for point
+        raw = (session.query(PricePoint)
+               .filter(PricePoint.idea_id == idea_id,
+                       PricePoint.created_at >= start, PricePoint.created_at <= end)
+               .order_by(PricePoint.created_at)
+               .limit(max_points + 1).all())
+        if len(raw) <= max_points:
+            return _response(idea_id, "raw", start, end, [{
+                "t": p.created_at.isoformat(), "open": p.price, "high": p.price, "low": p.price,
+                "close": p.price, "volume": p.tokens, "amount": p.amount, "points": 1,
+            } for p in raw])
+        if resolution == "raw":
+            raise ValueError(f"more than {max_points} raw points in this window; "
+                             f"narrow it or use a bar resolution")
+        resolution = choose_resolution(start, end, max_points) or "day"
+    elif bucket_count(start, end, RESOLUTIONS[resolution]) > max_points:
+        raise ValueError(f"{resolution} bars over this window exceed max_points={max_points}; "
+                         f"use a coarser resolution or a shorter window")
+
+    seconds = RESOLUTIONS[resolution]
+    # Newest first, so a truncated day series keeps the latest days
+    bars = (session.query(PriceBar)
+            .filter(PriceBar.idea_id == idea_id, PriceBar.resolution == seconds,
+                    PriceBar.bucket_start >= bucket_start(start, seconds), PriceBar.bucket_start <= end)
+            .order_by(PriceBar.bucket_start.desc())
+            .limit(max_points + 1).all())
+    truncated = len(bars) > max_points
+    bars = bars[:max_points][::-1]
+    if truncated:
+        start = bars[0].bucket_start
+    return _response(idea_id, resolution, start, end, [{
+        "t": b.bucket_start.isoformat(), "open": b.open, "high": b.high, "low": b.low,
+        "close": b.close, "volume": b.volume, "amount": b.amount, "points": b.points,
+    } for b in bars], truncated)
+
+
+def _response(idea_id: int, resolution: str, start: datetime, end: datetime,
+              points: List[Dict[str, Any]], truncated: bool = False) -> Dict[str, Any]:
+    return {
+        "idea_id": idea_id,
+        "resolution": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "truncated": truncated,
+        "points": points,
+    }
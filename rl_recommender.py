@@ -3,11 +3,22 @@ import gym
 import numpy as np
 from stable_baselines3 import PPO
 from stable_baselines3.common.envs import DummyVecEnv
+from model_artifacts import POLICY, publish_policy, shared_model
+
+# Feature store columns the agent observes and is rewarded on
+OBSERVATION_COLUMN = 'funding_progress'
+RETURN_COLUMN = 'upside'
 
 class InvestmentEnv(gym.Env):
-    def __init__(self, token_data, budget=1000):
+    def __init__(self, token_data, budget=1000, features=None):
+        """
+        Args:
+            features: optional FeatureStore, one observation per row; without it
+                observations and returns are simulated
+        """
         super(InvestmentEnv, self).__init__()
         self.token_data = token_data
+        self.features = features
         self.budget = budget
         self.current_step = 0
         self.observation_space = gym.spaces.Box(low=0, high=1, shape=(len(token_data),), dtype=np.float32)
@@ -16,25 +27,49 @@ class InvestmentEnv(gym.Env):
     def reset(self):
         self.current_step = 0
         self.budget = 1000
-        return np.random.rand(len(self.token_data))
+        return self._observe()
+
+    def _observe(self):
+        if self.features is None:
+            return np.random.rand(len(self.token_data))
+        # Strided view of the mapped rows; no copy until the policy reads it
+        return self.features.column(OBSERVATION_COLUMN)[:len(self.token_data)]
 
     def step(self, action):
         investment = action * self.budget
-        reward = np.dot(investment, np.random.rand(len(self.token_data)))  # Simulated ROI
+        if self.features is None:
+            returns = np.random.rand(len(self.token_data))  # Simulated ROI
+        else:
+            returns = self.features.column(RETURN_COLUMN)[:len(self.token_data)]
+        reward = np.dot(investment, returns)
         self.current_step += 1
         done = self.current_step > 20
-        return np.random.rand(len(self.token_data)), reward, done, {}
+        return self._observe(), reward, done, {}
 
 class RLRecommender:
-    def __init__(self, token_data):
-        self.env = DummyVecEnv([lambda: InvestmentEnv(token_data)])
+    def __init__(self, token_data, features=None):
+        self.env = DummyVecEnv([lambda: InvestmentEnv(token_data, features=features)])
         self.model = PPO("MlpPolicy", self.env, verbose=0)
 
+    @classmethod
+    def from_feature_store(cls, store):
+        """Agent over every idea row in a FeatureStore, indexed by idea id"""
+        return cls(store.column('token_price'), features=store)
+
+    def recommend_from_store(self, store):
+        return self.recommend(store.column(OBSERVATION_COLUMN))
+
     def train(self, timesteps=10000):
         self.model.learn(total_timesteps=timesteps)
         self.model.save("rl_agent.zip")
+        space = self.env.action_space
+        publish_policy(self.model.policy.state_dict(), low=float(np.min(space.low)), high=float(np.max(space.high)))
 
     def recommend(self, state):
+        # Policy weights mapped from the shared artifact, if one is published
+        policy = shared_model(POLICY).get()
+        if policy is not None:
+            return policy.predict(state)
         self.model = PPO.load("rl_agent.zip")
         action, _ = self.model.predict(state)
         return action
@@ -42,4 +77,5 @@ class RLRecommender:
 # Example:
 # agent = RLRecommender(token_data=[...])
 # agent.train()
-# print(agent.recommend(np.random.rand(10)))
\ No newline at end of file
+# print(agent.recommend(np.random.rand(10)))
+# agent = RLRecommender.from_feature_store(FeatureStore("instance/features.f32"))
\ No newline at end of file
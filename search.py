@@ -0,0 +1,168 @@
+"""
+Full-text search over ideas using SQLite FTS5
+An external-content FTS5 table mirrors Idea.title/description/field/inventor
+and is kept in sync by triggers, so queries never fall back to LIKE scans.
+"""
+
+import html
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from sqlalchemy import DDL, event, text
+
+FTS_TABLE = "idea_fts"
+
+# bm25 column weights: title, description, field, inventor
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+SNIPPET_TOKENS = 16
+MAX_PER_PAGE = 100
+
+# Private-use sentinels so highlight markers survive HTML escaping
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, field, inventor,
+        content='idea', content_rowid='id', tokenize='porter unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS idea_fts_ai AFTER INSERT ON idea BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, field, inventor)
+        VALUES (new.id, new.title, new.description, new.field, new.inventor);
+    END""",
+    # Only text edits touch the index; tokens_sold updates from invest() do not
+    f"""CREATE TRIGGER IF NOT EXISTS idea_fts_au AFTER UPDATE OF title, description, field, inventor ON idea BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, field, inventor)
+        VALUES ('delete', old.id, old.title, old.description, old.field, old.inventor);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, field, inventor)
+        VALUES (new.id, new.title, new.description, new.field, new.inventor);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS idea_fts_ad AFTER DELETE ON idea BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, field, inventor)
+        VALUES ('delete', old.id, old.title, old.description, old.field, old.inventor);
+    END""",
+]
+
+
+def register_search_index(idea_table):
+    """Create/drop the FTS table and triggers alongside the idea table on SQLite"""
+    for statement in FTS_DDL:
+        event.listen(idea_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(idea_table, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+
+def ensure_search_index(connection):
+    """
+    Create the FTS table for databases that predate it and backfill it
+
+    Args:
+        connection: SQLAlchemy connection (inside a transaction)
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    indexed = connection.exec_driver_sql(f"SELECT count(*) FROM {FTS_TABLE}_docsize").scalar()
+    if not indexed and connection.exec_driver_sql("SELECT 1 FROM idea LIMIT 1").scalar():
+        rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection):
+    """Re-read every idea into the FTS table"""
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+@contextmanager
+def bulk_load(connection):
+    """
+    Suspend the per-row insert trigger for a bulk idea load and rebuild the
+    index once at the end, which is several times faster than row-by-row sync
+    """
+    if connection.dialect.name != "sqlite":
+        yield
+        return
+    connection.exec_driver_sql("DROP TRIGGER IF EXISTS idea_fts_ai")
+    yield
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    rebuild_search_index(connection)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression
+
+    Every word must match (implicit AND); the last word is a prefix so
+    results update while typing. FTS5 operators in user input are ignored.
+    """
+    terms = _TERM_PATTERN.findall(query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _render_highlight(value: str) -> str:
+    escaped = html.escape(value or "")
+    return escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search_ideas(session, query: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    """
+    BM25-ranked, paginated search over active ideas
+
+    Args:
+        session: SQLAlchemy session
+        query: Free-text query
+        page: 1-based page number
+        per_page: Results per page (capped at MAX_PER_PAGE)
+
+    Returns:
+        Page of results with HTML-escaped <mark> highlights and the total match count
+    """
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    match = build_match_query(query)
+    if not match:
+        return {"query": query, "page": page, "per_page": per_page, "total": 0, "results": []}
+
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    rows = session.execute(text(f"""
+        SELECT idea.id, idea.title, idea.field, idea.inventor, idea.token_price, idea.predicted_value,
+               idea.total_tokens, idea.tokens_sold,
+               highlight({FTS_TABLE}, 0, :open, :close) AS title_highlight,
+               snippet({FTS_TABLE}, 1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25({FTS_TABLE}, {weights}) AS score
+        FROM {FTS_TABLE}
+        JOIN idea ON idea.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match AND idea.status = 'active'
+        ORDER BY score
+        LIMIT :limit OFFSET :offset
+    """), {
+        "match": match, "open": _MARK_OPEN, "close": _MARK_CLOSE,
+        "limit": per_page, "offset": (page - 1) * per_page,
+    }).mappings().all()
+
+    total = session.execute(text(f"""
+        SELECT count(*) FROM {FTS_TABLE}
+        JOIN idea ON idea.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match AND idea.status = 'active'
+    """), {"match": match}).scalar()
+
+    results: List[Dict[str, Any]] = []
+    for row in rows:
+        results.append({
+            "idea_id": row["id"],
+            "title": row["title"],
+            "title_highlight": _render_highlight(row["title_highlight"]),
+            "snippet": _render_highlight(row["snippet"]),
+            "field": row["field"],
+            "inventor": row["inventor"],
+            "token_price": row["token_price"],
+            "predicted_value": row["predicted_value"],
+            "tokens_available": row["total_tokens"] - (row["tokens_sold"] or 0),
+            # bm25() is lower-is-better; flip so clients can sort descending
+            "score": -row["score"],
+        })
+    return {"query": query, "page": page, "per_page": per_page, "total": total, "results": results}
@@ -0,0 +1,306 @@
+"""
+"Similar ideas" search over TF-IDF vectors
+Ideas are vectorized from title, description and field into sparse TF-IDF
+rows and stored in fixed-size blocks, each a CSC matrix so a query only
+touches the postings of its own terms. New ideas are appended to an open
+tail block with IDF as of insertion instead of refitting; rebuild()
+recomputes everything. Top-k results are cached per idea and topped up with
+ideas added since, so repeat lookups never rescan the catalogue.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+DEFAULT_K = 5
+BLOCK_ROWS = 65_536
+# Query with the highest-weighted terms only; rare terms carry most of the score
+MAX_QUERY_TERMS = 32
+CACHE_SIZE = 10_000
+
+TITLE_WEIGHT = 2.0
+FIELD_WEIGHT = 3.0
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has in is it its of on or that the this to with
+    using based new system systems method methods
+""".split())
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]{2,}")
+
+# id, title, description, field for every idea, in id order
+IDEAS_SQL = "SELECT id, title, description, field FROM idea ORDER BY id"
+
+
+def term_weights(title: str, description: str, field: str) -> Dict[str, float]:
+    """Raw term weights: title and field terms count more than description terms"""
+    weights: Dict[str, float] = {}
+    for text, weight in ((title, TITLE_WEIGHT), (description, 1.0)):
+        for token in _TOKEN_PATTERN.findall((text or "").lower()):
+            if token not in STOP_WORDS:
+                weights[token] = weights.get(token, 0.0) + weight
+    if field:
+        # The field is one term so "Clean Energy" does not match "Energy" in a description
+        weights["field:" + field.lower()] = FIELD_WEIGHT
+    return weights
+
+
+class _Block:
+    """
+    Sealed rows with the terms known at sealing: CSC for scoring and CSR
+    for reading one idea's vector back as a query
+    """
+
+    __slots__ = ("start", "ids", "matrix", "rows")
+
+    def __init__(self, start: int, ids: np.ndarray, rows: sparse.csr_matrix):
+        self.start = start
+        self.ids = ids
+        self.rows = rows
+        self.matrix = rows.tocsc()
+
+
+class SimilarityIndex:
+    """
+    Incremental TF-IDF index with cached top-k neighbours
+
+    Args:
+        loader: returns (id, title, description, field) rows for a full build;
+            called lazily on first use and after mark_stale()
+    """
+
+    def __init__(self, loader: Optional[Callable[[], Iterable[Tuple[int, str, str, str]]]] = None,
+                 block_rows: int = BLOCK_ROWS, cache_size: int = CACHE_SIZE,
+                 max_query_terms: int = MAX_QUERY_TERMS):
+        self.loader = loader
+        self.block_rows = block_rows
+        self.cache_size = cache_size
+        self.max_query_terms = max_query_terms
+        self._lock = threading.RLock()
+        self._built = False
+        self.hits = 0
+        self.misses = 0
+        self._reset()
+
+    def _reset(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_freq = np.zeros(1024, dtype=np.int64)
+        self.blocks: List[_Block] = []
+        self.positions = np.full(1024, -1, dtype=np.int64)  # idea id -> row, -1 if not indexed
+        self._sealed = 0
+        self._tail_vectors: List[Tuple[np.ndarray, np.ndarray]] = []  # (term ids, weights) per tail row
+        self._tail_ids: List[int] = []
+        self._tail_matrix: Optional[_Block] = None
+        # idea id -> (index size when computed, k computed, results)
+        self._cache: "OrderedDict[int, Tuple[int, int, List[Tuple[int, float]]]]" = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        return self._sealed + len(self._tail_ids)
+
+    # -- building --------------------------------------------------------------
+
+    def rebuild(self, rows: Iterable[Tuple[int, str, str, str]]):
+        """Refit IDF on every idea and re-vectorize from scratch"""
+        with self._lock:
+            self._reset()
+            ids, indptr, indices, tf = [], [0], [], []
+            vocabulary = self.vocabulary
+            for idea_id, title, description, field in rows:
+                weights = term_weights(title, description, field)
+                ids.append(int(idea_id))
+                indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in weights)
+                tf.extend(weights.values())
+                indptr.append(len(indices))
+            if not ids:
+                self._built = True
+                return
+
+            ids = np.array(ids, dtype=np.int64)
+            indices = np.array(indices, dtype=np.int64)
+            self.doc_freq = np.bincount(indices, minlength=max(len(vocabulary), 1024))
+            values = (1 + np.log(np.array(tf))) * self._idf(indices, len(ids))
+            matrix = sparse.csr_matrix((values, indices, np.array(indptr)), shape=(len(ids), len(vocabulary)))
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            matrix = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ matrix
+            matrix = matrix.astype(np.float32).tocsr()
+
+            self._index_ids(ids, 0)
+            for start in range(0, len(ids), self.block_rows):
+                end = min(start + self.block_rows, len(ids))
+                self.blocks.append(_Block(start, ids[start:end], matrix[start:end]))
+            self._sealed = len(ids)
+            self._built = True
+
+    def _idf(self, terms: np.ndarray, total: int) -> np.ndarray:
+        """Smoothed idf, as scikit-learn's TfidfVectorizer"""
+        return np.log((1 + total) / (1 + self.doc_freq[terms])) + 1
+
+    def _index_ids(self, ids: np.ndarray, first_position: int):
+        top = int(ids.max())
+        if top >= len(self.positions):
+            grown = np.full(max(top + 1, 2 * len(self.positions)), -1, dtype=np.int64)
+            grown[:len(self.positions)] = self.positions
+            self.positions = grown
+        self.positions[ids] = np.arange(first_position, first_position + len(ids))
+
+    def mark_stale(self):
+        """Drop everything; the next query reloads from the loader"""
+        with self._lock:
+            self._built = False
+            self._reset()
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild(self.loader() if self.loader else [])
+
+    def add(self, idea_id: int, title: str, description: str, field: str):
+        """Index one new idea; cached results pick it up on their next read"""
+        with self._lock:
+            if not self._built:
+                return  # picked up by the lazy build
+            weights = term_weights(title, description, field)
+            self._count_terms(weights)
+            self._append(int(idea_id), weights)
+
+    def _count_terms(self, weights: Dict[str, float]):
+        for term in weights:
+            column = self.vocabulary.setdefault(term, len(self.vocabulary))
+            if column >= len(self.doc_freq):
+                self.doc_freq = np.concatenate([self.doc_freq, np.zeros_like(self.doc_freq)])
+            self.doc_freq[column] += 1
+
+    def _append(self, idea_id: int, weights: Dict[str, float]):
+        """Add one row to the tail, weighted with IDF as of now (sublinear tf, L2-normalized)"""
+        terms = np.fromiter((self.vocabulary[t] for t in weights), dtype=np.int64, count=len(weights))
+        tf = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+        values = (1 + np.log(tf)) * self._idf(terms, self.size + 1)
+        norm = np.linalg.norm(values)
+        if norm:
+            values /= norm
+        self._index_ids(np.array([idea_id]), self.size)
+        self._tail_vectors.append((terms, values.astype(np.float32)))
+        self._tail_ids.append(idea_id)
+        self._tail_matrix = None
+        if len(self._tail_ids) >= self.block_rows:
+            self._seal()
+
+    def _tail_rows(self) -> sparse.csr_matrix:
+        vectors = self._tail_vectors
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(terms) for terms, _ in vectors])
+        indices = np.concatenate([terms for terms, _ in vectors]) if vectors else np.zeros(0, np.int64)
+        data = np.concatenate([values for _, values in vectors]) if vectors else np.zeros(0, np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(vectors), len(self.vocabulary)))
+
+    def _seal(self):
+        self.blocks.append(_Block(self._sealed, np.array(self._tail_ids, dtype=np.int64), self._tail_rows()))
+        self._sealed += len(self._tail_ids)
+        self._tail_ids, self._tail_vectors = [], []
+        self._tail_matrix = None
+
+    def _scan_blocks(self):
+        """Sealed blocks plus the tail as a (start, ids, matrix) view"""
+        yield from self.blocks
+        if self._tail_ids:
+            if self._tail_matrix is None:
+                self._tail_matrix = _Block(self._sealed, np.array(self._tail_ids, dtype=np.int64), self._tail_rows())
+            yield self._tail_matrix
+
+    def _vector(self, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        if position >= self._sealed:
+            return self._tail_vectors[position - self._sealed]
+        block = self.blocks[bisect.bisect_right([b.start for b in self.blocks], position) - 1]
+        rows, row = block.rows, position - block.start
+        span = slice(rows.indptr[row], rows.indptr[row + 1])
+        return rows.indices[span].astype(np.int64), rows.data[span]
+
+    # -- queries ---------------------------------------------------------------
+
+    def _search(self, position: int, k: int, since: int = 0) -> List[Tuple[float, int]]:
+        """
+        Top-k (score, idea id) among positions >= since, excluding the query itself
+
+        Each block is scored against the query's strongest terms through the
+        block's CSC columns, so only postings of those terms are read.
+        """
+        terms, values = self._vector(position)
+        if len(terms) > self.max_query_terms:
+            keep = np.argpartition(values, -self.max_query_terms)[-self.max_query_terms:]
+            terms, values = terms[keep], values[keep]
+        best: List[Tuple[float, int]] = []
+        for block in self._scan_blocks():
+            end = block.start + len(block.ids)
+            if end <= since:
+                continue
+            known = terms < block.matrix.shape[1]
+            if not known.any():
+                continue
+            scores = block.matrix[:, terms[known]] @ values[known]
+            if block.start <= position < end:
+                scores[position - block.start] = 0
+            if since > block.start:
+                scores[:since - block.start] = 0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            for row in candidates:
+                item = (float(scores[row]), int(block.ids[row]))
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+        return sorted(best, reverse=True)
+
+    def similar(self, idea_id: int, k: int = DEFAULT_K) -> List[Tuple[int, float]]:
+        """
+        Up to k (idea id, cosine similarity) pairs, most similar first
+
+        A cached result is reused and merged with the ideas added since it
+        was computed, so it stays exact for those without a full rescan.
+        """
+        self._ensure_built()
+        with self._lock:
+            position = int(self.positions[idea_id]) if 0 <= idea_id < len(self.positions) else -1
+            if position < 0:
+                return []
+            cached = self._cache.get(idea_id)
+            if cached is not None and cached[1] >= k:
+                self.hits += 1
+                seen, computed_k, results = cached
+                if seen < self.size:
+                    fresh = self._search(position, computed_k, since=seen)
+                    merged = sorted([(score, i) for i, score in results] + fresh, reverse=True)
+                    results = [(i, score) for score, i in merged[:computed_k]]
+                    self._cache[idea_id] = (self.size, computed_k, results)
+                self._cache.move_to_end(idea_id)
+                return results[:k]
+
+            self.misses += 1
+            results = [(i, score) for score, i in self._search(position, k)]
+            self._cache[idea_id] = (self.size, k, results)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ideas": self.size,
+            "terms": len(self.vocabulary),
+            "blocks": len(self.blocks) + (1 if self._tail_ids else 0),
+            "cached": len(self._cache),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+
+
+def load_documents(connection) -> List[Tuple[int, str, str, str]]:
+    from sqlalchemy import text
+
+    return [tuple(row) for row in connection.execute(text(IDEAS_SQL))]
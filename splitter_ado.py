@@ -4,20 +4,26 @@ Minimal implementation for demo purposes
 """
 
 import json
-import requests
+import os
 from typing import Dict, List, Any, Optional
+from chain_client import ChainClient, ChainError, parse_endpoints, shared_client
 
 # Andromeda Mainnet Configuration
 ANDROMEDA_MAINNET_RPC = "https://rpc.andromeda-1.andromeda.io"
 ANDROMEDA_MAINNET_REST = "https://rest.andromeda-1.andromeda.io"
 ANDROMEDA_CHAIN_ID = "andromeda-1"
 KERNEL_ADDRESS = "andr14hj2tavq8fpesdwxxcu44rty3hh90vhujrvcmstl4zr3txmfvw9s4anegh"  # Mainnet kernel
+# Comma-separated REST endpoints queried with hedging and failover
+CHAIN_REST_ENDPOINTS = os.environ.get("IPINVEST_CHAIN_REST", ANDROMEDA_MAINNET_REST)
 
 class SplitterADO:
-    def __init__(self, rpc_url: str = ANDROMEDA_MAINNET_RPC, rest_url: str = ANDROMEDA_MAINNET_REST):
+    def __init__(self, rpc_url: str = ANDROMEDA_MAINNET_RPC, rest_url: str = CHAIN_REST_ENDPOINTS,
+                 client: Optional[ChainClient] = None):
         self.rpc_url = rpc_url
-        self.rest_url = rest_url
+        self.rest_url = parse_endpoints(rest_url)[0]
         self.chain_id = ANDROMEDA_CHAIN_ID
+        # Shared per endpoint list so breaker state outlives this object
+        self.client = client or shared_client(rest_url)
         
     def create_instantiate_msg(self, 
                               recipients: List[Dict[str, Any]], 
@@ -138,11 +144,9 @@ class SplitterADO:
         
         try:
             # Using REST API for query
-            url = f"{self.rest_url}/cosmwasm/wasm/v1/contract/{contract_address}/smart/{query_data}"
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
+            return self.client.get(f"/cosmwasm/wasm/v1/contract/{contract_address}/smart/{query_data}",
+                                   call="query_splitter_config")
+        except ChainError as e:
             return {"error": str(e)}
     
     async def query_balance(self, address: str) -> Dict[str, Any]:
@@ -156,10 +160,7 @@ class SplitterADO:
             Balance information
         """
         try:
-            url = f"{self.rest_url}/cosmos/bank/v1beta1/balances/{address}"
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
+            data = self.client.get(f"/cosmos/bank/v1beta1/balances/{address}", call="query_balance")
             
             # Find ANDR balance
             andr_balance = "0"
@@ -173,7 +174,7 @@ class SplitterADO:
                 "andr_balance": andr_balance,
                 "andr_balance_formatted": f"{int(andr_balance) / 1000000:.6f} ANDR"
             }
-        except Exception as e:
+        except (ChainError, KeyError, ValueError) as e:
             return {"error": str(e)}
 
 # Demo helper functions
@@ -0,0 +1,27 @@
+from benchmarks import compare_results, time_callable
+
+
+def test_compare_flags_only_slowdowns_past_threshold():
+    baseline = {"results": [
+        {"name": "analytics", "rows": 1000, "median_ms": 10.0},
+        {"name": "invest", "rows": 1000, "median_ms": 4.0},
+    ]}
+    current = {"results": [
+        {"name": "analytics", "rows": 1000, "median_ms": 10.5},
+        {"name": "invest", "rows": 1000, "median_ms": 6.0},
+        {"name": "portfolio", "rows": 1000, "median_ms": 1.0},
+    ]}
+
+    rows = {r["name"]: r for r in compare_results(baseline, current, threshold=0.10)}
+
+    assert set(rows) == {"analytics", "invest"}
+    assert not rows["analytics"]["regression"]
+    assert rows["invest"]["regression"]
+    assert rows["invest"]["ratio"] == 1.5
+
+
+def test_time_callable_respects_repeat():
+    calls = []
+    stats = time_callable(lambda: calls.append(1), repeat=7, budget=10.0)
+    assert stats["iterations"] == 7 == len(calls)
+    assert stats["min_ms"] <= stats["median_ms"] <= stats["p95_ms"]
@@ -0,0 +1,134 @@
+import time
+
+from broadcast_pipeline import BroadcastPipeline, distribute_royalties
+from chain_client import ChainClient
+from chain_stub import LocalChainREST
+from cosmos_tx import PrivateKey, verify
+
+KEY = PrivateKey.from_hex("4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318")
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_signatures_match_rfc6979_vector():
+    key = PrivateKey(1)
+    signature = key.sign(b"Satoshi Nakamoto")
+    assert signature.hex() == ("934b1ea10a4b3c1757e2b0c017d0b6143ce3c9a7e6a4a49860d7a6ab210ee3d8"
+                               "2442ce9d2b916064108014783e923ec36b49743e2ffa1c4496f01a512aafd9e5")
+    assert verify(key.public_key, b"Satoshi Nakamoto", signature)
+    assert not verify(key.public_key, b"Satoshi", signature)
+    assert KEY.address().startswith("andr1") and len(KEY.address()) == 43
+
+
+def test_royalty_sends_are_signed_pipelined_and_paid_out():
+    with LocalChainREST(block_interval=0.05) as chain:
+        chain.add_account(KEY.address(), sequence=7)
+        for i in range(10):
+            chain.add_splitter(f"andr1splitter{i}", {"andr1creator": 0.7, "andr1investor": 0.3})
+        pipeline = BroadcastPipeline(ChainClient(chain.url), KEY, chain.chain_id, max_in_flight=8,
+                                     poll_interval=0.02)
+        futures = distribute_royalties(pipeline, [(f"andr1splitter{i % 10}", 1000) for i in range(40)], per_tx=2)
+        results = [future.result(timeout=30) for future in futures]
+        pipeline.close()
+
+        assert all(result.ok and result.height > 1 for result in results)
+        assert sorted(result.sequence for result in results) == list(range(7, 27))
+        assert chain.balances["andr1creator"]["uandr"] == 40 * 700
+        assert chain.accounts[KEY.address()]["sequence"] == 27
+
+
+def test_sequence_mismatch_resyncs_and_retries():
+    with LocalChainREST() as chain:
+        chain.add_account(KEY.address())
+        chain.add_splitter("andr1splitter", {"andr1creator": 1.0})
+        pipeline = BroadcastPipeline(ChainClient(chain.url), KEY, chain.chain_id, poll_interval=0.02)
+        assert pipeline.submit([pipeline.send_funds("andr1splitter", 10)]).result(timeout=10).ok
+
+        # Another process spends sequences with the same key
+        chain.accounts[KEY.address()]["sequence"] += 3
+        results = [f.result(timeout=10) for f in distribute_royalties(pipeline, [("andr1splitter", 10)] * 5)]
+        pipeline.close()
+        assert all(r.ok for r in results) and [r.sequence for r in results] == [4, 5, 6, 7, 8]
+        assert pipeline.stats["sequence_resyncs"] == 1
+
+
+def test_dropped_txs_are_resubmitted_once():
+    with LocalChainREST(block_interval=3600) as chain:
+        account = chain.add_account(KEY.address())
+        chain.add_splitter("andr1splitter", {"andr1creator": 1.0})
+        pipeline = BroadcastPipeline(ChainClient(chain.url), KEY, chain.chain_id, confirm_timeout=0.3,
+                                     poll_interval=0.05)
+        futures = distribute_royalties(pipeline, [("andr1splitter", 100)] * 3)
+        _wait_for(lambda: len(chain.mempool) == 3)
+
+        # The node restarts and forgets its mempool
+        with chain.lock:
+            chain.mempool.clear()
+            account["sequence"] = 0
+        _wait_for(lambda: len(chain.mempool) == 3 and pipeline.stats["resubmitted"] == 3)
+        chain.commit_block()
+        results = [future.result(timeout=10) for future in futures]
+        pipeline.close()
+
+        assert all(r.ok and r.attempts == 2 for r in results)
+        assert chain.balances["andr1creator"]["uandr"] == 300
+
+
+def test_distribute_endpoint_pays_registered_splitters(client, monkeypatch):
+    import app as app_module
+
+    operator = {"Authorization": "Bearer test-operator-token"}
+    assert client.post("/api/royalties/distribute", json={"payouts": []}).status_code == 401
+    assert client.post("/api/royalties/distribute", json={"payouts": []},
+                       headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.post("/api/royalties/distribute", json={"payouts": []}, headers=operator).status_code in (400, 503)
+    client.post("/api/splitter/contracts", json={
+        "idea_id": 1, "contract_address": "andr1splitter", "creator_wallet": "andr1creator"}, headers=operator)
+    with LocalChainREST(block_interval=0.05) as chain:
+        chain.add_account(KEY.address())
+        chain.add_splitter("andr1splitter", {"andr1creator": 1.0})
+        pipeline = BroadcastPipeline(ChainClient(chain.url), KEY, chain.chain_id, poll_interval=0.02)
+        monkeypatch.setattr(app_module, "_royalty_pipeline", pipeline)
+
+        assert client.post("/api/royalties/distribute", json={
+            "payouts": [{"idea_id": 2, "amount": 5}]}, headers=operator).status_code == 404
+        response = client.post("/api/royalties/distribute", json={
+            "payouts": [{"idea_id": 1, "amount": 500}, {"idea_id": 1, "amount": 250}]}, headers=operator)
+        assert response.status_code == 202
+        jobs = response.get_json()["jobs"]
+        assert [job["payouts"][0]["amount"] for job in jobs] == [500, 250]
+        pipeline.close()
+
+        statuses = [client.get(f"/api/royalties/jobs/{job['job_id']}", headers=operator).get_json()
+                    for job in jobs]
+        assert [(s["state"], s["result"]["code"]) for s in statuses] == [("confirmed", 0), ("confirmed", 0)]
+        assert client.get("/api/royalties/jobs/nope", headers=operator).status_code == 404
+        assert client.get(f"/api/royalties/jobs/{jobs[0]['job_id']}").status_code == 401
+        assert chain.balances["andr1creator"]["uandr"] == 750
+
+
+def test_royalty_pipeline_is_created_once_under_concurrency(monkeypatch):
+    import threading
+    import app as app_module
+
+    created = []
+
+    def slow_pipeline():
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(app_module, "_royalty_pipeline", None)
+    monkeypatch.setattr(app_module, "pipeline_from_env", slow_pipeline)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(app_module.royalty_pipeline())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and all(result is created[0] for result in results)
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from chain_client import OPEN, ChainClient, ChainRequestError, ChainUnavailable, CircuitBreaker
+from chain_stub import LocalChainREST
+from splitter_ado import SplitterADO
+
+BALANCE = "/cosmos/bank/v1beta1/balances/andr1creator"
+
+
+@pytest.fixture
+def nodes():
+    stubs = [LocalChainREST().start() for _ in range(3)]
+    for stub in stubs:
+        stub.balances["andr1creator"] = {"uandr": 2_500_000}
+    yield stubs
+    for stub in stubs:
+        stub.stop()
+
+
+def test_hedging_bounds_p99_when_one_node_stalls(nodes):
+    nodes[0].inject(slow_rate=1.0, slow_seconds=1.0)
+    client = ChainClient([n.url for n in nodes], hedge_after=0.05, deadline=5)
+    latencies = []
+    for _ in range(60):
+        start = time.perf_counter()
+        assert client.get(BALANCE)["balances"][0]["amount"] == "2500000"
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    assert latencies[int(0.99 * (len(latencies) - 1))] < 0.5
+    # The stalled node falls behind the healthy ones once its latency is known
+    assert client.hedges < 10
+    client.close()
+
+
+def test_breaker_opens_on_failing_node_and_probes_after_reset(nodes):
+    nodes[1].inject(error_rate=1.0)
+    client = ChainClient([nodes[1].url, nodes[2].url], failure_threshold=3, reset_timeout=0.2)
+    for _ in range(10):
+        client.get(BALANCE)
+    assert client.endpoints[0].breaker.state == OPEN and client.endpoints[0].requests == 3
+
+    nodes[1].heal()
+    time.sleep(0.25)
+    client.get(BALANCE)
+    assert client.endpoints[0].breaker.state == "closed"
+    client.close()
+
+
+def test_deadline_retries_and_client_errors(nodes):
+    for node in nodes[:2]:
+        node.inject(slow_rate=1.0, slow_seconds=2.0)
+    client = ChainClient([n.url for n in nodes[:2]], timeout=0.3, deadline=0.5, hedge_after=0.05)
+    start = time.perf_counter()
+    with pytest.raises(ChainUnavailable):
+        client.get(BALANCE)
+    assert time.perf_counter() - start < 0.8
+
+    nodes[2].inject(error_rate=0.5, seed=3)
+    flaky = ChainClient([nodes[2].url], retries=5, backoff=0.01, failure_threshold=100)
+    assert all(flaky.get(BALANCE)["balances"] for _ in range(20)) and flaky.retried > 0
+    with pytest.raises(ChainRequestError):
+        ChainClient([nodes[2].url], retries=5).get("/cosmwasm/wasm/v1/contract/andr1missing/smart/{}")
+    client.close()
+    flaky.close()
+
+
+def test_half_open_allows_a_single_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    assert breaker.record_failure() and not breaker.acquire()
+    now[0] = 10
+    assert breaker.acquire() and not breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.times_opened == 2
+
+
+def test_splitter_queries_fail_over(nodes):
+    nodes[0].inject(error_rate=1.0)
+    splitter = SplitterADO(rest_url=",".join(n.url for n in nodes))
+    balance = asyncio.run(splitter.query_balance("andr1creator"))
+    assert balance["andr_balance"] == "2500000"
@@ -0,0 +1,106 @@
+from chain_indexer import ChainEventSource, ChainIndexer, extract_transfers, parse_coins
+from chain_stub import LocalChainREST
+
+SPLITTER = "andr1splittercontract"
+CREATOR = "andr1creatorwallet"
+OPERATOR = {"Authorization": "Bearer test-operator-token"}
+
+
+def test_extract_transfers_classifies_deposits_and_payouts():
+    tx = {"txhash": "AB", "height": "7", "code": 0, "logs": [{"events": [
+        {"type": "transfer", "attributes": [{"key": "recipient", "value": SPLITTER},
+                                            {"key": "sender", "value": "andr1payer"},
+                                            {"key": "amount", "value": "1000uandr"}]},
+        {"type": "transfer", "attributes": [{"key": "recipient", "value": CREATOR},
+                                            {"key": "sender", "value": SPLITTER},
+                                            {"key": "amount", "value": "700uandr,3ibc/XYZ"}]},
+    ]}]}
+    rows = extract_transfers(tx, [SPLITTER])
+    assert [(r["kind"], r["counterparty"], r["amount"], r["denom"]) for r in rows] == [
+        ("deposit", "andr1payer", 1000, "uandr"), ("payout", CREATOR, 700, "uandr"), ("payout", CREATOR, 3, "ibc/XYZ")]
+    assert extract_transfers(dict(tx, code=5), [SPLITTER]) == []
+    assert parse_coins("") == []
+
+
+def test_indexer_paginates_checkpoints_and_reconciles(client):
+    from app import db, IndexerCheckpoint
+
+    client.post("/invest/1", json={"tokens": 30, "wallet_address": "andr1alice"})
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1bob"})
+    royalties_before = client.get("/api/ledger/wallet/andr1bob").get_json()["royalties_received"]
+    contract = {"idea_id": 1, "contract_address": SPLITTER, "creator_wallet": CREATOR}
+    assert client.post("/api/splitter/contracts", json=contract).status_code == 401
+    assert client.post("/api/splitter/contracts", json=contract, headers=OPERATOR).status_code == 201
+    # The idea's payment target cannot be replaced by registering another contract
+    assert client.post("/api/splitter/contracts", json={**contract, "contract_address": "andr1other"},
+                       headers=OPERATOR).status_code == 409
+
+    with LocalChainREST() as chain:
+        for height in range(10, 55):
+            chain.add_splitter_send(height, SPLITTER, "andr1payer",
+                                    {CREATOR: 700, "andr1alice": 225, "andr1bob": 75})
+        chain.add_tx(60, [{"type": "transfer", "attributes": [
+            {"key": "recipient", "value": "andr1x"}, {"key": "sender", "value": "andr1y"},
+            {"key": "amount", "value": "5uandr"}]}])
+
+        payouts = []
+        indexer = ChainIndexer(ChainEventSource(chain.url, page_limit=10, max_workers=4),
+                               window=20, on_payouts=payouts.extend)
+        with client.application.app_context():
+            stats = indexer.run_once()
+            assert stats["windows"] == 3 and stats["txs"] == 45
+            assert stats["deposits"] == 45 and stats["payouts"] == 135
+            assert db.session.get(IndexerCheckpoint, f"splitter:{SPLITTER}").height == 60
+
+            # Nothing new: one latest-height call and no tx searches
+            chain.requests.clear()
+            assert indexer.run_once()["txs"] == 0
+            assert chain.requests == ["/cosmos/base/tendermint/v1beta1/blocks/latest"]
+
+            # A restarted indexer resumes from the checkpoint and sees only the new send
+            chain.add_splitter_send(70, SPLITTER, "andr1payer", {CREATOR: 700, "andr1alice": 300})
+            stats = ChainIndexer(ChainEventSource(chain.url), window=20).run_once()
+            assert stats["deposits"] == 1 and stats["payouts"] == 2
+
+    assert len(payouts) == 135
+    # The web process appends the indexed payouts to its ledger exactly once
+    for _ in range(2):
+        wallet = client.get("/api/ledger/wallet/andr1bob").get_json()
+        assert abs(wallet["royalties_received"] - royalties_before - 45 * 75 / 1_000_000) < 1e-9
+    dashboard = client.get("/api/royalties/1").get_json()
+    assert dashboard["deposited"] == 46_000 and dashboard["paid_out"] == 46_000
+    status = {r["address"]: r["status"] for r in dashboard["recipients"]}
+    assert status == {CREATOR: "ok", "andr1alice": "overpaid", "andr1bob": "underpaid"}
+    assert dashboard["contracts"] == [{"address": SPLITTER, "indexed_height": 70}]
+
+
+def _transfer(sender, recipient, amount):
+    return {"type": "transfer", "attributes": [
+        {"key": "recipient", "value": recipient}, {"key": "sender", "value": sender},
+        {"key": "amount", "value": f"{amount}uandr"}]}
+
+
+def test_reconciliation_follows_trades_and_bank_sends(client):
+    client.post("/invest/1", json={"tokens": 30, "wallet_address": "andr1alice"})
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1bob"})
+    client.post("/api/orders/1", json={"wallet_address": "andr1alice", "side": "sell", "quantity": 10, "price": 2600})
+    assert client.post("/api/orders/1", json={"wallet_address": "andr1carol", "side": "buy", "type": "market",
+                                              "quantity": 10}).get_json()["filled_quantity"] == 10
+    client.post("/api/splitter/contracts", json={"idea_id": 1, "contract_address": SPLITTER,
+                                                 "creator_wallet": CREATOR}, headers=OPERATOR)
+
+    shares = {CREATOR: 700, "andr1alice": 150, "andr1bob": 75, "andr1carol": 75}
+    with LocalChainREST() as chain:
+        chain.add_splitter_send(10, SPLITTER, "andr1payer", shares)
+        # A plain MsgSend deposit and a payout made only of bank transfers: no wasm events
+        chain.add_tx(12, [_transfer("andr1payer", SPLITTER, 1000)])
+        chain.add_tx(13, [_transfer(SPLITTER, address, amount) for address, amount in shares.items()])
+        with client.application.app_context():
+            stats = ChainIndexer(ChainEventSource(chain.url), window=20).run_once()
+    assert (stats["txs"], stats["deposits"], stats["payouts"]) == (3, 2, 8)
+
+    dashboard = client.get("/api/royalties/1").get_json()
+    assert dashboard["deposited"] == 2000 and dashboard["paid_out"] == 2000
+    recipients = {r["address"]: (r["tokens_held"], r["status"]) for r in dashboard["recipients"]}
+    assert recipients == {CREATOR: (0, "ok"), "andr1alice": (20, "ok"), "andr1bob": (10, "ok"),
+                          "andr1carol": (10, "ok")}
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from data_structures import HoldingsStore, IdeaMetadata, InvestorProfile
+
+
+def test_slotted_classes_keep_their_api():
+    profile = InvestorProfile("Ada", "andr1ada", "moderate")
+    profile.add_investment("Quantum Battery", 12)
+    assert profile.investments[0]["idea"] == "Quantum Battery" and profile.investments[0].tokens == 12
+    idea = IdeaMetadata("Quantum Battery", "desc", "Energy", "Ada", 1e6, 1000)
+    with pytest.raises(AttributeError):
+        idea.extra = 1
+
+
+def test_holdings_store_group_by_matches_python_totals():
+    rng = np.random.default_rng(1)
+    rows = [(f"andr1w{w}", f"Idea {i}", int(t)) for w, i, t in
+            zip(rng.integers(0, 30, 2000), rng.integers(0, 15, 2000), rng.integers(1, 50, 2000))]
+    store = HoldingsStore(capacity=8)
+    store.extend(*zip(*rows[:1500]))
+    for row in rows[1500:]:
+        store.add(*row)
+
+    by_wallet, by_idea = {}, {}
+    for wallet, idea, tokens in rows:
+        by_wallet[wallet] = by_wallet.get(wallet, 0) + tokens
+        by_idea[idea] = by_idea.get(idea, 0) + tokens
+    assert dict(zip(store.wallets, store.tokens_by_wallet().tolist())) == by_wallet
+    assert dict(zip(store.ideas, store.tokens_by_idea().tolist())) == by_idea
+    assert len(store) == 2000 and store.nbytes == 2000 * 16
+
+    wallet_ids, idea_ids, tokens = store.positions()
+    assert tokens.sum() == sum(by_wallet.values())
+    w3 = {store.ideas[i]: int(t) for w, i, t in zip(wallet_ids, idea_ids, tokens) if store.wallets[w] == "andr1w3"}
+    assert store.wallet_holdings("andr1w3") == w3 and store.wallet_holdings("andr1nobody") == {}
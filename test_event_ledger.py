@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+
+from event_ledger import PURCHASE, RECORD_SIZE, EventLedger, ledger_stats
+
+
+def test_state_from_purchases_transfers_and_royalties(tmp_path):
+    ledger = EventLedger(str(tmp_path))
+    ledger.append_purchase("andr1alice", 1, 10, 100.0)
+    ledger.append_purchase("andr1bob", 1, 5, 50.0)
+    ledger.append_transfer("andr1alice", "andr1bob", 1, 3, 36.0)
+    ledger.append_royalty("andr1alice", 1, 7.5)
+
+    state = ledger.state
+    assert state.wallet_holdings(ledger.wallet_id("andr1alice")) == {1: 7}
+    assert state.wallet_holdings(ledger.wallet_id("andr1bob")) == {1: 8}
+    assert state.tokens_sold[1] == 15
+    assert state.idea_royalties[1] == 7.5
+    stats = ledger_stats(ledger)
+    assert stats["last_seq"] == 4 and stats["volume"] == 186.0 and stats["wallets"] == 2
+    ledger.close()
+
+
+def test_wallet_summary_is_consistent_under_concurrent_appends(tmp_path):
+    import threading
+
+    ledger = EventLedger(str(tmp_path))
+    ledger.append_royalty("andr1alice", 1, 1.0)
+    done = threading.Event()
+
+    def writer():
+        for i in range(3000):
+            ledger.append_purchase("andr1alice", 1 + i % 500, 1, 1.0)
+            ledger.append_royalty("andr1alice", 1, 1.0)
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        summary = ledger.wallet_summary("andr1alice")
+        # Every event is one token bought or one royalty, so a consistent read counts each seq once
+        assert summary["as_of_seq"] == sum(summary["holdings"].values()) + summary["royalties_received"]
+    thread.join()
+    assert ledger.wallet_summary("andr1nobody") == {"holdings": {}, "royalties_received": 0.0, "as_of_seq": 6001}
+    ledger.close()
+
+
+def test_restart_replays_tail_after_snapshot_and_trims_torn_record(tmp_path):
+    ledger = EventLedger(str(tmp_path), segment_events=100, snapshot_every=250)
+    rng = np.random.default_rng(0)
+    ledger.append_many([(PURCHASE, int(i), int(t), float(t), None, f"andr1w{w}", 0.0)
+                        for i, t, w in zip(rng.integers(1, 20, 300), rng.integers(1, 9, 300),
+                                           rng.integers(0, 40, 300))])
+    for _ in range(30):
+        ledger.append_transfer("andr1w1", "andr1w2", 3, 1, 2.0)
+    expected = ledger_stats(ledger)
+    ledger.close()
+
+    segments = sorted(p for p in os.listdir(tmp_path) if p.startswith("segment-"))
+    assert len(segments) == 4
+    with open(tmp_path / segments[-1], "ab") as f:
+        f.write(b"\x00" * (RECORD_SIZE // 2))
+
+    reopened = EventLedger(str(tmp_path), segment_events=100, snapshot_every=250)
+    assert reopened.state_snapshot_seq == 300
+    assert ledger_stats(reopened) == expected
+    full = reopened.rebuild(use_snapshot=False)
+    assert np.array_equal(full.holding_keys, reopened.state.holding_keys)
+    assert np.array_equal(full.holding_tokens, reopened.state.holding_tokens)
+    assert reopened.append_purchase("andr1w1", 3, 1, 1.0) == 331
+    reopened.close()
+
+
+def test_consumer_resumes_from_committed_offset(tmp_path):
+    ledger = EventLedger(str(tmp_path))
+    for i in range(5):
+        ledger.append_purchase("andr1alice", i + 1, 1, 1.0)
+
+    consumer = ledger.consumer("rollup")
+    assert sum(len(batch) for batch in consumer.poll(batch_events=2)) == 5
+    consumer.commit()
+    ledger.append_royalty("andr1alice", 1, 3.0)
+
+    batches = list(ledger.consumer("rollup").poll())
+    assert [int(seq) for batch in batches for seq in batch["seq"]] == [6]
+    ledger.close()
+
+
+def test_invest_and_trades_feed_the_ledger(client):
+    client.post("/invest/1", json={"wallet_address": "andr1ledgerseller", "tokens": 10})
+    client.post("/api/orders/1", json={"wallet_address": "andr1ledgerseller", "side": "sell",
+                                       "quantity": 4, "price": 90})
+    client.post("/api/orders/1", json={"wallet_address": "andr1ledgerbuyer", "side": "buy",
+                                       "quantity": 4, "price": 90})
+
+    seller = client.get("/api/ledger/wallet/andr1ledgerseller").get_json()
+    buyer = client.get("/api/ledger/wallet/andr1ledgerbuyer").get_json()
+    assert seller["holdings"] == [{"idea_id": 1, "tokens": 6}]
+    assert buyer["holdings"] == [{"idea_id": 1, "tokens": 4}]
+    assert client.get("/api/ledger/wallet/andr1nobody").get_json()["holdings"] == []
+
+
+def test_backfill_reads_created_at_as_utc(client, tmp_path, monkeypatch):
+    import time
+    from datetime import datetime, timezone
+
+    from app import app, db, Investment
+    from event_ledger import backfill_from_database
+
+    created_at = datetime(2026, 1, 1, 12, 0, 0, 250000)
+    with app.app_context():
+        db.session.add(Investment(idea_id=1, investor_address="andr1backfill", tokens_purchased=2,
+                                  amount_paid=5000.0, created_at=created_at))
+        db.session.commit()
+
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        ledger = EventLedger(str(tmp_path))
+        assert backfill_from_database(ledger) >= 1
+        timestamps = np.concatenate([events["ts"] for events in ledger.read()])
+        ledger.close()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    expected = int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+    assert expected in timestamps
@@ -0,0 +1,20 @@
+def test_facets_leave_out_their_own_filter(client):
+    # Demo ideas: Quantum 2500, Healthcare AI 1800, Clean Energy 3200, Blockchain 1500
+    body = client.get("/api/marketplace?field=Blockchain&field=Healthcare+AI&max_price=2000").get_json()
+    facets = body["facets"]
+
+    assert facets["total"] == 2
+    assert {idea["field"] for idea in body["ideas"]} == {"Blockchain", "Healthcare AI"}
+    # field facet ignores the field filter but honours the price filter
+    assert {f["field"]: f["count"] for f in facets["fields"]} == {"Blockchain": 1, "Healthcare AI": 1}
+    # price facet ignores the price filter but honours the field filter
+    buckets = {b["label"]: b["count"] for b in facets["price_buckets"]}
+    assert buckets["1,000-2,000"] == 2 and buckets["3,000-5,000"] == 0
+
+
+def test_remaining_supply_and_value_filters(client):
+    client.post("/invest/1", json={"tokens": 900, "wallet_address": "andr1whale"})
+
+    body = client.get("/api/marketplace?min_available=500&min_value=2000000").get_json()
+    assert [idea["field"] for idea in body["ideas"]] == ["Clean Energy"]
+    assert client.get("/marketplace?min_available=500").status_code == 200
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from feature_store import COLUMN_INDEX, WIDTH, FeatureStore, idea_row
+from order_book import Fill
+
+IDEA = {"id": 3, "title": "Neural chip", "description": "AI accelerator", "field": "Semiconductors",
+        "predicted_value": 2_000_000, "total_tokens": 1000, "tokens_sold": 250, "token_price": 2000,
+        "status": "active"}
+
+
+def _trade_in_child(path, idea_id):
+    store = FeatureStore(path)
+    store.record_trades([Fill(idea_id, 5.0, 10, 1, 2, "andr1b", "andr1s", "buy", 0.0)] * 100)
+    store.close()
+
+
+def test_rows_grow_and_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "features.f32")
+    store = FeatureStore(path, initial_capacity=2)
+    assert store.created
+    store.update_idea(IDEA)
+    column = store.column("funding_progress")
+    assert column.base is not None and column[3] == 0.25
+    assert store.as_dict(3)["ai_indicator"] == 1 and store.row(2) is None
+
+    # Another worker grows the file and writes a row past this mapping
+    other = FeatureStore(path)
+    assert not other.created
+    other.update_idea(dict(IDEA, id=5000, tokens_sold=0))
+    assert os.path.getsize(path) == 64 + 8192 * WIDTH * 4
+    assert store.matrix().shape == (5001, WIDTH) and store.row(5000) is not None
+
+    procs = [multiprocessing.get_context("fork").Process(target=_trade_in_child, args=(path, 3))
+             for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert store.as_dict(3)["trade_count"] == 400 and store.as_dict(3)["trade_volume"] == 20_000
+
+    # Idea updates keep the trade totals
+    store.update_idea(dict(IDEA, tokens_sold=500))
+    assert store.as_dict(3)["trade_count"] == 400 and store.as_dict(3)["funding_progress"] == 0.5
+    store.close()
+    other.close()
+
+
+def test_rebuild_matches_incremental_rows(tmp_path):
+    store = FeatureStore(str(tmp_path / "features.f32"))
+    store.rebuild([IDEA, dict(IDEA, id=1, status="funded")],
+                  {3: {"trade_count": 2, "trade_volume": 30.0, "last_trade_price": 12.0}})
+    assert store.rows == 4 and store.stats()["ideas"] == 2
+    expected = idea_row(IDEA)
+    expected[[COLUMN_INDEX["trade_count"], COLUMN_INDEX["trade_volume"], COLUMN_INDEX["last_trade_price"]]] = \
+        [2, 30, 12]
+    np.testing.assert_array_equal(store.matrix()[3], expected)
+    assert store.as_dict(1)["active"] == 0
+    store.close()
+
+
+def test_submit_invest_and_trades_update_the_store(client):
+    from app import feature_store
+
+    assert feature_store.stats()["ideas"] == 4
+    client.post("/submit_idea", data={"title": "Graphene filter", "description": "Water purification",
+                                      "field": "Materials Science", "inventor": "Dr. Lee"})
+    assert feature_store.row(5) is not None and feature_store.as_dict(5)["field_complexity"] == 10
+
+    client.post("/invest/1", json={"tokens": 100, "wallet_address": "andr1seller"})
+    assert feature_store.as_dict(1)["funding_progress"] == np.float32(0.1)
+    client.post("/api/orders/1", json={"wallet_address": "andr1seller", "side": "sell", "quantity": 6,
+                                       "price": 2600})
+    client.post("/api/orders/1", json={"wallet_address": "andr1buyer", "side": "buy", "type": "market",
+                                       "quantity": 4})
+    assert feature_store.as_dict(1)["trade_count"] == 1 and feature_store.as_dict(1)["last_trade_price"] == 2600
+
+    # Recommendations read upside from the mapped column
+    feature_store.column("upside")[2] = 5.0
+    assert client.get("/api/recommendations").get_json()[0]["idea_id"] == 2
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from generate_data import generate
+from valuation_model import FEATURE_COLUMNS
+
+
+def _snapshot():
+    from app import app, db, Idea, Investment, User
+
+    with app.app_context():
+        ideas = [(i.title, i.field, i.tokens_sold, i.total_tokens) for i in Idea.query.order_by(Idea.id)]
+        wallets = {u.wallet_address for u in User.query}
+        investments = [(i.investor_address, i.idea_id, i.tokens_purchased) for i in Investment.query.order_by(Investment.id)]
+        db.drop_all()
+    return ideas, wallets, investments
+
+
+def test_generate_is_reproducible_and_consistent(tmp_path):
+    csv_path = tmp_path / "train.csv"
+    generate(ideas=50, users=20, investments=500, seed=7, csv_path=str(csv_path))
+    first = _snapshot()
+    generate(ideas=50, users=20, investments=500, seed=7)
+    assert _snapshot() == first
+
+    ideas, wallets, investments = first
+    assert len(ideas) == 50 and len(wallets) == 20 and len(investments) == 500
+    assert all(addr in wallets for addr, _, _ in investments)
+    sold = {}
+    for _, idea_id, tokens in investments:
+        sold[idea_id] = sold.get(idea_id, 0) + tokens
+    for idea_id, (_, _, tokens_sold, total_tokens) in enumerate(ideas, start=1):
+        assert tokens_sold == sold.get(idea_id, 0) <= total_tokens
+
+    df = pd.read_csv(csv_path)
+    assert list(df.columns) == FEATURE_COLUMNS + ["valuation"]
+    assert len(df) == 50
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+
+
+def _buy(client, wallet, tokens, idea_id=1):
+    assert client.post(f"/invest/{idea_id}", json={"tokens": tokens, "wallet_address": wallet}).status_code == 200
+
+
+def test_holders_are_grouped_paginated_and_index_backed(client):
+    from app import app, db, idea_holders
+
+    for i in range(25):
+        _buy(client, f"andr1wallet{i:02d}", 1 + i % 3)
+    _buy(client, "andr1wallet00", 40)
+    _buy(client, "andr1other", 5, idea_id=2)
+
+    first = client.get("/api/ideas/1/holders?per_page=10").get_json()
+    assert (first["total"], first["purchases"]) == (25, 26)
+    assert first["holders"][0] == {"investor_address": "andr1wallet00", "tokens": 41, "amount": 41 * 2500.0,
+                                   "purchases": 2}
+    last = client.get("/api/ideas/1/holders?per_page=10&page=3").get_json()["holders"]
+    assert len(last) == 5 and all(h["tokens"] == 1 for h in last)
+
+    page = client.get("/idea/1?page=2").get_data(as_text=True)
+    assert "Page 2 of 2" in page and "25 investors" in page
+    # Page links keep the page size
+    page = client.get("/idea/1?page=2&per_page=10").get_data(as_text=True)
+    assert "Page 2 of 3" in page
+    assert "/idea/1?page=1&amp;per_page=10" in page and "/idea/1?page=3&amp;per_page=10" in page
+
+    with app.app_context():
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT investor_address, SUM(tokens_purchased), SUM(amount_paid), COUNT(*) "
+            "FROM investment WHERE idea_id = 1 GROUP BY investor_address")).all()
+        assert "COVERING INDEX ix_investment_idea_investor" in " ".join(row[-1] for row in plan)
+        assert idea_holders(3)["holders"] == []
+
+
+def test_export_streams_full_history(client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "EXPORT_BATCH", 4)
+    for i in range(10):
+        _buy(client, f"andr1wallet{i}", i + 1)
+    _buy(client, "andr1other", 5, idea_id=2)
+
+    response = client.get("/api/ideas/1/investments.csv")
+    assert response.is_streamed and response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(r["tokens_purchased"]) for r in rows] == list(range(1, 11))
+
+    lines = client.get("/api/ideas/1/investments.jsonl").get_data(as_text=True).splitlines()
+    assert [json.loads(line)["investor_address"] for line in lines] == [f"andr1wallet{i}" for i in range(10)]
+    assert client.get("/api/ideas/1/investments.xml").status_code == 400
@@ -0,0 +1,69 @@
+import random
+from collections import defaultdict
+
+from leaderboards import DAY, FASTEST_SELLING, HOTTEST_FIELDS, MOST_FUNDED, Leaderboards, SlidingTopK
+
+
+def test_sliding_top_k_matches_recount_as_events_expire():
+    now = [0.0]
+    board = SlidingTopK(window=100, buckets=10, capacity=5, clock=lambda: now[0])
+    rng = random.Random(1)
+    events = []
+    for step in range(2000):
+        now[0] = step * 0.7
+        key, amount = rng.randrange(40), rng.random() * (10 if rng.random() < 0.9 else 200)
+        board.add(key, amount)
+        events.append((now[0], key, amount))
+        if step % 50 == 0:
+            # Expired through whole buckets only: everything in a bucket older than the window
+            cutoff = (int(now[0] // 10) - 9) * 10
+            totals = defaultdict(float)
+            for at, k, a in events:
+                if at >= cutoff:
+                    totals[k] += a
+            expected = sorted(totals.items(), key=lambda item: -item[1])[:5]
+            got = [(key, total) for key, total, _ in board.top(5)]
+            assert [k for k, _ in got] == [k for k, _ in expected]
+            assert all(abs(t - e) < 1e-6 for (_, t), (_, e) in zip(got, expected))
+    assert 0 < board.recomputes < 2000 // 5
+
+
+def test_leaderboards_rank_and_expire():
+    now = [10 * DAY]
+    boards = Leaderboards(clock=lambda: now[0])
+    boards.record_purchase(1, "Quantum", "Quantum Computing", 1000, 100, 250_000)
+    boards.record_purchase(2, "Battery", "Clean Energy", 1000, 300, 90_000)
+    boards.record_purchase(3, "Solar", "Clean Energy", 500, 20, 200_000, at=now[0] - 2 * 3600)
+    snapshot = boards.snapshot(2)
+    assert [e["idea_id"] for e in snapshot[MOST_FUNDED]] == [1, 3]
+    assert [e["idea_id"] for e in snapshot[FASTEST_SELLING]] == [2, 1]
+    assert snapshot[HOTTEST_FIELDS][0] == {"field": "Clean Energy", "amount": 290_000, "investments": 2}
+
+    now[0] += DAY
+    assert boards.snapshot() == {MOST_FUNDED: [], FASTEST_SELLING: [], HOTTEST_FIELDS: []}
+    assert boards.ideas == {}
+
+    # Titles are kept only for ideas still on a board
+    for idea_id in range(100):
+        boards.record_purchase(idea_id, f"Idea {idea_id}", "Robotics", 1000, 1, 10.0)
+    now[0] += DAY
+    boards.record_purchase(7, "Idea 7", "Robotics", 1000, 1, 10.0)
+    assert len(boards.ideas) <= 2 and boards.snapshot()[MOST_FUNDED][0]["title"] == "Idea 7"
+
+
+def test_invest_feeds_leaderboards_endpoint_and_index(client):
+    client.post("/invest/2", json={"tokens": 50, "wallet_address": "andr1alice"})
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1bob"})
+    boards = client.get("/api/leaderboards?k=3").get_json()
+    assert [e["idea_id"] for e in boards[MOST_FUNDED]] == [2, 1]
+    assert boards[FASTEST_SELLING][0] == {"idea_id": 2, "title": "AI-Powered Medical Diagnosis",
+                                          "field": "Healthcare AI", "supply_sold_last_hour": 0.05,
+                                          "investments": 1}
+    assert client.get("/api/leaderboards?k=0").status_code == 400
+    assert b"Most Funded Today" in client.get("/").data
+
+    # Rebuilt from the investment table after a restart
+    from app import init_demo_data, leaderboards
+    leaderboards.rebuild([])
+    init_demo_data()
+    assert client.get("/api/leaderboards?k=3").get_json() == boards
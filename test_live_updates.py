@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+from live_updates import Broadcaster, IDEA_UPDATE, NEW_IDEA, RESET
+
+
+def _events(chunk: bytes):
+    """(event, data) pairs from an SSE chunk"""
+    events = []
+    for block in chunk.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_updates_coalesce_per_idea_and_filter_by_subscription():
+    hub = Broadcaster(flush_interval=60)
+    for sold in range(1, 101):
+        hub.publish(IDEA_UPDATE, {"idea_id": 1, "tokens_sold": sold}, idea_id=1)
+    hub.publish(IDEA_UPDATE, {"idea_id": 2, "tokens_sold": 5}, idea_id=2)
+    hub.publish(NEW_IDEA, {"idea_id": 3})
+    hub.publish(NEW_IDEA, {"idea_id": 4})
+    assert hub.flush() == 4
+
+    stream = hub.subscribe(ideas=[1], last_event_id=0, timeout=1)
+    next(stream)
+    assert _events(next(stream)) == [(IDEA_UPDATE, {"idea_id": 1, "tokens_sold": 100}),
+                                     (NEW_IDEA, {"idea_id": 3}), (NEW_IDEA, {"idea_id": 4})]
+    stream.close()
+    assert hub.stats()["subscribers"] == 0
+    hub.close()
+
+
+def test_fan_out_to_many_waiting_subscribers():
+    hub = Broadcaster(flush_interval=0.05)
+    received = []
+    ready = threading.Barrier(301)
+
+    def listen():
+        stream = hub.subscribe(timeout=5)
+        next(stream)
+        ready.wait()
+        for chunk in stream:
+            if _events(chunk):
+                received.append(_events(chunk))
+                break
+        stream.close()
+
+    threads = [threading.Thread(target=listen) for _ in range(300)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    while hub.stats()["subscribers"] < 300:
+        time.sleep(0.01)
+    start = time.monotonic()
+    hub.publish(IDEA_UPDATE, {"idea_id": 7, "tokens_sold": 1}, idea_id=7)
+    for thread in threads:
+        thread.join()
+    assert len(received) == 300 and time.monotonic() - start < 2
+    assert all(events == [(IDEA_UPDATE, {"idea_id": 7, "tokens_sold": 1})] for events in received)
+    hub.close()
+
+
+def test_lagging_or_stale_clients_get_reset():
+    hub = Broadcaster(flush_interval=60, buffer_size=4)
+    for i in range(10):
+        hub.publish(NEW_IDEA, {"idea_id": i})
+    hub.flush()
+
+    stream = hub.subscribe(last_event_id=2, timeout=1)
+    next(stream)
+    events = _events(next(stream))
+    assert events[0] == (RESET, {}) and [e[1]["idea_id"] for e in events[1:]] == [6, 7, 8, 9]
+
+    stale = hub.subscribe(last_event_id=500, timeout=1)
+    next(stale)
+    assert _events(next(stale)) == [(RESET, {})]
+    hub.close()
+
+
+def test_invest_publishes_to_stream_endpoint(client):
+    from app import live
+
+    client.post("/invest/1", json={"tokens": 25, "wallet_address": "andr1streamer"})
+    client.post("/invest/1", json={"tokens": 5, "wallet_address": "andr1streamer"})
+    live.flush()
+
+    response = client.get("/api/stream?idea=1", headers={"Last-Event-ID": "0"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    next(chunks)
+    updates = [data for event, data in _events(next(chunks)) if event == IDEA_UPDATE]
+    response.close()
+    assert updates[-1]["idea_id"] == 1 and updates[-1]["tokens_sold"] >= 30
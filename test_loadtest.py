@@ -0,0 +1,53 @@
+import functools
+
+from loadtest import ClientTransport, Targets, compare_load, find_saturation, parse_mix, ramp, run_stage
+
+
+def _stage(clients, throughput, error_rate=0.0, p99=10.0):
+    return {"concurrency": clients, "total": {"throughput": throughput, "error_rate": error_rate, "p99_ms": p99},
+            "routes": {"invest": {"p99_ms": p99}}}
+
+
+def test_saturation_is_the_knee_of_healthy_stages():
+    stages = [_stage(1, 100), _stage(2, 190), _stage(4, 300), _stage(8, 310, p99=40), _stage(16, 500, 0.2)]
+    assert find_saturation(stages) == {"concurrency": 4, "throughput": 300, "p99_ms": 10.0,
+                                       "peak_throughput": 310, "saturated": True}
+    assert find_saturation(stages[:3])["saturated"] is False
+    assert find_saturation([_stage(1, 10, 0.5)]) is None
+
+    baseline = {"stages": stages, "saturation": find_saturation(stages)}
+    slower = [_stage(1, 100), _stage(2, 150), _stage(4, 200, p99=30), _stage(8, 205)]
+    regressions = compare_load(baseline, {"stages": slower, "saturation": find_saturation(slower)})
+    assert [r["metric"] for r in regressions] == ["saturation_throughput", "invest.p99_ms"]
+    assert compare_load(baseline, baseline) == []
+    assert parse_mix("browse=3, invest=1,splitter=0") == {"browse": 3.0, "invest": 1.0}
+
+
+def test_mixed_workload_ramp_in_process(client, monkeypatch):
+    import app as app_module
+    from chain_stub import LocalChainREST
+    from splitter_ado import SplitterADO
+
+    with LocalChainREST() as chain:
+        chain.add_splitter("andr1loadsplitter", {"andr1loadcreator": 0.7, "andr1loadtreasury": 0.3})
+        chain.balances["andr1loadcreator"] = {"uandr": 500}
+        monkeypatch.setattr(app_module, "SplitterADO", functools.partial(SplitterADO, rest_url=chain.url))
+        targets = Targets.from_database(app_module)
+        mix = {"browse": 1, "idea_detail": 1, "invest": 1, "portfolio": 1, "recommendations": 1, "splitter": 1}
+        transport = ClientTransport(app_module.app)
+        report = ramp(transport, targets, mix, stages=(1,), seconds=0.5)
+        # The in-memory test database is one connection shared by every thread,
+        # so only read-only routes run concurrently here
+        reads = run_stage(transport, targets, {"idea_detail": 1, "splitter": 1}, concurrency=3, seconds=0.5)
+        assert any("/smart/" in path for path in chain.requests)
+
+    assert [stage["concurrency"] for stage in report["stages"]] == [1]
+    for stage in report["stages"] + [reads]:
+        assert stage["total"]["error_rate"] == 0.0
+        for name, stats in stage["routes"].items():
+            assert stats["requests"] > 0 and set(stats["statuses"]) == {"200"}, name
+            assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+        assert abs(sum(r["throughput"] for r in stage["routes"].values()) - stage["total"]["throughput"]) < 1e-6
+    assert report["saturation"] == {"concurrency": 1, "throughput": report["stages"][0]["total"]["throughput"],
+                                    "p99_ms": report["stages"][0]["total"]["p99_ms"],
+                                    "peak_throughput": report["stages"][0]["total"]["throughput"], "saturated": False}
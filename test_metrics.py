@@ -0,0 +1,65 @@
+import time
+from collections import Counter
+
+from metrics import Histogram, MetricsRegistry, SlowRequestProfiler, track_upstream
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("latency_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    hist.observe(("/",), 0.05)
+    hist.observe(("/",), 0.5)
+    hist.observe(("/",), 5.0)
+
+    lines = hist.render()
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/"} 3' in lines
+
+
+def test_track_upstream_counts_errors():
+    registry = MetricsRegistry()
+    try:
+        with track_upstream("query_balance", registry):
+            raise ConnectionError("node down")
+    except ConnectionError:
+        pass
+
+    text = registry.render()
+    assert 'ipinvest_upstream_errors_total{call="query_balance"} 1' in text
+    assert 'ipinvest_upstream_request_duration_seconds_count{call="query_balance"} 1' in text
+
+
+def test_metrics_endpoint_reports_routes_and_sql(client):
+    client.get("/api/analytics")
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert 'ipinvest_http_request_duration_seconds_count{route="/api/analytics",method="GET",status="200"}' in body
+    assert 'ipinvest_http_request_sql_statements_sum{route="/api/analytics",method="GET"}' in body
+
+
+def test_failed_statement_leaves_no_timing_state(client):
+    import pytest
+    from sqlalchemy.exc import OperationalError
+    from app import app, db
+
+    with app.app_context(), db.engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+        connection.rollback()
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+        assert not [key for key in connection.info if key.startswith("ipinvest")]
+
+
+def test_profiler_samples_registered_thread():
+    import threading
+
+    profiler = SlowRequestProfiler(threshold=0.0, interval=0.001)
+    profiler.begin(threading.get_ident())
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    samples = profiler.end(threading.get_ident())
+
+    assert isinstance(samples, Counter) and samples
+    assert "test_profiler_samples_registered_thread" in SlowRequestProfiler.format_report(samples)
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from model_artifacts import (POLICY, VALUATION, FlatForest, PolicyNetwork, SharedModel, current_version,
+                             publish_policy, publish_valuation_model)
+
+
+def _forest(seed=0, trees=20):
+    rng = np.random.default_rng(seed)
+    X = rng.random((400, 5)) * [5000, 100, 15, 1, 1]
+    y = X @ [300, 1000, 5e4, 2e5, 1e5] + rng.normal(0, 1e4, 400)
+    scaler = StandardScaler().fit(X)
+    return RandomForestRegressor(n_estimators=trees, random_state=seed).fit(scaler.transform(X), y), scaler, X
+
+
+def test_flat_forest_matches_sklearn_and_is_memory_mapped(tmp_path):
+    forest, scaler, X = _forest()
+    publish_valuation_model(forest, scaler, root=str(tmp_path))
+    model = SharedModel(VALUATION, FlatForest, root=str(tmp_path)).get()
+    assert isinstance(model.threshold, np.memmap) and not model.threshold.flags.writeable
+    np.testing.assert_allclose(model.predict(X), forest.predict(scaler.transform(X)))
+    assert model.predict(X[0]).shape == (1,)
+
+
+def test_new_versions_swap_in_without_restart(tmp_path):
+    root = str(tmp_path)
+    handle = SharedModel(VALUATION, FlatForest, root=root, check_interval=0)
+    assert handle.get() is None
+
+    first, scaler, X = _forest(seed=1)
+    publish_valuation_model(first, scaler, root=root)
+    old = handle.get()
+    second, scaler2, _ = _forest(seed=2)
+    for _ in range(3):
+        publish_valuation_model(second, scaler2, root=root)
+    new = handle.get()
+    assert new is not old and handle.reloads == 2 and handle.version == current_version(VALUATION, root)
+    np.testing.assert_allclose(new.predict(X), second.predict(scaler2.transform(X)))
+    # A request still holding the old version keeps working after it is pruned
+    assert not os.path.exists(os.path.join(root, VALUATION, old.meta["version"]))
+    np.testing.assert_allclose(old.predict(X), first.predict(scaler.transform(X)))
+    assert len(os.listdir(os.path.join(root, VALUATION))) == 4  # 3 versions + CURRENT
+
+
+def test_policy_network_matches_mlp_forward(tmp_path):
+    rng = np.random.default_rng(3)
+    state = {
+        "mlp_extractor.policy_net.0.weight": rng.normal(size=(64, 10)),
+        "mlp_extractor.policy_net.0.bias": rng.normal(size=64),
+        "mlp_extractor.policy_net.2.weight": rng.normal(size=(64, 64)),
+        "mlp_extractor.policy_net.2.bias": rng.normal(size=64),
+        "mlp_extractor.value_net.0.weight": rng.normal(size=(64, 10)),
+        "action_net.weight": rng.normal(size=(10, 64)) * 0.1,
+        "action_net.bias": rng.normal(size=10) * 0.1,
+        "log_std": np.zeros(10),
+    }
+    publish_policy(state, root=str(tmp_path))
+    policy = SharedModel(POLICY, PolicyNetwork, root=str(tmp_path)).get()
+    obs = rng.random(10)
+    hidden = np.tanh(state["mlp_extractor.policy_net.2.weight"] @ np.tanh(
+        state["mlp_extractor.policy_net.0.weight"] @ obs + state["mlp_extractor.policy_net.0.bias"]) +
+        state["mlp_extractor.policy_net.2.bias"])
+    expected = np.clip(state["action_net.weight"] @ hidden + state["action_net.bias"], 0, 1)
+    np.testing.assert_allclose(policy.predict(obs), expected, rtol=1e-5)
+
+
+def test_submit_values_ideas_with_published_model(client, monkeypatch, tmp_path):
+    import app as app_module
+    from app import Idea, app
+    from valuation_model import extract_features
+
+    # A private model directory, so the published model is not seen by later tests
+    root = str(tmp_path)
+    monkeypatch.setattr(app_module, "MODEL_DIR", root)
+    monkeypatch.setattr(app_module, "valuation_artifact", SharedModel(VALUATION, FlatForest, root=root,
+                                                                      check_interval=0))
+    forest, scaler, _ = _forest()
+    publish_valuation_model(forest, scaler, root=root)
+    form = {"title": "Neural battery", "description": "AI managed storage", "field": "Clean Energy",
+            "inventor": "Dr. Ito"}
+    client.post("/submit_idea", data=form)
+    expected = forest.predict(scaler.transform([extract_features(form["title"], form["description"],
+                                                                 form["field"])]))[0]
+    with app.app_context():
+        assert abs(Idea.query.filter_by(title="Neural battery").one().predicted_value - expected) < 1e-6
+
+    status = client.get("/api/models").get_json()
+    assert status["models"][0]["version"] == current_version(VALUATION, root)
+    assert status["memory"]["rss_kb"] > 0
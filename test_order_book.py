@@ -0,0 +1,188 @@
+import pytest
+
+from order_book import BUY, SELL, MARKET, CANCELLED, FILLED, OPEN, MatchingEngine, OrderError
+
+
+def test_price_time_priority_and_partial_fills():
+    engine = MatchingEngine()
+    first, _ = engine.submit(1, "andr1alice", SELL, 5, price=101)
+    second, _ = engine.submit(1, "andr1bob", SELL, 5, price=100)
+    third, _ = engine.submit(1, "andr1carol", SELL, 5, price=100)
+
+    order, fills = engine.submit(1, "andr1dave", BUY, 12, price=101)
+
+    assert [(f.sell_order_id, f.price, f.quantity) for f in fills] == [
+        (second.order_id, 100, 5), (third.order_id, 100, 5), (first.order_id, 101, 2)]
+    assert order.status == FILLED
+    assert first.remaining == 3 and first.status == OPEN
+    assert engine.book(1).depth() == {"bids": [], "asks": [{"price": 101, "quantity": 3}]}
+
+
+def test_market_remainder_is_cancelled_and_limit_remainder_rests():
+    engine = MatchingEngine()
+    engine.submit(1, "andr1alice", SELL, 4, price=50)
+
+    market, fills = engine.submit(1, "andr1bob", BUY, 10, order_type=MARKET)
+    assert sum(f.quantity for f in fills) == 4 and market.status == CANCELLED
+
+    limit, fills = engine.submit(1, "andr1bob", BUY, 10, price=49.999)
+    assert not fills and limit.status == OPEN and limit.price == 50.0
+    assert engine.book(1).best_bid() is limit
+
+
+def test_cancel_and_validation():
+    engine = MatchingEngine()
+    order, _ = engine.submit(1, "andr1alice", BUY, 3, price=10)
+    engine.cancel(1, order.order_id)
+    assert engine.book(1).best_bid() is None and engine.book(1).depth()["bids"] == []
+
+    with pytest.raises(OrderError):
+        engine.cancel(1, order.order_id)
+    with pytest.raises(OrderError):
+        engine.submit(1, "andr1alice", BUY, 0, price=10)
+    with pytest.raises(OrderError):
+        engine.submit(1, "andr1alice", SELL, 1)
+    for price in (float("nan"), float("inf")):
+        with pytest.raises(OrderError):
+            engine.submit(1, "andr1alice", BUY, 1, price=price)
+
+
+def test_concurrent_sells_cannot_oversell():
+    import threading
+    import time
+
+    engine = MatchingEngine()
+    engine.submit(1, "andr1buyer", BUY, 100, price=10)
+    sold = []
+
+    def slow_balance():
+        time.sleep(0.01)  # a DB read; widens the race a check outside the lock would lose
+        return 10 - sum(sold)
+
+    def sell():
+        try:
+            engine.submit(1, "andr1seller", SELL, 10, price=10, balance=slow_balance,
+                          on_fills=lambda fills: sold.extend(f.quantity for f in fills))
+        except OrderError:
+            pass
+
+    threads = [threading.Thread(target=sell) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sold == [10]
+
+
+def test_failed_persist_rolls_back_the_match(tmp_path):
+    engine = MatchingEngine(journal_dir=str(tmp_path))
+    first, _ = engine.submit(1, "andr1alice", SELL, 3, price=10)
+    second, _ = engine.submit(1, "andr1bob", SELL, 5, price=11)
+    before = engine.snapshot()
+
+    def fail(fills):
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(RuntimeError):
+        engine.submit(1, "andr1carol", BUY, 10, price=11, on_fills=fail)
+    assert engine.snapshot() == before
+    assert (first.status, first.remaining, second.status, second.remaining) == (OPEN, 3, OPEN, 5)
+    assert engine.book(1).best_bid() is None
+
+    # The book matches again as if the failed order never arrived, and only that is journaled
+    order, fills = engine.submit(1, "andr1carol", BUY, 4, price=11)
+    assert order.order_id == 3 and [(f.sell_order_id, f.quantity) for f in fills] == [(1, 3), (2, 1)]
+    expected = engine.snapshot()
+    engine.close()
+    assert MatchingEngine(journal_dir=str(tmp_path)).snapshot() == expected
+
+
+def test_self_trades_cancel_the_resting_order():
+    engine = MatchingEngine()
+    own, _ = engine.submit(1, "andr1alice", SELL, 5, price=10)
+    other, _ = engine.submit(1, "andr1bob", SELL, 2, price=11)
+    order, fills = engine.submit(1, "andr1alice", BUY, 4, price=11)
+    assert own.status == CANCELLED
+    assert [(f.seller, f.quantity) for f in fills] == [("andr1bob", 2)]
+    assert order.status == OPEN and order.remaining == 2
+    assert engine.book(1).depth() == {"bids": [{"price": 11.0, "quantity": 2}], "asks": []}
+
+
+def _flow(engine):
+    fills = []
+    for i in range(40):
+        side = BUY if i % 3 else SELL
+        _, f = engine.submit(1 + i % 2, f"andr1w{i % 5}", side, 1 + i % 7, price=100 + (i % 5) - 2, timestamp=i)
+        fills.extend(f)
+    return fills
+
+
+def test_snapshot_and_replay_rebuild_identical_books(tmp_path):
+    engine = MatchingEngine(journal_dir=str(tmp_path), snapshot_every=7)
+    _flow(engine)
+    expected = engine.snapshot()
+    engine.close()
+
+    recovered = MatchingEngine(journal_dir=str(tmp_path), snapshot_every=7)
+    assert recovered.snapshot() == expected
+    # only the journal tail after the last snapshot was replayed
+    assert len(open(tmp_path / "journal.jsonl").readlines()) <= 7
+
+    # a torn final line is discarded and later commands still journal cleanly
+    recovered.close()
+    with open(tmp_path / "journal.jsonl", "a") as f:
+        f.write('{"op":"submit","idea_')
+    again = MatchingEngine(journal_dir=str(tmp_path), snapshot_every=7)
+    assert again.snapshot() == expected
+    again.submit(1, "andr1late", BUY, 1, price=1)
+    again.close()
+    assert MatchingEngine(journal_dir=str(tmp_path)).seq == expected["seq"] + 1
+
+
+def test_order_routes_check_holdings_and_record_trades(client):
+    from app import app, Trade
+
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1seller"})
+    assert client.post("/api/orders/1", json={
+        "wallet_address": "andr1seller", "side": "sell", "quantity": 11, "price": 2600}).status_code == 400
+
+    ask = client.post("/api/orders/1", json={
+        "wallet_address": "andr1seller", "side": "sell", "quantity": 6, "price": 2600}).get_json()
+    assert client.post("/api/orders/1", json={
+        "wallet_address": "andr1seller", "side": "sell", "quantity": 5, "price": 2700}).status_code == 400
+
+    bid = client.post("/api/orders/1", json={
+        "wallet_address": "andr1buyer", "side": "buy", "type": "market", "quantity": 4}).get_json()
+    assert bid["filled_quantity"] == 4
+    assert client.get("/api/orderbook/1").get_json()["asks"] == [{"price": 2600.0, "quantity": 2}]
+
+    with app.app_context():
+        trade = Trade.query.one()
+        assert (trade.seller_address, trade.buyer_address, trade.tokens, trade.amount) == (
+            "andr1seller", "andr1buyer", 4, 10400.0)
+
+    order_id = ask["order"]["order_id"]
+    assert client.delete(f"/api/orders/1/{order_id}", json={"wallet_address": "andr1buyer"}).status_code == 403
+    assert client.delete(f"/api/orders/1/{order_id}", json={"wallet_address": "andr1seller"}).status_code == 200
+
+
+def test_order_route_failed_commit_leaves_book_and_balance_intact(client, monkeypatch):
+    import app as app_module
+    from app import app, Trade
+
+    client.post("/invest/1", json={"tokens": 5, "wallet_address": "andr1seller"})
+    client.post("/api/orders/1", json={"wallet_address": "andr1seller", "side": "sell", "quantity": 5, "price": 2600})
+
+    def broken(fills, skip_existing=False):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(app_module, "record_trades", broken)
+    response = client.post("/api/orders/1", json={
+        "wallet_address": "andr1buyer", "side": "buy", "type": "market", "quantity": 5})
+    assert response.status_code == 500
+    assert client.get("/api/orderbook/1").get_json()["asks"] == [{"price": 2600.0, "quantity": 5}]
+    with app.app_context():
+        assert Trade.query.count() == 0
+    # The resting sell still holds all five tokens
+    assert client.post("/api/orders/1", json={
+        "wallet_address": "andr1seller", "side": "sell", "quantity": 1, "price": 2700}).status_code == 400
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_analytics import AnalyticsCache, compute_snapshot
+
+
+def test_snapshot_matches_per_wallet_loops():
+    rng = np.random.default_rng(7)
+    ideas = pd.DataFrame({
+        "id": np.arange(10, 40),
+        "title": [f"Idea {i}" for i in range(30)],
+        "field": rng.choice(["Quantum", "Health", "Energy"], 30),
+        "token_price": rng.uniform(10, 500, 30),
+    })
+    pairs = np.unique(rng.integers(0, 50, 400) * 100 + rng.integers(10, 40, 400))
+    positions = pd.DataFrame({"wallet": [f"w{p // 100}" for p in pairs], "idea_id": pairs % 100,
+                              "tokens": rng.integers(1, 50, len(pairs)), "cost": rng.uniform(1, 100, len(pairs))})
+    snapshot = compute_snapshot(positions, ideas, top=3)
+
+    price = dict(zip(ideas["id"], ideas["token_price"]))
+    field = dict(zip(ideas["id"], ideas["field"]))
+    for wallet, rows in positions.groupby("wallet"):
+        values = {idea_id: tokens * price[idea_id] for idea_id, tokens in zip(rows["idea_id"], rows["tokens"])}
+        total = sum(values.values())
+        exposure = {}
+        for idea_id, value in values.items():
+            exposure[field[idea_id]] = exposure.get(field[idea_id], 0) + value / total
+
+        risk = snapshot.wallet(wallet)
+        assert risk["total_value"] == pytest.approx(total)
+        assert risk["cost_basis"] == pytest.approx(rows["cost"].sum())
+        assert risk["positions"] == len(values)
+        assert risk["hhi"] == pytest.approx(sum((v / total) ** 2 for v in values.values()))
+        assert risk["field_exposure"] == pytest.approx(exposure)
+        top = sorted(values, key=lambda idea_id: -values[idea_id])[:3]
+        assert [p["idea_id"] for p in risk["top_positions"]] == top
+    assert snapshot.wallet("nobody") is None
+
+
+def test_cache_recomputes_when_dirty_without_refresher():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    cache = AnalyticsCache(loader, interval=0)
+    assert cache.get() == 1 and cache.get() == 1
+    cache.mark_dirty()
+    assert cache.get() == 2 and cache.refreshes == 2
+
+
+def test_risk_endpoint_portfolio_page_and_recommendations(client):
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1risk"})
+    client.post("/invest/2", json={"tokens": 30, "wallet_address": "andr1risk"})
+
+    risk = client.get("/api/portfolio/andr1risk/risk").get_json()
+    assert risk["positions"] == 2 and risk["top_positions"][0]["idea_id"] == 2
+    assert sum(risk["field_exposure"].values()) == pytest.approx(1.0)
+    assert client.get("/api/portfolio/andr1nobody/risk").status_code == 404
+
+    page = client.get("/portfolio/andr1risk").get_data(as_text=True)
+    assert "Field Exposure" in page and "${:,.0f}".format(risk["total_value"]) in page
+
+    plain = {r["idea_id"]: r["score"] for r in client.get("/api/recommendations").get_json()}
+    aware = {r["idea_id"]: r["score"] for r in client.get("/api/recommendations?wallet=andr1risk").get_json()}
+    assert aware[2] < plain[2] and aware[3] == plain[3]
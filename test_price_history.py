@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from price_history import choose_resolution, record_price, query_history
+
+
+def test_rollups_track_ohlcv_with_out_of_order_points(client):
+    from app import db, PricePoint, PriceBar
+
+    t0 = datetime(2026, 3, 1, 12, 0, 0)
+    with client.application.app_context():
+        for seconds, price, tokens in [(10, 100.0, 2), (50, 120.0, 1), (5, 90.0, 3), (30, 95.0, 0)]:
+            record_price(db.session, PricePoint, PriceBar, 1, price, tokens, price * tokens,
+                         at=t0 + timedelta(seconds=seconds))
+        record_price(db.session, PricePoint, PriceBar, 1, 130.0, 1, 130.0, at=t0 + timedelta(minutes=5))
+        db.session.commit()
+
+        minute = (PriceBar.query.filter_by(idea_id=1, resolution=60)
+                  .filter(PriceBar.bucket_start < t0 + timedelta(hours=1))
+                  .order_by(PriceBar.bucket_start).all())
+        assert [(b.open, b.high, b.low, b.close, b.volume, b.points) for b in minute] == [
+            (90.0, 120.0, 90.0, 120.0, 6, 4), (130.0, 130.0, 130.0, 130.0, 1, 1)]
+        hour = PriceBar.query.filter_by(idea_id=1, resolution=3600, bucket_start=t0).one()
+        assert (hour.open, hour.close, hour.points) == (90.0, 130.0, 5)
+
+        raw = query_history(db.session, PricePoint, PriceBar, 1, t0, t0 + timedelta(hours=1))
+        assert raw["resolution"] == "raw" and len(raw["points"]) == 5
+        bars = query_history(db.session, PricePoint, PriceBar, 1, t0, t0 + timedelta(hours=1), max_points=3)
+        assert bars["resolution"] == "hour" and bars["points"][0]["close"] == 130.0
+
+
+def test_choose_resolution_keeps_point_count_bounded():
+    start = datetime(2024, 1, 1)
+    assert choose_resolution(start, start + timedelta(hours=6), 500) == "minute"
+    assert choose_resolution(start, start + timedelta(days=14), 500) == "hour"
+    assert choose_resolution(start, start + timedelta(days=365), 500) == "day"
+    assert choose_resolution(start, start + timedelta(days=3 * 365), 500) is None
+
+
+def test_long_windows_keep_the_newest_points_and_say_so(client):
+    from app import db, PricePoint, PriceBar
+
+    t0 = datetime(2026, 3, 1, 12, 0, 0)
+    with client.application.app_context():
+        for day in range(10):
+            record_price(db.session, PricePoint, PriceBar, 1, 100.0 + day, 1, 100.0 + day, at=t0 + timedelta(days=day))
+        db.session.commit()
+        end = t0 + timedelta(days=9, hours=1)
+
+        history = query_history(db.session, PricePoint, PriceBar, 1, t0, end, max_points=3)
+        assert (history["resolution"], history["truncated"]) == ("day", True)
+        assert [p["close"] for p in history["points"]] == [107.0, 108.0, 109.0]
+        assert history["start"] == (t0 + timedelta(days=7)).replace(hour=0).isoformat()
+        assert query_history(db.session, PricePoint, PriceBar, 1, t0, end, max_points=20)["truncated"] is False
+
+        # An explicit resolution is never cut short: too many points is an error
+        with pytest.raises(ValueError):
+            query_history(db.session, PricePoint, PriceBar, 1, t0, end, resolution="raw", max_points=5)
+        with pytest.raises(ValueError):
+            query_history(db.session, PricePoint, PriceBar, 1, t0, end, resolution="hour", max_points=100)
+        assert len(query_history(db.session, PricePoint, PriceBar, 1, t0, end, resolution="day",
+                                 max_points=10)["points"]) == 10
+
+
+def test_price_history_endpoint_records_trades(client):
+    client.post("/invest/2", json={"tokens": 5, "wallet_address": "andr1chart"})
+
+    history = client.get("/api/price-history/2?range=1d").get_json()
+    assert history["resolution"] == "raw"
+    assert [p["volume"] for p in history["points"]][-1] == 5
+
+    assert client.get("/api/price-history/2?range=2w").status_code == 400
+    assert client.get("/api/price-history/2?resolution=week").status_code == 400
+    assert client.get("/api/price-history/2?range=1y&resolution=minute").status_code == 400
+    assert client.get("/api/price-history/999").status_code == 404
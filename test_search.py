@@ -0,0 +1,42 @@
+from search import build_match_query
+
+
+def test_build_match_query_quotes_terms_and_prefixes_last():
+    assert build_match_query('quantum "crypto') == '"quantum" "crypto"*'
+    assert build_match_query("AND OR NOT*") == '"AND" "OR" "NOT"*'
+    assert build_match_query("  -- ") == ""
+
+
+def test_search_ranks_title_matches_and_highlights(client):
+    from app import app, db, Idea
+
+    with app.app_context():
+        db.session.add(Idea(title="Battery <b>recycling</b>", description="Recovers lithium from quantum dots",
+                            field="Clean Energy", inventor="Dr. Eve", predicted_value=1e6,
+                            total_tokens=1000, token_price=1000))
+        db.session.commit()
+
+    body = client.get("/api/search?q=quantum").get_json()
+    assert body["total"] == 2
+    # title hit outranks the description-only hit
+    assert body["results"][0]["title"] == "Quantum Computing Patent"
+    assert body["results"][0]["title_highlight"] == "<mark>Quantum</mark> Computing Patent"
+
+    body = client.get("/api/search?q=recyc").get_json()
+    assert body["results"][0]["title_highlight"] == "Battery &lt;b&gt;<mark>recycling</mark>&lt;/b&gt;"
+
+
+def test_search_tracks_updates_and_paginates(client):
+    from app import app, db, Idea
+
+    with app.app_context():
+        idea = db.session.get(Idea, 1)
+        idea.title = "Photonic Interconnect"
+        db.session.commit()
+
+    assert client.get("/api/search?q=photonic").get_json()["total"] == 1
+    assert client.get("/api/search?q=patent").get_json()["total"] == 0
+
+    page = client.get("/api/search?q=dr&per_page=2&page=2").get_json()
+    assert page["total"] == 4 and len(page["results"]) == 2
+    assert client.get("/api/search").status_code == 400
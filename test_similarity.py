@@ -0,0 +1,67 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from similarity import SimilarityIndex
+
+FIELDS = ["Clean Energy", "Fintech", "Biotechnology", "Robotics"]
+
+
+def _corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [f"term{i}" for i in range(300)]
+    return [(i + 1, " ".join(rng.choice(words, 3)), " ".join(rng.choice(words, 12)), FIELDS[i % 4])
+            for i in range(n)]
+
+
+def _brute_force(index, rows, idea_id, k):
+    vectors = np.zeros((len(rows), len(index.vocabulary)))
+    for position in range(len(rows)):
+        terms, values = index._vector(position)
+        vectors[position, terms] = values
+    scores = vectors @ vectors[idea_id - 1]
+    scores[idea_id - 1] = -1
+    return [int(i) + 1 for i in np.argsort(-scores, kind="stable")[:k]]
+
+
+def test_blocked_search_matches_brute_force_and_tfidf_cosine():
+    rows = _corpus(500)
+    index = SimilarityIndex(block_rows=64, max_query_terms=100)
+    index.rebuild(rows)
+    assert index.stats()["blocks"] == 8
+    for idea_id in (1, 77, 500):
+        assert [i for i, _ in index.similar(idea_id, 5)] == _brute_force(index, rows, idea_id, 5)
+
+    # Same scores as scikit-learn's sublinear TF-IDF on the same weighted terms
+    documents = [" ".join([title] * 2 + [description] + ["field_" + field.replace(" ", "_")] * 3)
+                 for _, title, description, field in rows]
+    matrix = TfidfVectorizer(sublinear_tf=True, token_pattern=r"\S+").fit_transform(documents)
+    sklearn_scores = (matrix @ matrix[0].T).toarray().ravel()
+    ours = dict(index.similar(1, 3))
+    for idea_id, score in ours.items():
+        assert abs(sklearn_scores[idea_id - 1] - score) < 1e-5
+
+
+def test_new_ideas_are_appended_and_cached_results_topped_up():
+    rows = _corpus(200)
+    index = SimilarityIndex(lambda: rows, block_rows=64)
+    before = index.similar(10, 3)
+    assert index.stats()["cache_misses"] == 1
+
+    _, title, description, field = rows[9]
+    index.add(201, title, description, field)
+    after = index.similar(10, 3)
+    assert after[0][0] == 201 and after[0][1] > 0.99 and after[1:] == before[:2]
+    assert index.stats()["cache_hits"] == 1 and index.size == 201
+    assert index.similar(201, 1)[0][0] == 10
+    assert index.similar(999) == []
+
+
+def test_similar_ideas_endpoint_and_detail_page(client):
+    client.post("/submit_idea", data={"title": "Solid-state battery storage",
+                                      "description": "Renewable energy storage with solid electrolytes",
+                                      "field": "Clean Energy", "inventor": "Dr. Kim"})
+    similar = client.get("/api/ideas/5/similar?k=2").get_json()["similar"]
+    assert similar[0]["title"] == "Sustainable Energy Storage" and 0 < similar[0]["similarity"] <= 1
+    assert client.get("/api/ideas/5/similar?k=500").status_code == 400
+    assert client.get("/api/ideas/99/similar").status_code == 404
+    assert b"Similar Ideas" in client.get("/idea/3").data
@@ -0,0 +1,73 @@
+import csv
+import gzip
+import os
+
+import numpy as np
+
+from training_export import COLUMNS, export_training_data, write_training_file
+from valuation_model import FEATURE_COLUMNS, ValuationModel, extract_features, load_training_data
+
+
+def test_export_streams_traded_ideas_with_market_outcomes(client, tmp_path):
+    from app import app, db, Idea, Trade
+
+    client.post("/invest/1", json={"tokens": 10, "wallet_address": "andr1alice"})
+    client.post("/invest/2", json={"tokens": 30, "wallet_address": "andr1alice"})
+    client.post("/invest/2", json={"tokens": 10, "wallet_address": "andr1bob"})
+    client.post("/invest/3", json={"tokens": 5, "wallet_address": "andr1alice"})
+    with app.app_context():
+        # Idea 2 trades three times, idea 3 once; idea 1 has only primary sales
+        for i, (idea_id, tokens, price) in enumerate([(2, 2, 4000.0), (2, 6, 3000.0), (2, 2, 2000.0), (3, 1, 900.0)]):
+            db.session.add(Trade(idea_id=idea_id, buyer_address="andr1carol", seller_address="andr1alice",
+                                 tokens=tokens, price=price, amount=tokens * price,
+                                 buy_order_id=2 * i + 1, sell_order_id=2 * i + 2))
+        db.session.commit()
+        ideas = {idea.id: idea for idea in Idea.query}
+        expected_features = {i: extract_features(idea.title, idea.description, idea.field) for i, idea in ideas.items()}
+        first_price, supply = ideas[2].token_price, ideas[2].total_tokens
+
+    path = str(tmp_path / "training.csv.gz")
+    stats = export_training_data(path, batch_size=1)
+    assert stats["rows"] == 1
+    with gzip.open(path, "rt", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert list(rows[0]) == COLUMNS and [int(r["idea_id"]) for r in rows] == [2]
+
+    traded = rows[0]
+    assert [int(traded[c]) for c in FEATURE_COLUMNS] == expected_features[2]
+    assert (int(traded["investors"]), int(traded["tokens_sold"]), float(traded["amount_raised"])) == \
+        (2, 40, 40 * first_price)
+    assert (float(traded["realized_price"]), int(traded["trade_count"])) == (3000.0, 3)
+    assert float(traded["valuation"]) == 3000.0 * supply
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+    # A primary-only idea has no market price, so the target never falls back to
+    # its own predicted_value (token_price is derived from it)
+    export_training_data(path, min_trades=0)
+    with gzip.open(path, "rt", newline="") as handle:
+        rows = {int(r["idea_id"]): r for r in csv.DictReader(handle)}
+    assert sorted(rows) == [2, 3]
+    assert all(float(r["valuation"]) != round(float(r["predicted_value"]) / 0.3, 2) for r in rows.values())
+
+
+def test_train_reads_export_in_chunks(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    features = rng.random((600, len(FEATURE_COLUMNS))) * [5000, 100, 15, 1, 1]
+    valuation = features @ [300, 1000, 5e4, 2e5, 1e5]
+    outcomes = np.zeros((600, len(COLUMNS) - len(FEATURE_COLUMNS) - 1))
+    batches = (np.column_stack([features, valuation, outcomes])[i:i + 64].tolist() for i in range(0, 600, 64))
+    path = str(tmp_path / "training.csv")
+    assert write_training_file(batches, path) == 600
+
+    df = load_training_data(path, chunksize=50)
+    assert list(df.columns) == FEATURE_COLUMNS + ["valuation"] and len(df) == 600
+    assert df[FEATURE_COLUMNS].dtypes.eq(np.float32).all()
+    assert np.allclose(df["valuation"], valuation)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("IPINVEST_MODEL_DIR", str(tmp_path / "models"))
+    model = ValuationModel()
+    model.model.set_params(n_estimators=10)
+    model.train(path)
+    predicted = model.predict_many(features[:5])
+    assert np.allclose(predicted, valuation[:5], rtol=0.2)
@@ -0,0 +1,167 @@
+"""
+Valuation training set exported from the live database
+Streams every traded idea with its realized market outcome through a
+server-side cursor and appends the rows to a CSV one batch at a time, so
+memory stays flat however large the Idea/Investment history gets. The file
+has the FEATURE_COLUMNS + valuation layout ValuationModel.train reads,
+followed by the outcome columns the target was derived from.
+"""
+
+import csv
+import gzip
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from valuation_model import FEATURE_COLUMNS, extract_features
+
+BATCH_SIZE = 5_000
+# Secondary trades an idea needs before its market price is trusted as a target.
+# Primary sales are at token_price, which is set from predicted_value, so
+# they are never used: the model would only learn to reproduce its own output.
+DEFAULT_MIN_TRADES = 3
+
+OUTCOME_COLUMNS = ['idea_id', 'predicted_value', 'token_price', 'total_tokens', 'tokens_sold', 'funding_progress',
+                   'amount_raised', 'investors', 'trade_count', 'trade_volume', 'realized_price']
+COLUMNS = FEATURE_COLUMNS + ['valuation'] + OUTCOME_COLUMNS
+
+# One row per funded idea with enough trades; the correlated aggregates are answered from the
+# (idea_id, investor_address, tokens_purchased, amount_paid) and trade.idea_id indexes
+TRAINING_SQL = """
+    SELECT * FROM (
+    SELECT idea.id AS idea_id, idea.title, idea.description, idea.field, idea.predicted_value,
+           idea.token_price, idea.total_tokens, idea.tokens_sold,
+           (SELECT COALESCE(SUM(i.amount_paid), 0) FROM investment i WHERE i.idea_id = idea.id) AS amount_raised,
+           (SELECT COALESCE(SUM(i.tokens_purchased), 0) FROM investment i WHERE i.idea_id = idea.id)
+               AS tokens_purchased,
+           (SELECT COUNT(DISTINCT i.investor_address) FROM investment i WHERE i.idea_id = idea.id) AS investors,
+           (SELECT COUNT(*) FROM trade t WHERE t.idea_id = idea.id) AS trade_count,
+           (SELECT COALESCE(SUM(t.amount), 0) FROM trade t WHERE t.idea_id = idea.id) AS trade_volume,
+           (SELECT COALESCE(SUM(t.tokens), 0) FROM trade t WHERE t.idea_id = idea.id) AS traded_tokens
+    FROM idea
+    WHERE idea.tokens_sold >= :min_tokens_sold
+    ) funded
+    WHERE trade_count >= :min_trades
+    ORDER BY idea_id
+"""
+
+
+def realized_price(row) -> float:
+    """Volume-weighted secondary-market price"""
+    return row.trade_volume / row.traded_tokens
+
+
+def training_row(row) -> list:
+    """
+    Features and realized outcome for one TRAINING_SQL row
+
+    The target is the idea's value as priced by the secondary market: the
+    realized token price times the supply.
+    """
+    price = realized_price(row)
+    total_tokens = row.total_tokens or 0
+    valuation = price * total_tokens
+    progress = row.tokens_sold / total_tokens if total_tokens else 0.0
+    return extract_features(row.title, row.description, row.field) + [
+        round(valuation, 2), row.idea_id, row.predicted_value, row.token_price, total_tokens, row.tokens_sold,
+        round(progress, 6), round(row.amount_raised, 2), row.investors, row.trade_count,
+        round(row.trade_volume, 2), round(price, 6),
+    ]
+
+
+def stream_training_rows(connection, batch_size: int = BATCH_SIZE, min_tokens_sold: int = 1,
+                         min_trades: int = DEFAULT_MIN_TRADES) -> Iterator[List[list]]:
+    """
+    Batches of training rows read through a server-side cursor
+
+    Args:
+        connection: SQLAlchemy connection
+        batch_size: rows fetched from the cursor and yielded at a time
+        min_tokens_sold: ideas with fewer tokens sold have no outcome yet and are skipped
+        min_trades: ideas with fewer secondary trades (at least one) have no market price and are skipped
+    """
+    from sqlalchemy import text
+
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(
+        text(TRAINING_SQL), {"min_tokens_sold": min_tokens_sold, "min_trades": max(min_trades, 1)})
+    for partition in result.partitions(batch_size):
+        yield [training_row(row) for row in partition]
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", compresslevel=6, newline="")
+    return open(path, "w", newline="")
+
+
+def write_training_file(batches, path: str) -> int:
+    """
+    Append each batch to a CSV (gzip when path ends in .gz) as it arrives
+
+    Written to a temporary name and moved into place, so a nightly job never
+    trains on a half-written file. Returns the number of data rows.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}" + (".gz" if path.endswith(".gz") else "")
+    rows = 0
+    try:
+        with _open(tmp_path) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(COLUMNS)
+            for batch in batches:
+                writer.writerows(batch)
+                rows += len(batch)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+def export_training_data(path: str, batch_size: int = BATCH_SIZE, min_tokens_sold: int = 1,
+                         engine=None, min_trades: int = DEFAULT_MIN_TRADES) -> Dict[str, Any]:
+    """
+    Stream traded ideas from the app database into a training file
+
+    Args:
+        path: output CSV, gzip-compressed when it ends in .gz
+        engine: SQLAlchemy engine (default: the app's)
+
+    Returns:
+        {'path', 'rows', 'seconds'}
+    """
+    start = time.perf_counter()
+    if engine is None:
+        from app import app, db
+
+        with app.app_context():
+            return export_training_data(path, batch_size, min_tokens_sold, db.engine, min_trades)
+
+    with engine.connect() as connection:
+        rows = write_training_file(stream_training_rows(connection, batch_size, min_tokens_sold, min_trades), path)
+    return {"path": path, "rows": rows, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the valuation training set from DATABASE_URL")
+    parser.add_argument("command", choices=["export", "retrain"],
+                        help="retrain exports and then runs ValuationModel.train on the file")
+    parser.add_argument("--output", default=os.path.join("instance", "training.csv.gz"))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--min-tokens-sold", type=int, default=1)
+    parser.add_argument("--min-trades", type=int, default=DEFAULT_MIN_TRADES,
+                        help="secondary trades an idea needs to be included")
+    args = parser.parse_args(argv)
+
+    stats = export_training_data(args.output, args.batch_size, args.min_tokens_sold, min_trades=args.min_trades)
+    print(f"Exported {stats['rows']} ideas to {stats['path']} in {stats['seconds']}s")
+    if args.command == "retrain":
+        from valuation_model import ValuationModel
+
+        ValuationModel().train(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,60 @@
 # valuation_model.py
+import re
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 import joblib
+from model_artifacts import VALUATION, publish_valuation_model, shared_model
+
+# Feature order shared by training data producers and predict()
+FEATURE_COLUMNS = ['description_length', 'title_length', 'field_complexity', 'ai_indicator', 'blockchain_indicator']
+
+FIELD_COMPLEXITY = {
+    'Quantum Computing': 15,
+    'Biotechnology': 14,
+    'Semiconductors': 13,
+    'Healthcare AI': 12,
+    'Aerospace': 12,
+    'Clean Energy': 11,
+    'Robotics': 11,
+    'Materials Science': 10,
+    'Blockchain': 9,
+    'Cybersecurity': 9,
+    'Telecommunications': 8,
+    'Agritech': 7,
+    'Fintech': 6,
+    'Consumer Electronics': 5,
+    'Design': 3,
+    'Media & Entertainment': 2,
+}
+DEFAULT_FIELD_COMPLEXITY = 5
+AI_PATTERN = re.compile(r'\bai\b|machine learning|neural')
+TRAINING_CHUNK_ROWS = 100_000
+
+def extract_features(title: str, description: str, field: str) -> list:
+    text = f"{title} {description} {field}".lower()
+    return [
+        len(description),
+        len(title),
+        FIELD_COMPLEXITY.get(field, DEFAULT_FIELD_COMPLEXITY),
+        int(bool(AI_PATTERN.search(text))),
+        int('blockchain' in text),
+    ]
+
+def load_training_data(data_path: str, chunksize: int = TRAINING_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    FEATURE_COLUMNS and valuation from a training CSV (optionally .gz), read in chunks
+
+    Only the model's columns are parsed, as float32 features, so an export
+    carrying extra outcome columns loads in a fraction of its text size.
+    """
+    dtypes = {column: np.float32 for column in FEATURE_COLUMNS}
+    dtypes['valuation'] = np.float64
+    chunks = pd.read_csv(data_path, usecols=FEATURE_COLUMNS + ['valuation'], dtype=dtypes, chunksize=chunksize)
+    df = pd.concat(chunks, ignore_index=True)
+    return df[FEATURE_COLUMNS + ['valuation']]
 
 class ValuationModel:
     def __init__(self):
@@ -12,8 +62,8 @@ class ValuationModel:
         self.scaler = StandardScaler()
 
     def train(self, data_path: str):
-        df = pd.read_csv(data_path)
-        X = df.drop(['valuation'], axis=1)
+        df = load_training_data(data_path)
+        X = df[FEATURE_COLUMNS]
         y = df['valuation']
 
         X_scaled = self.scaler.fit_transform(X)
@@ -24,6 +74,8 @@ class ValuationModel:
         print(f"Model trained. R² Score: {score}")
         joblib.dump(self.model, "valuation_model.pkl")
         joblib.dump(self.scaler, "scaler.pkl")
+        # Memory-mapped copy that every worker process shares; running workers switch to it on their next read
+        publish_valuation_model(self.model, self.scaler)
 
     def predict(self, features: np.array):
         model = joblib.load("valuation_model.pkl")
@@ -31,7 +83,28 @@ class ValuationModel:
         features_scaled = scaler.transform([features])
         return model.predict(features_scaled)[0]
 
+    def predict_many(self, features: np.ndarray) -> np.ndarray:
+        """Predictions for a (n, len(FEATURE_COLUMNS)) array, from the shared artifact when published"""
+        shared = shared_model(VALUATION).get()
+        if shared is not None:
+            return shared.predict(features)
+        model = joblib.load("valuation_model.pkl")
+        scaler = joblib.load("scaler.pkl")
+        return model.predict(scaler.transform(np.asarray(features)))
+
+    def predict_store(self, store, idea_ids=None) -> np.ndarray:
+        """
+        Predictions straight from a FeatureStore's mapped rows
+
+        Args:
+            store: feature_store.FeatureStore
+            idea_ids: ideas to score (default: every row, indexed by idea id)
+        """
+        features = store.valuation_features()
+        return self.predict_many(features if idea_ids is None else features[idea_ids])
+
 # Example Usage:
 # model = ValuationModel()
-# model.train("patent_dataset.csv")
-# print(model.predict([feature_vector]))
\ No newline at end of file
+# model.train("patent_dataset.csv")  # or an export: python training_export.py export
+# print(model.predict([feature_vector]))
+# print(model.predict_store(FeatureStore("instance/features.f32"), [1, 2, 3]))
\ No newline at end of file